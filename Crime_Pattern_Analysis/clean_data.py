@@ -1,15 +1,38 @@
 import math
+import numpy as np
 import pandas as pd
 import re
 import logging
+import os
+import shutil
 import sys
 from sklearn.model_selection import train_test_split
 
+# Make the shared Data_Pipeline package importable when this module is run from its own directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Data_Pipeline.schema import TEMPORAL_CUBE_KEYS
+
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)])
 
 
 
+def replace_values(column, mapping):
+    # Series.replace that also keeps categorical columns (streaming ingest) categorical, only the few categories are renamed
+    # and categories that are renamed to the same value are merged into one
+    if not isinstance(column.dtype, pd.CategoricalDtype):
+        return column.replace(mapping)
+
+    renamed = column.cat.categories.map(lambda value: mapping.get(value, value))
+    categories = renamed.unique()
+
+    # Extra -1 slot at the end keeps missing values (code -1) missing
+    new_codes = np.append(categories.get_indexer(renamed), -1)[column.cat.codes.to_numpy()]
+
+    return pd.Series(pd.Categorical.from_codes(new_codes, categories), index=column.index, name=column.name)
+
+
 def clean_data_crime_pattern_analysis(clean_df):
 
     #Drop Duplicates
@@ -18,7 +41,7 @@ def clean_data_crime_pattern_analysis(clean_df):
 
 
     #Rename features
-    clean_df['District_Name'] = clean_df['District_Name'].replace({
+    clean_df['District_Name'] = replace_values(clean_df['District_Name'], {
         'Bengaluru City': 'Bengaluru Urban',
         'Belagavi Dist': 'Belagavi',
         'Bengaluru Dist': 'Bengaluru Rural',
@@ -80,32 +103,47 @@ def clean_data_crime_pattern_analysis(clean_df):
     return crime_data
 
 
+# Rows per row group of the Parquet dataset read by the dashboard
+PARQUET_ROW_GROUP_SIZE = 20000
+
+# Distance/direction patterns used by extract_direction_distance, compiled once per process
+KM_PATTERN = re.compile(r'k', re.IGNORECASE)
+FEET_PATTERN = re.compile(r'feet', re.IGNORECASE)
+METRE_PATTERN = re.compile(r'm', re.IGNORECASE)
+DISTANCE_PATTERN = re.compile(r'\d+')
+DIRECTION_PATTERN = re.compile(r'\b(?:north|south|east|west)\b', re.IGNORECASE)
+
+# Unit step applied to (latitude, longitude) for every direction calculate_crime_coordinates understands
+DIRECTION_OFFSETS = {
+    'NORTH': (1.0, 0.0),
+    'SOUTH': (-1.0, 0.0),
+    'EAST': (0.0, 1.0),
+    'WEST': (0.0, -1.0)
+}
+
+
 def extract_direction_distance(string):
   # This method is used to extract the distance, it's unit measured and convert all the units to standarised unit of KM and the direction of the crime from the Police Station in the string
 
   # Distance units pattern reg-x (m-metres,f-feet, k- refers to KM observations)
-
-  distance_pattern = r'\d+'
+  has_km = KM_PATTERN.search(string)
+  has_feet = FEET_PATTERN.search(string)
 
   #Filter only meters, exlcudes KM's and feet  and convert it to KM
-  if not re.search(r'k', string, re.IGNORECASE) and not re.search(r'feet', string, re.IGNORECASE) and re.search(r'm', string, re.IGNORECASE):
-    match = re.search(distance_pattern, string)
+  if not has_km and not has_feet and METRE_PATTERN.search(string):
+    match = DISTANCE_PATTERN.search(string)
     if match:
       distance = int(match.group())/1000
     else:
       distance = 0
 
   #Filter only feet, exlcudes KM's and meters and convert it to KM
-  elif not re.search(r'k', string, re.IGNORECASE) and re.search(r'feet', string, re.IGNORECASE):
-    match = re.search(distance_pattern, string)
-    if match:
-      distance = 0
-    else:
-      distance = 0
+  elif not has_km and has_feet:
+    distance = 0
 
   # Distance is already in KM only, no need to convert type.
-  elif re.search(r'k', string, re.IGNORECASE):
-    match = re.search(distance_pattern, string)
+  elif has_km:
+    match = DISTANCE_PATTERN.search(string)
     if match:
       distance = int(match.group())
 
@@ -122,19 +160,32 @@ def extract_direction_distance(string):
     distance = 0
 
   # Extract the direction from the string
-  direction_pattern = r'\b(?:north|south|east|west)\b'
-
-  # re.IGNORECASE is used for case-insensitive matching
-  match = re.search(direction_pattern, string, re.IGNORECASE)
+  match = DIRECTION_PATTERN.search(string)
   if match:
-    matched_string = match.group()  
     # Extract the matched string using match.group()
-    direction = matched_string
+    direction = match.group()
   else:
       direction = 'None'
   return direction, distance
 
 
+def extract_direction_distance_columns(distance_from_ps):
+    # Parse every distinct "Distance from PS" string only once and broadcast the parsed direction/distance back to all the rows through the categorical codes.
+    # Returns the latitude step, longitude step and distance (KM) of every row as NumPy arrays.
+    codes, unique_strings = pd.factorize(distance_from_ps)
+
+    # One extra slot at the end holds the "no movement" values for missing strings, which factorize codes as -1
+    lat_steps = np.zeros(len(unique_strings) + 1)
+    lon_steps = np.zeros(len(unique_strings) + 1)
+    distances = np.zeros(len(unique_strings) + 1)
+
+    for code, string in enumerate(unique_strings):
+        direction, distance = extract_direction_distance(str(string))
+        lat_steps[code], lon_steps[code] = DIRECTION_OFFSETS.get(direction, (0.0, 0.0))
+        distances[code] = distance
+
+    return lat_steps[codes], lon_steps[codes], distances[codes]
+
 
 def calculate_crime_coordinates(lat, lon, direction, distance):
     ##Here, we convert the lat and long from degrees to radians, to update the values, We can't update the lat and long if it's in degrees itself, to add the distance between the crime location and police station to the police station's latitude and longitude, to find the actual crime'ss location, we need to  convert the distances to angular distance, by dividing the actual distance by earth's radius, since arc length i.e distance travelled between 2 points (police station and crime location) in teh surface of a sphere (earth), = Teta*radius, i.e Angular distance teta in radians =  distance/radius.
@@ -173,33 +224,150 @@ def calculate_crime_coordinates(lat, lon, direction, distance):
 
 
 
-def update_crime_lat_long(new_data):
-    logging.info("Started to impute accurate crime's co-ordinates by calculating the crime's direction, distance and it's unit(Km/m/feet) away from the police station co-ordinates details from the dataset ...")
-    for index, row in new_data.iterrows():
-        direction, distance = extract_direction_distance(row["Distance from PS"])
-        if direction and distance is not None:
-            new_lat, new_lon = calculate_crime_coordinates(row["Latitude"], row["Longitude"], direction, distance)
-            new_data.at[index, "Latitude"] = new_lat
-            new_data.at[index, "Longitude"] = new_lon
-        else:
-            print(f"Error: Unable to extract direction and distance for row {index}.")
+def calculate_crime_coordinates_columns(lat, lon, lat_steps, lon_steps, distances):
+    # Columnar version of calculate_crime_coordinates, computes the new latitude and longitude of the whole frame at once.
+    # Rows without a valid direction keep the police station co-ordinates untouched, exactly like the row-wise version.
+    earth_radius = 6371.0
+
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    angular_distance = distances / earth_radius
+
+    new_lat = np.where(lat_steps != 0, np.degrees(np.radians(lat) + lat_steps * angular_distance), lat)
+    new_lon = np.where(lon_steps != 0, np.degrees(np.radians(lon) + lon_steps * angular_distance), lon)
+
+    return new_lat, new_lon
+
+
+def impute_crime_coordinates(new_data):
+    # Crime co-ordinates moved from the police station by the direction and distance of 'Distance from PS', without the
+    # outlier co-ordinates
+    lat_steps, lon_steps, distances = extract_direction_distance_columns(new_data["Distance from PS"])
+    new_lat, new_lon = calculate_crime_coordinates_columns(new_data["Latitude"], new_data["Longitude"], lat_steps, lon_steps, distances)
+    new_data["Latitude"] = new_lat
+    new_data["Longitude"] = new_lon
 
     # Remove redundant feature
     new_data = new_data.drop("Distance from PS", axis=1)
 
     # Remove outlier co-ordinates
-    new_data = new_data[~((new_data["Latitude"] > 19) |
-                            (new_data["Longitude"] > 78) |
-                            (new_data["Latitude"] < 11) |
-                            (new_data["Longitude"] < 74))]
+    return new_data[~((new_data["Latitude"] > 19) |
+                      (new_data["Longitude"] > 78) |
+                      (new_data["Latitude"] < 11) |
+                      (new_data["Longitude"] < 74))]
+
+
+def save_crime_pattern_csv(crime_data, output_mode="w"):
+    # Save the new dataset to a new CSV file, or append to it when output_mode is "a"
+    crime_data.to_csv("../Component_datasets/Crime_Pattern_Analysis_Cleaned.csv", index=False, mode=output_mode, header=output_mode == "w")
 
-    # Save the new dataset to a new CSV file
-    new_data.to_csv("../Component_datasets/Crime_Pattern_Analysis_Cleaned.csv", index=False)
+
+def update_crime_lat_long(new_data, output_mode="w"):
+    logging.info("Started to impute accurate crime's co-ordinates by calculating the crime's direction, distance and it's unit(Km/m/feet) away from the police station co-ordinates details from the dataset ...")
+    new_data = impute_crime_coordinates(new_data)
+
+    save_crime_pattern_csv(new_data, output_mode=output_mode)
+
+    # Columnar copy for the dashboard, which reads only the partitions and columns it needs
+    save_crime_pattern_dataset(new_data, output_mode=output_mode)
+
+    # Crime counts per day, district and crime group for the temporal analysis
+    save_temporal_cube(new_data, output_mode=output_mode)
 
     logging.info("Dataset is processed and ready with accurate crime co-ordinates now")
 
     return new_data
 
 
+def save_crime_pattern_dataset(crime_data, output_mode="w"):
+    # Write the cleaned crimes as a Parquet dataset partitioned by Year/District_Name, with a 'Date' column added for date range filters.
+    # Rows are sorted by date inside every partition and written in small row groups, so the row group statistics let readers skip whole row groups.
+    # In append mode ("a") new files are added next to the existing ones in each partition.
+    dataset_path = "../Component_datasets/Crime_Pattern_Analysis_Cleaned"
+    if output_mode == "w" and os.path.isdir(dataset_path):
+        shutil.rmtree(dataset_path)
+
+    crime_data = crime_data.assign(Date=pd.to_datetime(crime_data[['Year', 'Month', 'Day']]))
+    crime_data = crime_data.sort_values(['Year', 'District_Name', 'Date'])
+
+    crime_data.to_parquet(dataset_path, partition_cols=['Year', 'District_Name'], index=False, max_rows_per_group=PARQUET_ROW_GROUP_SIZE)
+
+    logging.info(" Partitioned Parquet dataset is saved for the Crime Pattern Analysis dashboard")
+
+
+def compact_crime_pattern_dataset():
+    # Rewrite every partition of the Parquet dataset made of several files (one per appended chunk) as a single file sorted
+    # by date with the row groups of save_crime_pattern_dataset, the layout of a dataset written at once. One partition
+    # (one year of one district) is held in memory at a time
+    dataset_path = "../Component_datasets/Crime_Pattern_Analysis_Cleaned"
+    for partition_dir, _, files in os.walk(dataset_path):
+        parquet_files = sorted(name for name in files if name.endswith('.parquet'))
+        if len(parquet_files) < 2:
+            continue
+
+        # Read without the hive partitioning of the path, the Year/District_Name of the partition are not in its files
+        partition = pd.read_parquet([os.path.join(partition_dir, name) for name in parquet_files], partitioning=None)
+        partition = partition.sort_values('Date', kind='stable')
+        partition.to_parquet(os.path.join(partition_dir, 'compacted.parquet.tmp'), index=False, row_group_size=PARQUET_ROW_GROUP_SIZE)
+
+        for name in parquet_files:
+            os.remove(os.path.join(partition_dir, name))
+        os.replace(os.path.join(partition_dir, 'compacted.parquet.tmp'), os.path.join(partition_dir, 'part-0.parquet'))
+
+    logging.info(" Partitions of the Parquet dataset are compacted")
+
+
+def build_temporal_cube(crime_data):
+    # Number of crimes for every (Year, Month, Day, District_Name, CrimeGroup_Name), the Year/Month/Day views of the dashboard are roll-ups of it
+    return crime_data.groupby(TEMPORAL_CUBE_KEYS, observed=True).size().reset_index(name='Count')
+
+
+def sum_temporal_cubes(cubes):
+    # Counts of several cubes added up per key
+    return pd.concat(cubes).groupby(TEMPORAL_CUBE_KEYS, observed=True)['Count'].sum().reset_index()
+
+
+def save_temporal_cube(crime_data, output_mode="w"):
+    save_cube(build_temporal_cube(crime_data), output_mode=output_mode)
+
+
+def save_cube(cube, output_mode="w"):
+    cube_path = "../Component_datasets/Crime_Pattern_Temporal_Cube.csv"
+
+    # In append mode the counts of the new crimes are added to the existing cube
+    if output_mode == "a" and os.path.exists(cube_path):
+        cube = sum_temporal_cubes([pd.read_csv(cube_path), cube])
+
+    cube.to_csv(cube_path, index=False)
+
+    logging.info(" Temporal count cube is saved for the Crime Pattern Analysis dashboard")
+
+
+def clean_crime_pattern_analysis_chunks(chunks):
+    # Streaming version of the clean steps, runs every ingested chunk through clean_data_crime_pattern_analysis and
+    # impute_crime_coordinates, appends it to the cleaned CSV and to the Parquet dataset, so only one chunk of crimes is
+    # held in memory at a time. The temporal cube counts of every chunk are added to a running cube written once, and the
+    # per-chunk Parquet files are compacted into one file per partition at the end
+    total_rows = 0
+    cube = None
+    output_mode = "w"
+    for chunk in chunks:
+        crime_data = impute_crime_coordinates(clean_data_crime_pattern_analysis(chunk))
+        save_crime_pattern_csv(crime_data, output_mode=output_mode)
+        save_crime_pattern_dataset(crime_data, output_mode=output_mode)
+        chunk_cube = build_temporal_cube(crime_data)
+        cube = chunk_cube if cube is None else sum_temporal_cubes([cube, chunk_cube])
+        total_rows += len(crime_data)
+        output_mode = "a"
+
+    if cube is not None:
+        compact_crime_pattern_dataset()
+        save_cube(cube)
+
+    logging.info(f"Streamed {total_rows} cleaned observations into the Crime Pattern Analysis dataset")
+
+    return total_rows
+
+
 
 
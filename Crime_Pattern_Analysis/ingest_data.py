@@ -1,14 +1,29 @@
 import math
+import numpy as np
+import os
 import pandas as pd
 import re
 import logging
 import sys
 
+# Make the shared Data_Pipeline package importable when this module is run from its own directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Data_Pipeline.schema import schema_dtypes
+
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)])
 
+# Columns of the FIR file used by the Crime Pattern Analysis component, with the compact dtypes of the shared schema
+CRIME_PATTERN_DTYPES = schema_dtypes(['District_Name', 'UnitName', 'FIRNo', 'Year', 'Month', 'FIR_Reg_DateTime', 'CrimeGroup_Name',
+                                      'Latitude', 'Longitude', 'Distance from PS', 'VICTIM COUNT', 'Accused Count'])
+
+# Number of FIR rows parsed at a time in streaming mode
+CHUNK_SIZE = 200000
+
+
 def ingest_crime_pattern_analysis():
-    fir_details = pd.read_csv("../datasets/FIR_Details_Data.csv")
+    fir_details = pd.read_csv("../datasets/FIR_Details_Data.csv", dtype=schema_dtypes())
     logging.info("Ingested the raw datasets for Crime Pattern Analysis")
 
     #Feature selection
@@ -24,3 +39,24 @@ def ingest_crime_pattern_analysis():
     return raw_data
 
 
+def drop_seen_duplicates(chunk, seen_rows):
+    # Drop the rows of a chunk that already appeared in this chunk or in any earlier chunk.
+    # Earlier rows are remembered only as a sorted array of 64-bit row hashes, so the memory held between chunks stays small.
+    row_hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+
+    keep = ~pd.Series(row_hashes).duplicated().to_numpy() & ~np.isin(row_hashes, seen_rows, assume_unique=False)
+    seen_rows = np.union1d(seen_rows, row_hashes[keep])
+
+    return chunk[keep], seen_rows
+
+
+def ingest_crime_pattern_analysis_chunks(chunksize=CHUNK_SIZE):
+    # Streaming version of ingest_crime_pattern_analysis, parses only the needed columns with compact dtypes
+    # and yields fixed-size, de-duplicated chunks so the memory used does not grow with the size of the FIR file
+    reader = pd.read_csv("../datasets/FIR_Details_Data.csv", usecols=list(CRIME_PATTERN_DTYPES), dtype=CRIME_PATTERN_DTYPES, chunksize=chunksize)
+
+    seen_rows = np.empty(0, dtype=np.uint64)
+    for chunk_number, chunk in enumerate(reader):
+        chunk, seen_rows = drop_seen_duplicates(chunk[list(CRIME_PATTERN_DTYPES)], seen_rows)
+        logging.info(f" Ingested FIR chunk {chunk_number} with {len(chunk)} new observations for the Crime Pattern Analysis Component")
+        yield chunk
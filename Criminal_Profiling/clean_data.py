@@ -1,9 +1,17 @@
+import os
+import sys
+
 import pandas as pd
 
+# Make the shared Data_Pipeline package importable when this module is run from its own directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Data_Pipeline.schema import fillna_categorical
+
 def clean_Criminal_Profiling(Criminal_Profiling):
 
     features = ['Occupation', 'PresentCity', 'ActSection', 'Crime_Group1', 'Crime_Head2',  'Rowdy_Classification_Details', 'Activities_Description', 'PrevCase_Details', 'Caste' ]
-    Criminal_Profiling[features] = Criminal_Profiling[features].fillna('unknown')
+    Criminal_Profiling[features] = Criminal_Profiling[features].apply(fillna_categorical, value='unknown')
 
     Criminal_Profiling = Criminal_Profiling[['Occupation', 
        'Crime_Group1', 'Crime_Head2','age',
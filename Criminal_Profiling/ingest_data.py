@@ -1,9 +1,17 @@
+import os
+import sys
+
 import pandas as pd
 
+# Make the shared Data_Pipeline package importable when this module is run from its own directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Data_Pipeline.schema import schema_dtypes
+
 def ingest_criminal_profiling():
-    MOB = pd.read_csv("../datasets/MOBsData.csv")
-    rowdy = pd.read_csv("../datasets/RowdySheeterDetails.csv")
-    accused = pd.read_csv("../datasets/AccusedData.csv")
+    MOB = pd.read_csv("../datasets/MOBsData.csv", dtype=schema_dtypes())
+    rowdy = pd.read_csv("../datasets/RowdySheeterDetails.csv", dtype=schema_dtypes())
+    accused = pd.read_csv("../datasets/AccusedData.csv", dtype=schema_dtypes())
 
     accused = accused[(accused['age'] <= 100) & (accused['age'] >= 7) ]
 
@@ -0,0 +1,224 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Make the component packages importable when this module is run from its own directory
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(root_dir)
+
+from Crime_Pattern_Analysis.ingest_data import CHUNK_SIZE, CRIME_PATTERN_DTYPES, drop_seen_duplicates
+from Resource_Allocation.ingest_data import RESOURCE_DTYPES, concat_categorical_chunks
+
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)])
+
+# Union of the FIR columns used by the Crime Pattern Analysis and Resource Allocation components
+FIR_DTYPES = {**CRIME_PATTERN_DTYPES, **RESOURCE_DTYPES}
+
+FIR_PATH = "../datasets/FIR_Details_Data.csv"
+
+# High-water mark of the FIRs already processed: the latest FIR_Reg_DateTime, the FIRNos registered at that exact time,
+# and the byte offset of the FIR file it was read up to (with a hash of the bytes before it to detect a rewritten file)
+WATERMARK_PATH = "../Component_datasets/FIR_Watermark.json"
+WATERMARK_CHECK_BYTES = 65536
+
+
+def ingest_fir_details(chunksize=CHUNK_SIZE):
+    # Parse FIR_Details_Data.csv once into a de-duplicated fact table holding the columns of both components,
+    # string dimensions are kept as categoricals so each distinct district/unit/beat/crime group is stored once
+    chunks = []
+    seen_rows = np.empty(0, dtype=np.uint64)
+    for chunk in read_fir_chunks(chunksize):
+        chunk, seen_rows = drop_seen_duplicates(chunk, seen_rows)
+        chunks.append(chunk)
+
+    fir_details = concat_categorical_chunks(chunks)
+    logging.info(f" Ingested {len(fir_details)} unique FIR observations shared by the Crime Pattern Analysis and Resource Allocation components")
+
+    return fir_details
+
+
+def fir_watermark(fir_details, file_offset):
+    registered = pd.to_datetime(fir_details['FIR_Reg_DateTime'], errors='coerce')
+    latest = registered.max()
+    if pd.isna(latest):
+        return None
+
+    return {
+        'FIR_Reg_DateTime': latest.isoformat(),
+        'FIRNo': sorted(fir_details.loc[registered == latest, 'FIRNo'].dropna().unique().tolist()),
+        'file_offset': file_offset,
+        'file_hash': file_prefix_hash(file_offset)
+    }
+
+
+def advance_watermark(watermark, new_fir_details, file_offset):
+    # Mark after processing the FIRs registered since watermark, FIRNos registered at the same latest time are merged
+    new_watermark = fir_watermark(new_fir_details, file_offset) if not new_fir_details.empty else None
+    if new_watermark is None:
+        return {**watermark, 'file_offset': file_offset, 'file_hash': file_prefix_hash(file_offset)}
+
+    if pd.Timestamp(new_watermark['FIR_Reg_DateTime']) == pd.Timestamp(watermark['FIR_Reg_DateTime']):
+        new_watermark['FIRNo'] = sorted(set(new_watermark['FIRNo']) | set(watermark['FIRNo']))
+    return new_watermark
+
+
+def load_watermark():
+    if not os.path.exists(WATERMARK_PATH):
+        return None
+    with open(WATERMARK_PATH) as f:
+        return json.load(f)
+
+
+def save_watermark(watermark):
+    if watermark is None:
+        return
+    with open(WATERMARK_PATH, 'w') as f:
+        json.dump(watermark, f, indent=2)
+
+
+def complete_lines_offset():
+    # Size of the FIR file up to its last complete line, rows written after it are picked up by the next run
+    with open(FIR_PATH, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        while size > 0:
+            f.seek(max(0, size - WATERMARK_CHECK_BYTES))
+            block = f.read(size - max(0, size - WATERMARK_CHECK_BYTES))
+            newline = block.rfind(b'\n')
+            if newline != -1:
+                return size - len(block) + newline + 1
+            size -= len(block)
+    return 0
+
+
+def file_prefix_hash(file_offset):
+    # Hash of the bytes just before file_offset, if they changed the file was rewritten rather than appended to
+    with open(FIR_PATH, 'rb') as f:
+        f.seek(max(0, file_offset - WATERMARK_CHECK_BYTES))
+        return hashlib.sha1(f.read(file_offset - max(0, file_offset - WATERMARK_CHECK_BYTES))).hexdigest()
+
+
+def newer_than_watermark(chunk, watermark):
+    # FIRs registered after the mark, or at the mark itself under a FIRNo that was not processed yet.
+    # Rows whose FIR_Reg_DateTime cannot be parsed are never newer
+    registered = pd.to_datetime(chunk['FIR_Reg_DateTime'], errors='coerce')
+    latest = pd.Timestamp(watermark['FIR_Reg_DateTime'])
+
+    return (registered > latest) | ((registered == latest) & ~chunk['FIRNo'].isin(watermark['FIRNo']))
+
+
+def read_fir_chunks(chunksize, watermark=None):
+    # Chunks of the FIR file, starting from the offset of the watermark when the file was only appended to since then
+    header = pd.read_csv(FIR_PATH, nrows=0).columns.tolist()
+    file_offset = watermark['file_offset'] if watermark else 0
+    if file_offset and (os.path.getsize(FIR_PATH) < file_offset or file_prefix_hash(file_offset) != watermark['file_hash']):
+        logging.info(" FIR file was rewritten since the last run, scanning it from the start")
+        file_offset = 0
+
+    if file_offset >= os.path.getsize(FIR_PATH):
+        return
+
+    with open(FIR_PATH, 'rb') as f:
+        if file_offset:
+            f.seek(file_offset)
+            reader = pd.read_csv(f, header=None, names=header, usecols=list(FIR_DTYPES), dtype=FIR_DTYPES, chunksize=chunksize)
+        else:
+            reader = pd.read_csv(f, usecols=list(FIR_DTYPES), dtype=FIR_DTYPES, chunksize=chunksize)
+
+        for chunk in reader:
+            yield chunk[list(FIR_DTYPES)]
+
+
+def crime_pattern_view(fir_details):
+    # Same columns and row set as ingest_crime_pattern_analysis, clean_data_crime_pattern_analysis drops the duplicates of this projection.
+    # The projection already owns its columns, the shallow copy only detaches it from the fact table so it can be cleaned in place
+    return fir_details[list(CRIME_PATTERN_DTYPES)].copy(deep=False)
+
+
+def resource_view(fir_details):
+    # Same columns and row set as ingest_resource_data
+    return fir_details[list(RESOURCE_DTYPES)].drop_duplicates()
+
+
+def beat_history_view(fir_details):
+    # FIRs of every beat with their year and month, for the beat monthly counts of the Resource Allocation component.
+    # Rows of the de-duplicated fact table are counted as they are, so counts added by the incremental refresh (from FIRs
+    # newer than the watermark only) add up to the counts of a full rebuild
+    from Resource_Allocation.clean_data import BEAT_HISTORY_COLUMNS
+    return fir_details[BEAT_HISTORY_COLUMNS]
+
+
+def ingest_new_fir_details(watermark, chunksize=CHUNK_SIZE):
+    # FIR rows registered after the watermark, de-duplicated like ingest_fir_details
+    chunks = []
+    seen_rows = np.empty(0, dtype=np.uint64)
+    for chunk in read_fir_chunks(chunksize, watermark):
+        chunk, seen_rows = drop_seen_duplicates(chunk[newer_than_watermark(chunk, watermark).to_numpy()], seen_rows)
+        chunks.append(chunk)
+
+    new_fir_details = concat_categorical_chunks(chunks)
+    logging.info(f" Ingested {len(new_fir_details)} FIR observations registered after {watermark['FIR_Reg_DateTime']}")
+
+    return new_fir_details
+
+
+def build_fir_components(chunksize=CHUNK_SIZE):
+    # Full rebuild of the FIR based components from a single parse of the FIR file
+    from Crime_Pattern_Analysis.clean_data import clean_data_crime_pattern_analysis, update_crime_lat_long
+    from Resource_Allocation.clean_data import clean_resource_data, save_beat_monthly_counts
+
+    file_offset = complete_lines_offset()
+    fir_details = ingest_fir_details(chunksize)
+
+    crime_data = clean_data_crime_pattern_analysis(crime_pattern_view(fir_details))
+    update_crime_lat_long(crime_data)
+
+    clean_resource_data(resource_view(fir_details))
+    save_beat_monthly_counts(beat_history_view(fir_details))
+
+    save_watermark(fir_watermark(fir_details, file_offset))
+
+
+def update_fir_components(chunksize=CHUNK_SIZE):
+    # Incremental refresh: only the FIRs registered after the watermark are cleaned and appended to the Crime Pattern Analysis
+    # outputs, and added to the Resource Allocation beat aggregates. Falls back to a full rebuild when there is no watermark yet
+    from Crime_Pattern_Analysis.clean_data import clean_data_crime_pattern_analysis, update_crime_lat_long
+    from Resource_Allocation.clean_data import update_beat_monthly_counts, update_resource_data
+
+    watermark = load_watermark()
+    if watermark is None:
+        logging.info(" No FIR watermark found, running a full rebuild")
+        return build_fir_components(chunksize)
+
+    file_offset = complete_lines_offset()
+    new_fir_details = ingest_new_fir_details(watermark, chunksize)
+    if new_fir_details.empty:
+        save_watermark(advance_watermark(watermark, new_fir_details, file_offset))
+        logging.info(" No new FIRs since the last run")
+        return
+
+    crime_data = clean_data_crime_pattern_analysis(crime_pattern_view(new_fir_details))
+    update_crime_lat_long(crime_data, output_mode="a")
+
+    new_beat_rows = update_resource_data(resource_view(new_fir_details))
+    logging.info(f" Added {new_beat_rows} new FIR rows to the Resource Allocation beat aggregates")
+    update_beat_monthly_counts(beat_history_view(new_fir_details))
+
+    save_watermark(advance_watermark(watermark, new_fir_details, file_offset))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the Crime Pattern Analysis and Resource Allocation datasets from the FIR file")
+    parser.add_argument('--incremental', action='store_true', help="only process the FIRs registered since the last run")
+    args = parser.parse_args()
+
+    if args.incremental:
+        update_fir_components()
+    else:
+        build_fir_components()
@@ -0,0 +1,336 @@
+import argparse
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Make the component packages importable when this module is run from its own directory
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(root_dir)
+
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)])
+
+# Stage fingerprints, the outputs they produced and the content hashes of every file seen (keyed by size/mtime so unchanged
+# files are not hashed again), plus the intermediate results passed between stages that have no dataset of their own
+CACHE_DIR = os.path.join(root_dir, '.pipeline_cache')
+STATE_PATH = os.path.join(CACHE_DIR, 'state.json')
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def load_component_module(component_dir, module_name):
+    # Criminal_Profiling and Recidivism_Prediction both have ingest_data/clean_data modules that are not packages,
+    # so they are loaded from their file under a name unique to the component
+    path = os.path.join(root_dir, component_dir, f"{module_name}.py")
+    unique_name = f"{component_dir.replace(os.sep, '_').replace('/', '_')}_{module_name}"
+    if unique_name in sys.modules:
+        return sys.modules[unique_name]
+
+    spec = importlib.util.spec_from_file_location(unique_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[unique_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_fir_components():
+    from Data_Pipeline.fir_ingest import build_fir_components
+    build_fir_components()
+
+
+def run_resource_allocation_plan():
+    from Resource_Allocation.allocate_statewide import allocate_statewide
+    allocate_statewide()
+
+
+def run_resource_forecast_model():
+    from Resource_Allocation.forecast_beat_counts import save_fitted_beat_count_model
+    save_fitted_beat_count_model()
+
+
+def run_criminal_profiling():
+    ingest_data = load_component_module('Criminal_Profiling', 'ingest_data')
+    clean_data = load_component_module('Criminal_Profiling', 'clean_data')
+    clean_data.clean_Criminal_Profiling(ingest_data.ingest_criminal_profiling())
+
+
+def run_recidivism_clean():
+    ingest_data = load_component_module('Predictive_Modeling/Recidivism_Prediction', 'ingest_data')
+    clean_data = load_component_module('Predictive_Modeling/Recidivism_Prediction', 'clean_data')
+    clean_data.clean_recividism_model(ingest_data.ingest_recidivism_data())
+
+
+def run_recidivism_encode():
+    import pandas as pd
+
+    # The encoding is written to the cache, not over the one the shipped model was trained with: it only replaces
+    # models/Recidivism_model/frequency_encoding.json when recidivism_train trains a model on it
+    transform_data = load_component_module('Predictive_Modeling/Recidivism_Prediction', 'transform_data')
+    cleaned_data = pd.read_csv("../Component_datasets/Recidivism_cleaned_data.csv", index_col=0)
+    encoded_data = transform_data.frequency_encoding(cleaned_data, output_dir=CACHE_DIR)
+
+    with open(os.path.join(CACHE_DIR, 'recidivism_encoded.pkl'), 'wb') as f:
+        pickle.dump(encoded_data, f)
+
+
+def run_recidivism_train():
+    train_model = load_component_module('Predictive_Modeling/Recidivism_Prediction', 'train_model')
+    with open(os.path.join(CACHE_DIR, 'recidivism_encoded.pkl'), 'rb') as f:
+        train_model.train_recidivism_model(pickle.load(f))
+    shutil.copyfile(os.path.join(CACHE_DIR, 'frequency_encoding.json'), "../models/Recidivism_model/frequency_encoding.json")
+
+
+# Pipeline stages: the directory they run from (the component code uses paths relative to it), the function run, the code
+# and input files their fingerprint is made of, and the files/directories they write. A stage depends on the stages
+# writing its inputs, stages with no path between them run concurrently
+STAGES = {
+    'fir_components': {
+        'cwd': 'Data_Pipeline',
+        'run': run_fir_components,
+        'code': ['Data_Pipeline/fir_ingest.py', 'Data_Pipeline/schema.py',
+                 'Crime_Pattern_Analysis/ingest_data.py', 'Crime_Pattern_Analysis/clean_data.py',
+                 'Resource_Allocation/ingest_data.py', 'Resource_Allocation/clean_data.py'],
+        'inputs': ['datasets/FIR_Details_Data.csv', 'datasets/Polce_Stations_Lat_Long.csv'],
+        'outputs': ['Component_datasets/Crime_Pattern_Analysis_Cleaned.csv', 'Component_datasets/Crime_Pattern_Analysis_Cleaned',
+                    'Component_datasets/Crime_Pattern_Temporal_Cube.csv', 'Component_datasets/Resource_Allocation_Cleaned.csv',
+                    'Component_datasets/Resource_Allocation_Beat_Monthly_Counts.parquet']
+    },
+    'resource_allocation_plan': {
+        'cwd': 'Resource_Allocation',
+        'run': run_resource_allocation_plan,
+        'code': ['Resource_Allocation/allocate_statewide.py', 'app/Resource_Allocation_Solver.py'],
+        'inputs': ['Component_datasets/Resource_Allocation_Cleaned.csv'],
+        'outputs': ['Component_datasets/Resource_Allocation_Plan.csv', 'Component_datasets/Resource_Allocation_Solve_Times.csv']
+    },
+    'resource_forecast_model': {
+        'cwd': 'Resource_Allocation',
+        'run': run_resource_forecast_model,
+        'code': ['Resource_Allocation/forecast_beat_counts.py', 'app/Resource_Forecasting.py'],
+        'inputs': ['Component_datasets/Resource_Allocation_Beat_Monthly_Counts.parquet'],
+        'outputs': ['models/Resource_Allocation_model/beat_count_model.npz']
+    },
+    'criminal_profiling': {
+        'cwd': 'Criminal_Profiling',
+        'run': run_criminal_profiling,
+        'code': ['Criminal_Profiling/ingest_data.py', 'Criminal_Profiling/clean_data.py', 'Data_Pipeline/schema.py'],
+        'inputs': ['datasets/MOBsData.csv', 'datasets/RowdySheeterDetails.csv', 'datasets/AccusedData.csv'],
+        'outputs': ['Component_datasets/Criminal_Profiling_cleaned.csv']
+    },
+    'recidivism_clean': {
+        'cwd': 'Predictive_Modeling',
+        'run': run_recidivism_clean,
+        'code': ['Predictive_Modeling/Recidivism_Prediction/ingest_data.py', 'Predictive_Modeling/Recidivism_Prediction/clean_data.py',
+                 'Data_Pipeline/schema.py'],
+        'inputs': ['datasets/AccusedData.csv'],
+        'outputs': ['Component_datasets/Recidivism_cleaned_data.csv']
+    },
+    'recidivism_encode': {
+        'cwd': 'Predictive_Modeling',
+        'run': run_recidivism_encode,
+        'code': ['Predictive_Modeling/Recidivism_Prediction/transform_data.py'],
+        'inputs': ['Component_datasets/Recidivism_cleaned_data.csv'],
+        'outputs': ['.pipeline_cache/frequency_encoding.json', '.pipeline_cache/recidivism_encoded.pkl']
+    },
+    'recidivism_train': {
+        'cwd': 'Predictive_Modeling',
+        'run': run_recidivism_train,
+        'code': ['Predictive_Modeling/Recidivism_Prediction/train_model.py'],
+        'inputs': ['.pipeline_cache/recidivism_encoded.pkl', '.pipeline_cache/frequency_encoding.json'],
+        'outputs': ['models/Recidivism_model/scaler.pkl', 'models/Recidivism_model/frequency_encoding.json']
+    }
+}
+
+# Stages left out unless asked for by name, training needs an H2O cluster (Java) and takes up to 15 minutes
+OPTIONAL_STAGES = {'recidivism_train'}
+
+
+def stage_dependencies(name):
+    return sorted(other for other, stage in STAGES.items()
+                  if other != name and set(stage['outputs']) & set(STAGES[name]['inputs']))
+
+
+def select_stages(targets=None):
+    # The requested stages and every stage upstream of them
+    selected = set()
+    pending = list(targets or [name for name in STAGES if name not in OPTIONAL_STAGES])
+    while pending:
+        name = pending.pop()
+        if name not in STAGES:
+            raise ValueError(f"Unknown pipeline stage '{name}', expected one of {', '.join(STAGES)}")
+        if name not in selected:
+            selected.add(name)
+            pending.extend(stage_dependencies(name))
+    return selected
+
+
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return {'files': {}, 'stages': {}}
+    with open(STATE_PATH) as f:
+        return json.load(f)
+
+
+def save_state(state):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(STATE_PATH + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(STATE_PATH + '.tmp', STATE_PATH)
+
+
+def file_hash(path, state):
+    # SHA-256 of a file, reused from the state while its size and modification time are unchanged
+    key = os.path.relpath(path, root_dir)
+    stat = os.stat(path)
+    cached = state['files'].get(key)
+    if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+        return cached['sha256']
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+
+    state['files'][key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+    return digest.hexdigest()
+
+
+def path_hash(relative_path, state):
+    # Content hash of a file or of every file of a directory (e.g. a partitioned Parquet dataset), None when it does not exist
+    path = os.path.join(root_dir, relative_path)
+    if os.path.isfile(path):
+        return file_hash(path, state)
+    if not os.path.isdir(path):
+        return None
+
+    digest = hashlib.sha256()
+    for directory, subdirectories, files in os.walk(path):
+        subdirectories.sort()
+        for file_name in sorted(files):
+            file_path = os.path.join(directory, file_name)
+            digest.update(os.path.relpath(file_path, path).encode())
+            digest.update(file_hash(file_path, state).encode())
+    return digest.hexdigest()
+
+
+def stage_fingerprint(name, state):
+    # Hash of the stage's code and input contents, a stage whose fingerprint and outputs are unchanged is skipped
+    digest = hashlib.sha256(name.encode())
+    for relative_path in STAGES[name]['code'] + STAGES[name]['inputs']:
+        content_hash = path_hash(relative_path, state)
+        if content_hash is None:
+            raise FileNotFoundError(f"Stage '{name}' needs {relative_path}, which does not exist")
+        digest.update(f"{relative_path}:{content_hash}".encode())
+    return digest.hexdigest()
+
+
+def stage_is_fresh(name, fingerprint, state):
+    recorded = state['stages'].get(name)
+    if recorded is None or recorded['fingerprint'] != fingerprint:
+        return False
+    return all(path_hash(output, state) == output_hash for output, output_hash in recorded['outputs'].items())
+
+
+def run_stage(name):
+    # Runs in a worker process, from the directory the component code expects
+    os.chdir(os.path.join(root_dir, STAGES[name]['cwd']))
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    start = time.perf_counter()
+    STAGES[name]['run']()
+    return time.perf_counter() - start
+
+
+def run_pipeline(targets=None, force=False, workers=None, dry_run=False):
+    # Runs the selected stages in dependency order, each stage starting as soon as all the stages it depends on are done.
+    # Returns the names of the stages that failed (their downstream stages are not run)
+    selected = select_stages(targets)
+    state = load_state()
+
+    pending = set(selected)
+    done, failed, rerun = set(), set(), set()
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        while pending or running:
+            progress = False
+            for name in sorted(pending):
+                dependencies = [dependency for dependency in stage_dependencies(name) if dependency in selected]
+                if any(dependency in failed for dependency in dependencies):
+                    pending.discard(name)
+                    failed.add(name)
+                    logging.error(f" Skipping '{name}', a stage it depends on failed")
+                    continue
+                if not all(dependency in done for dependency in dependencies):
+                    continue
+
+                pending.discard(name)
+                progress = True
+                if dry_run and any(dependency in rerun for dependency in dependencies):
+                    logging.info(f" '{name}' would run after the stages it depends on")
+                    rerun.add(name)
+                    done.add(name)
+                    continue
+
+                try:
+                    fingerprint = stage_fingerprint(name, state)
+                except FileNotFoundError as error:
+                    logging.error(f" {error}")
+                    failed.add(name)
+                    continue
+
+                if not force and stage_is_fresh(name, fingerprint, state):
+                    logging.info(f" '{name}' is up to date")
+                    done.add(name)
+                elif dry_run:
+                    logging.info(f" '{name}' would run")
+                    rerun.add(name)
+                    done.add(name)
+                else:
+                    logging.info(f" Running '{name}'")
+                    running[pool.submit(run_stage, name)] = (name, fingerprint)
+
+            if not running:
+                # Stages marked done or failed above may have made other stages ready
+                if pending and not progress:
+                    raise RuntimeError(f"Pipeline stages {sorted(pending)} can never become ready")
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fingerprint = running.pop(future)
+                try:
+                    elapsed = future.result()
+                except Exception:
+                    logging.exception(f" Stage '{name}' failed")
+                    failed.add(name)
+                    continue
+
+                state['stages'][name] = {
+                    'fingerprint': fingerprint,
+                    'outputs': {output: path_hash(output, state) for output in STAGES[name]['outputs']}
+                }
+                save_state(state)
+                done.add(name)
+                logging.info(f" '{name}' finished in {elapsed:.1f}s")
+
+    save_state(state)
+    return failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the component pipelines, skipping the stages whose code and inputs did not change")
+    parser.add_argument('stages', nargs='*', help=f"stages to bring up to date with their upstream stages (default: all but {', '.join(sorted(OPTIONAL_STAGES))})")
+    parser.add_argument('--force', action='store_true', help="run the selected stages even when they are up to date")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument('--dry-run', action='store_true', help="only list the stages that would run")
+    args = parser.parse_args()
+
+    failed = run_pipeline(args.stages, force=args.force, workers=args.workers, dry_run=args.dry_run)
+    sys.exit(1 if failed else 0)
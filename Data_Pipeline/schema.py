@@ -0,0 +1,56 @@
+import pandas as pd
+
+# Compact dtype of every column read from the raw datasets, applied by all the ingest functions.
+# Low-cardinality strings are categoricals (each distinct district/unit/caste/... is stored once and groupbys/merges work on
+# integer codes), counts/years/months are nullable downcast integers and age is float32.
+# Coordinates stay float64, as parsed from the raw files: float32 rounds them to steps of about 1e-6 degrees, which changes
+# the values written to the cleaned datasets and the crime co-ordinates computed from them, for 8 bytes saved per row.
+# Identifiers and free text (FIR numbers, names, addresses) are high-cardinality and stay plain strings.
+DTYPE_SCHEMA = {
+    'District_Name': 'category',
+    'UnitName': 'category',
+    'Unit_Name': 'category',
+    'CrimeGroup_Name': 'category',
+    'Beat_Name': 'category',
+    'Village_Area_Name': 'category',
+    'Caste': 'category',
+    'Profession': 'category',
+    'Occupation': 'category',
+    'Sex': 'category',
+    'PresentCity': 'category',
+    'PresentState': 'category',
+    'PermanentCity': 'category',
+    'PermanentState': 'category',
+    'Nationality_Name': 'category',
+    'Crime_Group1': 'category',
+    'Crime_Head2': 'category',
+    'FIRNo': str,
+    'FIR_Reg_DateTime': str,
+    'Distance from PS': str,
+    'Year': 'Int16',
+    'Month': 'Int8',
+    'VICTIM COUNT': 'Int32',
+    'Accused Count': 'Int32',
+    'Latitude': 'float64',
+    'Longitude': 'float64',
+    'age': 'float32'
+}
+
+# Keys of the temporal count cube of the crime patterns, written by the Crime Pattern Analysis pipeline and read (or built
+# when it is missing) by the dashboard
+TEMPORAL_CUBE_KEYS = ['Year', 'Month', 'Day', 'District_Name', 'CrimeGroup_Name']
+
+
+def schema_dtypes(columns=None):
+    # Dtypes of the given columns (all the schema when no columns are given), in the order of the columns.
+    # Passed as read_csv(dtype=...), the columns that are not in the schema or not in the file are parsed as usual
+    if columns is None:
+        return dict(DTYPE_SCHEMA)
+    return {column: DTYPE_SCHEMA[column] for column in columns if column in DTYPE_SCHEMA}
+
+
+def fillna_categorical(column, value):
+    # Series.fillna that also works on categorical columns, the fill value is added to the categories first
+    if isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories:
+        column = column.cat.add_categories([value])
+    return column.fillna(value)
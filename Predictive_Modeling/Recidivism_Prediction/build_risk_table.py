@@ -0,0 +1,74 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Make the recidivism modules of the app importable when this module is run from its own directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'app')))
+
+from Recidivism_Encoder import load_recidivism_encoder
+from Recidivism_Risk_Table import MAX_RISK_TABLE_ROWS, risk_index_path, risk_table_index, risk_table_path, score_risk_rows
+from Recidivism_Scorer import load_recidivism_scorer
+
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)])
+
+# Table entries scored at once by a worker
+CHUNK_SIZE = 200_000
+
+# Scorer, encoder and table index of a worker process, loaded once by load_worker_model
+worker_model = {}
+
+
+def load_worker_model(index):
+    worker_model.update({'scorer': load_recidivism_scorer(), 'encoder': load_recidivism_encoder(), 'index': index})
+
+
+def score_chunk(start, stop):
+    return start, score_risk_rows(worker_model['scorer'], worker_model['encoder'], worker_model['index'], start, stop)
+
+
+def build_risk_table(chunk_size=CHUNK_SIZE, workers=None):
+    # Scores every input tuple of the prediction form (age x the classes of every categorical feature) and writes the
+    # probabilities to risk_table.npy, which the app memory-maps, with the index mapping a form input to its entry. Both
+    # are written next to the scorer under a temporary name and renamed, the index last
+    scorer, encoder = load_recidivism_scorer(), load_recidivism_encoder()
+    if scorer is None:
+        raise FileNotFoundError("No StackedEnsemble MOJO in models/Recidivism_model, train the recidivism model first")
+
+    index = risk_table_index(scorer, encoder)
+    n_rows = int(np.prod(index['shape']))
+    if n_rows > MAX_RISK_TABLE_ROWS:
+        raise ValueError(f"The input space has {n_rows} tuples, more than the {MAX_RISK_TABLE_ROWS} a risk table holds")
+    logging.info(f" {n_rows} input tuples, classes per feature: {dict(zip(encoder['features'], index['shape'].tolist()))}")
+
+    start_time = time.perf_counter()
+    table_tmp_path = f"{risk_table_path}.tmp.npy"
+    table = np.lib.format.open_memmap(table_tmp_path, mode='w+', dtype=np.float64, shape=(n_rows,))
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=load_worker_model, initargs=(index,)) as pool:
+        starts = range(0, n_rows, chunk_size)
+        for start, probability in pool.map(score_chunk, starts, [min(start + chunk_size, n_rows) for start in starts]):
+            table[start:start + len(probability)] = probability
+    table.flush()
+    del table
+
+    index_tmp_path = f"{risk_index_path}.tmp.npz"
+    np.savez(index_tmp_path, **index)
+    os.replace(table_tmp_path, risk_table_path)
+    os.replace(index_tmp_path, risk_index_path)
+
+    logging.info(f" Risk table of {n_rows} tuples ({n_rows * 8 / 1e6:.0f} MB) built in {time.perf_counter() - start_time:.1f}s")
+    return n_rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute the recidivism probability of every input of the prediction form")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help=f"table entries scored at once (default: {CHUNK_SIZE})")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    args = parser.parse_args()
+
+    build_risk_table(chunk_size=args.chunk_size, workers=args.workers)
@@ -1,9 +1,16 @@
+import os
+import sys
+
 import pandas as pd
 
+# Make the shared Data_Pipeline package importable when this module is run from its own directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from Data_Pipeline.schema import schema_dtypes
 
 
 def ingest_recidivism_data():
-   acused = pd.read_csv("../datasets/AccusedData.csv")
+   acused = pd.read_csv("../datasets/AccusedData.csv", dtype=schema_dtypes())
 
    acused.dropna(subset = ['age', 'Caste', 'Profession', 'Sex',
        'PresentCity', 'PresentState', 'Person_No'], inplace = True)
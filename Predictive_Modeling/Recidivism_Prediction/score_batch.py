@@ -0,0 +1,133 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Make the shared Data_Pipeline package and the recidivism scorer of the app importable when this module is run from its
+# own directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'app')))
+
+from Data_Pipeline.schema import schema_dtypes
+from Recidivism_Encoder import category_codes, encode, load_recidivism_encoder
+from Recidivism_Scorer import check_features, load_recidivism_scorer, predict_proba, recidivism_model_dir
+
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)])
+
+# Rows read, encoded and scored at once by a worker. The scorer walks every row down every tree together, a chunk costs a
+# few (rows x trees) int arrays
+CHUNK_SIZE = 100_000
+
+# Identifiers of the accused records copied to the predictions when the input has them
+ID_COLUMNS = ['FIRNo', 'Person_No', 'Arr_ID']
+
+# Scorer and feature encoder of a worker process, loaded once by load_worker_model
+worker_model = {}
+
+
+def load_batch_model(model_dir=recidivism_model_dir):
+    # Everything a chunk is scored with: the NumPy scorer and the compiled feature encoder
+    scorer = load_recidivism_scorer(model_dir)
+    if scorer is None:
+        raise FileNotFoundError(f"No StackedEnsemble MOJO in {model_dir}, train the recidivism model first")
+
+    encoder = load_recidivism_encoder(model_dir)
+    check_features(scorer, encoder, model_dir)
+
+    return {'scorer': scorer, 'encoder': encoder, 'features': encoder['features']}
+
+
+def load_worker_model(model_dir):
+    worker_model.update(load_batch_model(model_dir))
+
+
+def encode_features(chunk, encoder):
+    # (n_rows, n_features) scaled feature matrix of a chunk of accused records. The codes of the categorical columns are
+    # looked up once per distinct value (their categories) and taken by category code, -1 (missing) taking the unseen code
+    codes = []
+    for i in encoder['categorical']:
+        feature = encoder['features'][i]
+        column = chunk[feature].astype('category').cat
+        lookup = np.append(category_codes(encoder, feature, column.categories.astype(str)), len(encoder['categories'][feature]))
+        codes.append(lookup[column.codes.to_numpy()])
+
+    numeric = chunk[[encoder['features'][i] for i in encoder['numeric']]].to_numpy(dtype=np.float64, na_value=np.nan)
+    return encode(encoder, np.column_stack(codes), numeric)
+
+
+def score_chunk(chunk):
+    # Recidivism probability and prediction of every row of a chunk, run in a worker process
+    model = worker_model
+    probability, _ = predict_proba(model['scorer'], encode_features(chunk, model['encoder']))
+
+    predictions = chunk.drop(columns=model['features']).reset_index(drop=True)
+    predictions['Recidivism_Probability'] = probability
+    predictions['Recidivism'] = (probability >= model['scorer']['threshold']).astype(np.int8)
+    return predictions
+
+
+def prediction_schema(id_columns):
+    # Parquet schema of the predictions, fixed up front so a chunk whose identifiers are all missing has the same schema
+    return pa.schema([(column, pa.string()) for column in id_columns]
+                     + [('Recidivism_Probability', pa.float64()), ('Recidivism', pa.int8())])
+
+
+def write_predictions(writer, predictions):
+    writer.write_table(pa.Table.from_pandas(predictions, schema=writer.schema, preserve_index=False))
+    return len(predictions)
+
+
+def score_accused_records(input_path, output_path, chunk_size=CHUNK_SIZE, workers=None, model_dir=recidivism_model_dir):
+    # Scores every accused record of an AccusedData.csv-shaped file and writes the identifiers of the records with their
+    # recidivism probability and prediction to a Parquet file, in the order of the input. The file is streamed in chunks
+    # scored in parallel, at most two chunks per worker are in flight
+    workers = workers or os.cpu_count()
+    features = [str(feature) for feature in load_batch_model(model_dir)['features']]
+
+    header = pd.read_csv(input_path, nrows=0).columns
+    missing = [feature for feature in features if feature not in header]
+    if missing:
+        raise ValueError(f"Columns missing from {input_path}: {', '.join(missing)}")
+    id_columns = [column for column in ID_COLUMNS if column in header]
+
+    # Identifiers are read as strings, their type in the Parquet schema
+    chunks = pd.read_csv(input_path, usecols=id_columns + features, chunksize=chunk_size,
+                         dtype={**schema_dtypes(features), **{column: str for column in id_columns}})
+
+    start = time.perf_counter()
+    n_rows = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_worker_model, initargs=(model_dir,)) as pool, \
+            pq.ParquetWriter(output_path, prediction_schema(id_columns)) as writer:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(score_chunk, chunk))
+            # Chunks are written in input order as soon as the oldest one is scored
+            while len(pending) >= 2 * workers or (pending and pending[0].done()):
+                n_rows += write_predictions(writer, pending.popleft().result())
+
+        while pending:
+            n_rows += write_predictions(writer, pending.popleft().result())
+
+    elapsed = time.perf_counter() - start
+    logging.info(f" Scored {n_rows} accused records in {elapsed:.2f}s ({n_rows / max(elapsed, 1e-9):.0f} rows/s), written to {output_path}")
+    return n_rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Score the recidivism model over every accused record of a CSV file")
+    parser.add_argument('input', help="CSV of accused records with the columns of AccusedData.csv")
+    parser.add_argument('output', help="Parquet file the predictions are written to")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help=f"rows scored at once (default: {CHUNK_SIZE})")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    args = parser.parse_args()
+
+    score_accused_records(args.input, args.output, chunk_size=args.chunk_size, workers=args.workers)
@@ -7,25 +7,26 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
 
-def frequency_encoding(cleaned_data):
+def frequency_encoding(cleaned_data, output_dir='../models/Recidivism_model'):
     # Frequency/ Count Encoding
     categorical_columns = ['District_Name', 'Caste', 'Profession', 'PresentCity']
 
     value_count_dict = {}
     for col in categorical_columns:
+        # Categorical columns also count their unused categories, only the values that occur are encoded
         value = cleaned_data[col].value_counts()
+        value = value[value > 0]
         value_count_dict[col] = value.to_dict()
-        cleaned_data[col] = cleaned_data[col].map(value_count_dict[col])
+        cleaned_data[col] = cleaned_data[col].map(value_count_dict[col]).astype('int64')
 
 
-    output_dir = os.path.abspath('../models/Recidivism_model')
+    output_dir = os.path.abspath(output_dir)
     encoding_file_path = os.path.join(output_dir, 'frequency_encoding.json')
 
     
 
     # Automatically create the directory if it does not exist
-    if not os.path.exists(encoding_file_path):
-        os.makedirs(encoding_file_path)
+    os.makedirs(output_dir, exist_ok=True)
 
 
     # Example for saving frequency encoding dictionary
@@ -0,0 +1,96 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# Make the allocation solver of the app importable when this module is run from its own directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+from Resource_Allocation_Solver import ALLOCATION_COLUMNS, RANKS, allocate_district
+
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)])
+
+RESOURCE_ALLOCATION_PATH = "../Component_datasets/Resource_Allocation_Cleaned.csv"
+ALLOCATION_PLAN_PATH = "../Component_datasets/Resource_Allocation_Plan.csv"
+SOLVE_TIMES_PATH = "../Component_datasets/Resource_Allocation_Solve_Times.csv"
+
+# Sanctioned strength columns of the cleaned resource dataset, in the order of RANKS
+SANCTION_COLUMNS = ['Sanctioned Strength of Assistant Sub-Inspectors per District',
+                    'Sanctioned Strength of Head Constables per District',
+                    'Sanctioned Strength of Police Constables per District']
+
+PLAN_COLUMNS = ['District Name', 'Police Unit', 'Village Area Name', 'Beat Name', 'Normalised Crime Severity'] + ALLOCATION_COLUMNS
+
+
+def load_sanctioned_strengths(df, revision_path=None):
+    # Sanctioned strengths of every district, {district: {'ASI': .., 'CHC': .., 'CPC': ..}}, from the cleaned dataset and
+    # overridden by the districts of a revision file in the same format
+    strengths = {district: dict(zip(RANKS, frame[SANCTION_COLUMNS].iloc[0].astype(int)))
+                 for district, frame in df.groupby("District Name", sort=False)}
+
+    if revision_path is not None:
+        with open(revision_path) as f:
+            revision = json.load(f)
+
+        unknown = sorted(set(revision) - set(strengths))
+        if unknown:
+            raise ValueError(f"Districts not in the resource dataset: {', '.join(unknown)}")
+
+        for district, revised in revision.items():
+            strengths[district].update({rank: int(revised[rank]) for rank in RANKS if rank in revised})
+
+    return strengths
+
+
+def solve_district(district, beats, strengths, method='greedy'):
+    # Allocation of one district, run in a worker process. Returns the district, its allocated beats and the solve time
+    start = time.perf_counter()
+    allocated = allocate_district(beats, *(strengths[rank] for rank in RANKS), method=method)
+    return district, allocated, time.perf_counter() - start
+
+
+def allocate_statewide(revision_path=None, method='greedy', workers=None):
+    # Solves every district of the cleaned resource dataset in parallel and writes the statewide plan (one row per beat
+    # with its allocated ASI/CHC/CPC, in the order of the dataset) and the solve time of every district
+    df = pd.read_csv(RESOURCE_ALLOCATION_PATH)
+    strengths = load_sanctioned_strengths(df, revision_path)
+    districts = dict(tuple(df.groupby("District Name", sort=False)))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        results = list(pool.map(solve_district, districts, districts.values(), [strengths[district] for district in districts],
+                                [method] * len(districts)))
+    elapsed = time.perf_counter() - start
+
+    plan = pd.concat([allocated for _, allocated, _ in results]).sort_index()
+    plan[PLAN_COLUMNS].to_csv(ALLOCATION_PLAN_PATH, index=False)
+
+    solve_times = pd.DataFrame({
+        'District Name': [district for district, _, _ in results],
+        'Beats': [len(allocated) for _, allocated, _ in results],
+        **{f"Sanctioned {rank}": [strengths[district][rank] for district, _, _ in results] for rank in RANKS},
+        'Solve Time (s)': [seconds for _, _, seconds in results]
+    })
+    solve_times.to_csv(SOLVE_TIMES_PATH, index=False)
+
+    for row in solve_times.itertuples(index=False):
+        logging.info(f" {row[0]}: {row[1]} beats solved in {row[-1] * 1000:.1f} ms")
+    logging.info(f" Allocated {len(plan)} beats of {len(districts)} districts in {elapsed:.2f}s")
+
+    return plan, solve_times
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Allocate the sanctioned strengths of every district to its beats")
+    parser.add_argument('--strengths', default=None, help="JSON file of revised sanctioned strengths, {district: {\"ASI\": .., \"CHC\": .., \"CPC\": ..}}")
+    parser.add_argument('--method', choices=['greedy', 'pulp'], default='greedy', help="allocation solver (default: greedy water-filling)")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    args = parser.parse_args()
+
+    allocate_statewide(args.strengths, method=args.method, workers=args.workers)
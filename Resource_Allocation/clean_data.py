@@ -1,13 +1,16 @@
+import os
+import sys
+
 import numpy as np
 import pandas as pd
 
+# Make the Resource_Allocation package importable when this module is run from its own directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-def clean_resource_data(df):
-    df["Total Crimes per beat"] = df.groupby(["District_Name", "UnitName", "Village_Area_Name", "Beat_Name"])["FIRNo"].transform("count")
-
-    df = df[(df["District_Name"]!= "CID") & (df["District_Name"]!= "ISD Bengaluru") & (df["District_Name"]!= "Coastal Security Police")]
+from Resource_Allocation.ingest_data import concat_categorical_chunks
 
-    sanction_strength = {
+# Sanctioned strength of Assistant Sub-Inspectors (ASI), Head Constables (CHC) and Police Constables (CPC) per police district
+SANCTION_STRENGTH = {
     "COP, BANGALORE CITY": {"ASI": 1558, "CHC": 4650, "CPC": 9432},
     "COP, MYSORE CITY": {"ASI": 198, "CHC": 592, "CPC": 1159},
     "COP, HUBLI-DHARWAD CITY": {"ASI": 190, "CHC": 462, "CPC": 958},
@@ -53,9 +56,11 @@ def clean_resource_data(df):
     "SP, BELLARY": {"ASI": 98, "CHC": 286, "CPC": 535},
     "SP, VIJAYANAGARA": {"ASI": 114, "CHC": 303, "CPC": 598},
     "SP, RAILWAYS": {"ASI": 86, "CHC": 245, "CPC": 520}
-    }
+}
 
-    district_mapping = {
+
+# FIR district name -> police district of SANCTION_STRENGTH
+DISTRICT_MAPPING = {
     'Bagalkot': 'SP, BAGALKOTE',
     'Ballari': 'SP, BELLARY',
     'Belagavi City': 'COP, BELGAUM CITY',
@@ -94,138 +99,124 @@ def clean_resource_data(df):
     'Vijayanagara': 'SP, VIJAYANAGARA',
     'Vijayapur': 'SP, VIJAYAPURA',
     'Yadgir': 'SP, YADAGIRI'
-    }
-
-    df["District Name"] =  df["District_Name"].map(district_mapping)
-
-    sanctioned_df = pd.DataFrame(sanction_strength).T
-
-    df = df.merge(sanctioned_df, left_on='District Name', right_index=True, how='left')
-    
-    df.drop(columns = ["District_Name", "FIRNo"], inplace = True)
-
-    df.dropna(inplace = True)
-    df.drop_duplicates(inplace = True)
-
-    
-    category_mapping = {
-        'THEFT': 'Property Crimes',
-        'BURGLARY - NIGHT': 'Property Crimes',
-        'BURGLARY - DAY': 'Property Crimes',
-        'ROBBERY': 'Property Crimes',
-        'DACOITY': 'Property Crimes',
-        'CRIMINAL BREACH OF TRUST': 'Property Crimes',
-        'CHEATING': 'Property Crimes',
-        'FORGERY': 'Property Crimes',
-        'COUNTERFEITING': 'Property Crimes',
-        'CRIMINAL MISAPPROPRIATION ': 'Property Crimes',
-        'RECEIVING OF STOLEN PROPERTY': 'Property Crimes',
-        'MOTOR VEHICLE ACCIDENTS NON-FATAL': 'Accidents and Public Safety',
-        'MOTOR VEHICLE ACCIDENTS FATAL': 'Accidents and Public Safety',
-        'DEATHS DUE TO RASHNESS/NEGLIGENCE': 'Accidents and Public Safety',
-        'NEGLIGENT ACT': 'Accidents and Public Safety',
-        'PUBLIC SAFETY': 'Accidents and Public Safety',
-        'PUBLIC NUISANCE': 'Accidents and Public Safety',
-        'MISSING PERSON': 'Missing Persons',
-        ' CYBER CRIME': 'Cyber Crimes',
-        'CASES OF HURT': 'Violent Crimes',
-        'ATTEMPT TO MURDER': 'Violent Crimes',
-        'MURDER': 'Violent Crimes',
-        'CULPABLE HOMICIDE NOT AMOUNTING TO MURDER': 'Violent Crimes',
-        'ATTEMPT TO CULPABLE HOMICIDE NOT AMOUNTING TO MURDER': 'Violent Crimes',
-        'MOLESTATION': 'Violent Crimes',
-        'KIDNAPPING AND ABDUCTION': 'Violent Crimes',
-        'RIOTS': 'Violent Crimes',
-        'CRUELTY BY HUSBAND': 'Violent Crimes',
-        'CRIMES RELATED TO WOMEN': 'Violent Crimes',
-        'POCSO': 'Violent Crimes',
-        'CRIMINAL INTIMIDATION': 'Violent Crimes',
-        'WRONGFUL RESTRAINT/CONFINEMENT': 'Violent Crimes',
-        'INSULTING MODESTY OF WOMEN (EVE TEASING)': 'Violent Crimes',
-        'ASSAULT OR USE OF CRIMINAL FORCE TO DISROBE WOMAN': 'Violent Crimes',
-        'EXPOSURE AND ABANDONMENT OF CHILD': 'Violent Crimes',
-        'DOWRY DEATHS': 'Violent Crimes',
-        'OFFENCES RELATED TO MARRIAGE': 'Violent Crimes',
-        'ASSAULT': 'Violent Crimes',
-        'CRIMINAL TRESPASS': 'Violent Crimes',
-        'MISCHIEF': 'Violent Crimes',
-        'ARSON': 'Violent Crimes',
-        'CRIMINAL CONSPIRACY': 'Violent Crimes',
-        'AFFRAY': 'Violent Crimes',
-        'CrPC': 'Legal and Regulatory Offenses',
-        'KARNATAKA df ACT 1963': 'Legal and Regulatory Offenses',
-        'Karnataka State Local Act': 'Legal and Regulatory Offenses',
-        'NARCOTIC DRUGS & PSHYCOTROPIC SUBSTANCES': 'Legal and Regulatory Offenses',
-        'COTPA, CIGARETTES AND OTHER TOBACCO PRODUCTS': 'Legal and Regulatory Offenses',
-        'COPY RIGHT ACT 1957': 'Legal and Regulatory Offenses',
-        'ARMS ACT  1959': 'Legal and Regulatory Offenses',
-        ' PREVENTION OF DAMAGE TO PUBLIC PROPERTY ACT 1984': 'Legal and Regulatory Offenses',
-        ' REPRESENTATION OF PEOPLE ACT 1951 & 1988': 'Legal and Regulatory Offenses',
-        'PASSPORT ACT': 'Legal and Regulatory Offenses',
-        'EXPLOSIVES': 'Legal and Regulatory Offenses',
-        'OFFENCES PROMOTING ENEMITY': 'Legal and Regulatory Offenses',
-        'Concealment of birth by secret disposal of Child': 'Legal and Regulatory Offenses',
-        'PORNOGRAPHY': 'Legal and Regulatory Offenses',
-        'ADULTERATION': 'Legal and Regulatory Offenses',
-        'POISONING-PROFESSIONAL': 'Legal and Regulatory Offenses',
-        'SLAVERY': 'Legal and Regulatory Offenses',
-        'OFFENCES BY PUBLIC SERVANTS (EXCEPT CORRUPTION) (Public servant is accused)': 'Legal and Regulatory Offenses',
-        'BONDED LABOUR SYSTEM': 'Legal and Regulatory Offenses',
-        'FOREST': 'Legal and Regulatory Offenses',
-        'INDIAN ELECTRICITY ACT ': 'Legal and Regulatory Offenses',
-        'INDIAN MOTOR VEHICLE': 'Legal and Regulatory Offenses',
-        'UNNATURAL SEX ': 'Legal and Regulatory Offenses',
-        'IMPERSONATION ': 'Legal and Regulatory Offenses',
-        'PUBLIC JUSTICE': 'Legal and Regulatory Offenses',
-        'OF ABETMENT': 'Legal and Regulatory Offenses',
-        ' POST & TELEGRAPH,TELEGRAPH WIRES(UNLAWFUL POSSESSION)ACT 1950': 'Legal and Regulatory Offenses',
-        'Human Trafficking': 'Legal and Regulatory Offenses',
-        'ANTIQUES (CULTURAL PROPERTY)': 'Legal and Regulatory Offenses',
-        'OFFICIAL SECURITY RELATED ACTS': 'Legal and Regulatory Offenses',
-        'UNLAWFUL ACTIVITIES(Prevention)ACT 1967 ': 'Legal and Regulatory Offenses',
-        'SEDITION': 'Legal and Regulatory Offenses',
-        'DOCUMENTS & PROPERTY MARKS': 'Legal and Regulatory Offenses',
-        'DEFENCE FORCES OFFENCES RELATING TO (also relating to desertion)': 'Legal and Regulatory Offenses',
-        'Giving false information respecting an offence com': 'Legal and Regulatory Offenses',
-        'UNNATURAL DEATH (Sec 174/174c/176)': 'Legal and Regulatory Offenses',
-        'CINEMATOGRAPH ACT 1952': 'Legal and Regulatory Offenses',
-        'INFANTICIDE': 'Legal and Regulatory Offenses',
-        'PREVENTION OF CORRUPTION ACT 1988': 'Legal and Regulatory Offenses',
-        'NATIONAL SECURITY ACT': 'Legal and Regulatory Offenses',
-        'ILLEGAL DETENTION': 'Legal and Regulatory Offenses',
-        'RAPE': 'Sexual Crimes',
-        'IMMORAL TRAFFIC': 'Sexual Crimes',
-        'SCHEDULED CASTE AND THE SCHEDULED TRIBES ': 'Hate Crimes and Discrimination',
-        'COMMUNAL / RELIGION   ': 'Hate Crimes and Discrimination',
-        'OFFENCES AGAINST PUBLIC SERVANTS (Public servant is a victim)': 'Crimes Against Public Servants',
-        'SUICIDE': 'Other Crimes',
-        'Failure to appear to Court': 'Other Crimes',
-        'ELECTION': 'Other Crimes',
-        'Disobedience to Order Promulgated by PublicServan': 'Other Crimes',
-        'CHILDREN ACT': 'Other Crimes',
-        'ANIMAL': 'Other Crimes',
-        'FOREIGNER': 'Other Crimes',
-        'Attempting to commit offences': 'Other Crimes',
-        'FALSE EVIDENCE': 'Other Crimes',
-        'CONSUMER': 'Other Crimes',
-        'DEFAMATION': 'Other Crimes',
-        'ESCAPE FROM LAWFUL CUSTODY AND RESISTANCE': 'Other Crimes',
-        'DEATHS-MISCARRIAGE': 'Other Crimes',
-        'KARNATAKA POLICE ACT 1963': "Legal and Regulatory Offenses" ,
-        'RAILWAYS ACT': "Legal and Regulatory Offenses",
-        'OFFENCES AGAINST STATE': "Legal and Regulatory Offenses",
-        'CIVIL RIGHTS ': "Hate Crimes and Discrimination",
-        'FAILURE TO APPEAR TO COURT': "Other Crimes",
-        'BUYING & SELLING MINOR FOR PROSTITUTION': "Sexual Crimes",
-    }
-
-
-    # Assuming your data is in a DataFrame called 'data'
-    df['Crime Group'] = df['CrimeGroup_Name'].map(category_mapping)
-
-    df.drop(columns = ["CrimeGroup_Name"], inplace = True)
-
-    crime_severity_weights = {
+}
+
+
+# FIR crime group -> crime category
+CATEGORY_MAPPING = {
+    'THEFT': 'Property Crimes',
+    'BURGLARY - NIGHT': 'Property Crimes',
+    'BURGLARY - DAY': 'Property Crimes',
+    'ROBBERY': 'Property Crimes',
+    'DACOITY': 'Property Crimes',
+    'CRIMINAL BREACH OF TRUST': 'Property Crimes',
+    'CHEATING': 'Property Crimes',
+    'FORGERY': 'Property Crimes',
+    'COUNTERFEITING': 'Property Crimes',
+    'CRIMINAL MISAPPROPRIATION ': 'Property Crimes',
+    'RECEIVING OF STOLEN PROPERTY': 'Property Crimes',
+    'MOTOR VEHICLE ACCIDENTS NON-FATAL': 'Accidents and Public Safety',
+    'MOTOR VEHICLE ACCIDENTS FATAL': 'Accidents and Public Safety',
+    'DEATHS DUE TO RASHNESS/NEGLIGENCE': 'Accidents and Public Safety',
+    'NEGLIGENT ACT': 'Accidents and Public Safety',
+    'PUBLIC SAFETY': 'Accidents and Public Safety',
+    'PUBLIC NUISANCE': 'Accidents and Public Safety',
+    'MISSING PERSON': 'Missing Persons',
+    ' CYBER CRIME': 'Cyber Crimes',
+    'CASES OF HURT': 'Violent Crimes',
+    'ATTEMPT TO MURDER': 'Violent Crimes',
+    'MURDER': 'Violent Crimes',
+    'CULPABLE HOMICIDE NOT AMOUNTING TO MURDER': 'Violent Crimes',
+    'ATTEMPT TO CULPABLE HOMICIDE NOT AMOUNTING TO MURDER': 'Violent Crimes',
+    'MOLESTATION': 'Violent Crimes',
+    'KIDNAPPING AND ABDUCTION': 'Violent Crimes',
+    'RIOTS': 'Violent Crimes',
+    'CRUELTY BY HUSBAND': 'Violent Crimes',
+    'CRIMES RELATED TO WOMEN': 'Violent Crimes',
+    'POCSO': 'Violent Crimes',
+    'CRIMINAL INTIMIDATION': 'Violent Crimes',
+    'WRONGFUL RESTRAINT/CONFINEMENT': 'Violent Crimes',
+    'INSULTING MODESTY OF WOMEN (EVE TEASING)': 'Violent Crimes',
+    'ASSAULT OR USE OF CRIMINAL FORCE TO DISROBE WOMAN': 'Violent Crimes',
+    'EXPOSURE AND ABANDONMENT OF CHILD': 'Violent Crimes',
+    'DOWRY DEATHS': 'Violent Crimes',
+    'OFFENCES RELATED TO MARRIAGE': 'Violent Crimes',
+    'ASSAULT': 'Violent Crimes',
+    'CRIMINAL TRESPASS': 'Violent Crimes',
+    'MISCHIEF': 'Violent Crimes',
+    'ARSON': 'Violent Crimes',
+    'CRIMINAL CONSPIRACY': 'Violent Crimes',
+    'AFFRAY': 'Violent Crimes',
+    'CrPC': 'Legal and Regulatory Offenses',
+    'KARNATAKA df ACT 1963': 'Legal and Regulatory Offenses',
+    'Karnataka State Local Act': 'Legal and Regulatory Offenses',
+    'NARCOTIC DRUGS & PSHYCOTROPIC SUBSTANCES': 'Legal and Regulatory Offenses',
+    'COTPA, CIGARETTES AND OTHER TOBACCO PRODUCTS': 'Legal and Regulatory Offenses',
+    'COPY RIGHT ACT 1957': 'Legal and Regulatory Offenses',
+    'ARMS ACT  1959': 'Legal and Regulatory Offenses',
+    ' PREVENTION OF DAMAGE TO PUBLIC PROPERTY ACT 1984': 'Legal and Regulatory Offenses',
+    ' REPRESENTATION OF PEOPLE ACT 1951 & 1988': 'Legal and Regulatory Offenses',
+    'PASSPORT ACT': 'Legal and Regulatory Offenses',
+    'EXPLOSIVES': 'Legal and Regulatory Offenses',
+    'OFFENCES PROMOTING ENEMITY': 'Legal and Regulatory Offenses',
+    'Concealment of birth by secret disposal of Child': 'Legal and Regulatory Offenses',
+    'PORNOGRAPHY': 'Legal and Regulatory Offenses',
+    'ADULTERATION': 'Legal and Regulatory Offenses',
+    'POISONING-PROFESSIONAL': 'Legal and Regulatory Offenses',
+    'SLAVERY': 'Legal and Regulatory Offenses',
+    'OFFENCES BY PUBLIC SERVANTS (EXCEPT CORRUPTION) (Public servant is accused)': 'Legal and Regulatory Offenses',
+    'BONDED LABOUR SYSTEM': 'Legal and Regulatory Offenses',
+    'FOREST': 'Legal and Regulatory Offenses',
+    'INDIAN ELECTRICITY ACT ': 'Legal and Regulatory Offenses',
+    'INDIAN MOTOR VEHICLE': 'Legal and Regulatory Offenses',
+    'UNNATURAL SEX ': 'Legal and Regulatory Offenses',
+    'IMPERSONATION ': 'Legal and Regulatory Offenses',
+    'PUBLIC JUSTICE': 'Legal and Regulatory Offenses',
+    'OF ABETMENT': 'Legal and Regulatory Offenses',
+    ' POST & TELEGRAPH,TELEGRAPH WIRES(UNLAWFUL POSSESSION)ACT 1950': 'Legal and Regulatory Offenses',
+    'Human Trafficking': 'Legal and Regulatory Offenses',
+    'ANTIQUES (CULTURAL PROPERTY)': 'Legal and Regulatory Offenses',
+    'OFFICIAL SECURITY RELATED ACTS': 'Legal and Regulatory Offenses',
+    'UNLAWFUL ACTIVITIES(Prevention)ACT 1967 ': 'Legal and Regulatory Offenses',
+    'SEDITION': 'Legal and Regulatory Offenses',
+    'DOCUMENTS & PROPERTY MARKS': 'Legal and Regulatory Offenses',
+    'DEFENCE FORCES OFFENCES RELATING TO (also relating to desertion)': 'Legal and Regulatory Offenses',
+    'Giving false information respecting an offence com': 'Legal and Regulatory Offenses',
+    'UNNATURAL DEATH (Sec 174/174c/176)': 'Legal and Regulatory Offenses',
+    'CINEMATOGRAPH ACT 1952': 'Legal and Regulatory Offenses',
+    'INFANTICIDE': 'Legal and Regulatory Offenses',
+    'PREVENTION OF CORRUPTION ACT 1988': 'Legal and Regulatory Offenses',
+    'NATIONAL SECURITY ACT': 'Legal and Regulatory Offenses',
+    'ILLEGAL DETENTION': 'Legal and Regulatory Offenses',
+    'RAPE': 'Sexual Crimes',
+    'IMMORAL TRAFFIC': 'Sexual Crimes',
+    'SCHEDULED CASTE AND THE SCHEDULED TRIBES ': 'Hate Crimes and Discrimination',
+    'COMMUNAL / RELIGION   ': 'Hate Crimes and Discrimination',
+    'OFFENCES AGAINST PUBLIC SERVANTS (Public servant is a victim)': 'Crimes Against Public Servants',
+    'SUICIDE': 'Other Crimes',
+    'Failure to appear to Court': 'Other Crimes',
+    'ELECTION': 'Other Crimes',
+    'Disobedience to Order Promulgated by PublicServan': 'Other Crimes',
+    'CHILDREN ACT': 'Other Crimes',
+    'ANIMAL': 'Other Crimes',
+    'FOREIGNER': 'Other Crimes',
+    'Attempting to commit offences': 'Other Crimes',
+    'FALSE EVIDENCE': 'Other Crimes',
+    'CONSUMER': 'Other Crimes',
+    'DEFAMATION': 'Other Crimes',
+    'ESCAPE FROM LAWFUL CUSTODY AND RESISTANCE': 'Other Crimes',
+    'DEATHS-MISCARRIAGE': 'Other Crimes',
+    'KARNATAKA POLICE ACT 1963': "Legal and Regulatory Offenses" ,
+    'RAILWAYS ACT': "Legal and Regulatory Offenses",
+    'OFFENCES AGAINST STATE': "Legal and Regulatory Offenses",
+    'CIVIL RIGHTS ': "Hate Crimes and Discrimination",
+    'FAILURE TO APPEAR TO COURT': "Other Crimes",
+    'BUYING & SELLING MINOR FOR PROSTITUTION': "Sexual Crimes",
+}
+
+
+# Severity weight of every crime category
+CRIME_SEVERITY_WEIGHTS = {
     'Violent Crimes': 5,
     'Sexual Crimes': 5,
     'Crimes Against Public Servants': 4,
@@ -236,21 +227,60 @@ def clean_resource_data(df):
     'Missing Persons': 2,
     'Legal and Regulatory Offenses': 2,
     'Other Crimes': 1
-    }
+}
+
+# Columns of the FIR projection cleaned by this component, and the key of a beat in it
+RESOURCE_COLUMNS = ["District_Name", "UnitName", "FIRNo", "CrimeGroup_Name", "Beat_Name", "Village_Area_Name"]
+BEAT_KEYS = ["District_Name", "UnitName", "Village_Area_Name", "Beat_Name"]
+
+# Beat-level aggregates kept between runs so new FIRs can be added without re-reading the FIR history
+BEAT_AGGREGATES_PATH = "../Component_datasets/Resource_Allocation_Beat_Aggregates.parquet"
+BEAT_CRIME_GROUPS_PATH = "../Component_datasets/Resource_Allocation_Beat_Crime_Groups.parquet"
+ROW_HASHES_PATH = "../Component_datasets/Resource_Allocation_Row_Hashes.npy"
+
+# FIR rows per beat and month, the history the app forecasts next year's crime counts from
+BEAT_HISTORY_COLUMNS = BEAT_KEYS + ["FIRNo", "Year", "Month"]
+BEAT_MONTHLY_COUNTS_PATH = "../Component_datasets/Resource_Allocation_Beat_Monthly_Counts.parquet"
+MONTHLY_COUNT_KEYS = ["District Name", "Police Unit", "Village Area Name", "Beat Name", "Year", "Month"]
+
+
+def clean_resource_data(df):
+    # Columnar cleaning of the FIR projection: one groupby pass gives the beat aggregates (FIR rows per beat, distinct crime
+    # groups per village and beat), severities, per-beat totals and the district normalisation are then computed on those
+    # aggregates only. Districts without a police district in DISTRICT_MAPPING (CID, ISD Bengaluru, Coastal Security Police) are dropped
+    clean_resource_aggregates(*build_beat_aggregates(df))
+
 
-    df["Crime Severity"] = df["Crime Group"].map(crime_severity_weights)
+def clean_resource_data_chunks(chunks):
+    # Streaming version of clean_resource_data for the de-duplicated chunks of ingest_resource_data_chunks. The beat
+    # aggregates are additive, so every chunk is folded into them as it arrives and only the aggregates of the chunks
+    # (a few rows per beat) are concatenated, never the FIR rows
+    beat_totals, beat_crime_groups, row_hashes = [], [], []
+    for chunk in chunks:
+        chunk_totals, chunk_crime_groups, chunk_hashes = build_beat_aggregates(chunk)
+        beat_totals.append(chunk_totals)
+        beat_crime_groups.append(chunk_crime_groups)
+        row_hashes.append(chunk_hashes)
 
-    df.drop(columns = ["Crime Group"], inplace = True)
-    df.dropna(inplace = True)
-    crime_severity_group = df.groupby(["District Name","UnitName","Beat_Name"]).agg(Crime_Severity_per_Beat = ("Crime Severity", "sum"))
+    # Chunks are de-duplicated against each other, so the rows per beat add up
+    beat_totals = concat_categorical_chunks(beat_totals).groupby(BEAT_KEYS, observed=True, sort=False)["Total Crimes per beat"]\
+                    .sum().reset_index()
+    beat_crime_groups = concat_categorical_chunks(beat_crime_groups).drop_duplicates()
+    row_hashes = np.unique(np.concatenate(row_hashes)) if row_hashes else np.empty(0, dtype=np.uint64)
 
-    df = df.merge(crime_severity_group["Crime_Severity_per_Beat"], on = ["District Name","UnitName","Beat_Name"], how = "left")
+    clean_resource_aggregates(beat_totals, beat_crime_groups, row_hashes)
 
-    df.drop(columns = ["Crime Severity"], inplace = True)
 
+def clean_resource_aggregates(beat_totals, beat_crime_groups, row_hashes):
+    # Also the starting point of the incremental refreshes
+    save_beat_aggregates(beat_totals, beat_crime_groups, row_hashes)
 
-    df.drop_duplicates(inplace = True)
+    save_resource_allocation_table(resource_rows_from_aggregates(beat_totals, beat_crime_groups))
 
+
+def save_resource_allocation_table(df):
+    # Final columns of the cleaned dataset from the per (police district, unit, village, beat) rows with their
+    # 'Total Crimes per beat', 'Crime_Severity_per_Beat' and sanctioned strengths
     new_order = ['District Name', 'UnitName',  'Village_Area_Name', 'Beat_Name','Total Crimes per beat', 'Crime_Severity_per_Beat', 'ASI', 'CHC', 'CPC']
     df = df[new_order]
 
@@ -272,11 +302,8 @@ def clean_resource_data(df):
 
     df[columns_to_convert] = df[columns_to_convert].apply(np.round).astype(int)
     
-    # Calculate the sum of 'Crime Severity per Beat' for each district
-    district_crime_severity_sum = df.groupby("District Name")["Crime Severity per Beat"].sum()
-
     # Calculate 'Normalised Crime Severity' by dividing 'Crime Severity per Beat' by the sum for each district
-    df["Normalised Crime Severity"] = df.apply(lambda row: row["Crime Severity per Beat"] / district_crime_severity_sum[row["District Name"]], axis=1)
+    df["Normalised Crime Severity"] = df["Crime Severity per Beat"] / df.groupby("District Name", observed=True)["Crime Severity per Beat"].transform("sum")
 
     df.drop(columns = ["Crime Severity per Beat"], inplace = True)
 
@@ -285,15 +312,89 @@ def clean_resource_data(df):
     df.to_csv("../Component_datasets/Resource_Allocation_Cleaned.csv", index = False)
 
 
+def build_beat_aggregates(df):
+    # Raw beat-level aggregates of the de-duplicated FIR projection (District_Name, UnitName, FIRNo, CrimeGroup_Name, Beat_Name, Village_Area_Name):
+    # the number of FIR rows per beat, the distinct crime groups seen in every beat, and the 64-bit hashes of the rows already counted
+    beat_totals = df.groupby(BEAT_KEYS, observed=True)["FIRNo"].count().reset_index(name="Total Crimes per beat")
+
+    beat_crime_groups = df[BEAT_KEYS + ["CrimeGroup_Name"]].dropna().drop_duplicates()
+
+    row_hashes = np.unique(pd.util.hash_pandas_object(df[RESOURCE_COLUMNS], index=False).to_numpy())
+
+    return beat_totals, beat_crime_groups, row_hashes
+
+
+def save_beat_aggregates(beat_totals, beat_crime_groups, row_hashes):
+    beat_totals.to_parquet(BEAT_AGGREGATES_PATH, index=False)
+    beat_crime_groups.to_parquet(BEAT_CRIME_GROUPS_PATH, index=False)
+    np.save(ROW_HASHES_PATH, row_hashes)
+
+
+def load_beat_aggregates():
+    return pd.read_parquet(BEAT_AGGREGATES_PATH), pd.read_parquet(BEAT_CRIME_GROUPS_PATH), np.load(ROW_HASHES_PATH)
+
+
+def update_resource_data(new_rows):
+    # Incremental version of clean_resource_data for the FIR projection rows registered since the last run.
+    # Rows already counted are skipped by their hash, the new ones are added to the stored beat aggregates and the cleaned
+    # dataset is rebuilt from the aggregates, whose size depends on the number of beats and not on the FIR history
+    beat_totals, beat_crime_groups, row_hashes = load_beat_aggregates()
+
+    new_hashes = pd.util.hash_pandas_object(new_rows[RESOURCE_COLUMNS], index=False).to_numpy()
+    new_rows = new_rows[~np.isin(new_hashes, row_hashes)]
+    new_totals, new_crime_groups, new_hashes = build_beat_aggregates(new_rows)
+
+    beat_totals = pd.concat([beat_totals.astype({key: str for key in BEAT_KEYS}), new_totals.astype({key: str for key in BEAT_KEYS})])\
+                    .groupby(BEAT_KEYS)["Total Crimes per beat"].sum().reset_index()
+    beat_crime_groups = pd.concat([beat_crime_groups.astype(str), new_crime_groups.astype(str)]).drop_duplicates()
+    row_hashes = np.union1d(row_hashes, new_hashes)
+
+    save_beat_aggregates(beat_totals, beat_crime_groups, row_hashes)
+    save_resource_allocation_table(resource_rows_from_aggregates(beat_totals, beat_crime_groups))
+
+    return len(new_rows)
+
+
+def crime_group_severity(crime_groups):
+    # Severity weight of every crime group, mapped once per distinct crime group and broadcast through the factorized codes
+    # (NaN for crime groups without a category)
+    codes, groups = pd.factorize(crime_groups)
+    severities = pd.Series(groups).map(CATEGORY_MAPPING).map(CRIME_SEVERITY_WEIGHTS).to_numpy(dtype=float)
+    return pd.Series(np.append(severities, np.nan)[codes], index=crime_groups.index)
+
 
+def resource_rows_from_aggregates(beat_totals, beat_crime_groups):
+    # One row per (police district, unit, village, beat) with its 'Total Crimes per beat', 'Crime_Severity_per_Beat' and
+    # sanctioned strengths, in the order the beats first appear in the FIR projection.
+    # A beat's severity is the sum of the severity of every distinct (village, crime group) pair seen in it
+    crime_groups = beat_crime_groups.assign(**{"District Name": beat_crime_groups["District_Name"].map(DISTRICT_MAPPING),
+                                               "Crime Severity": crime_group_severity(beat_crime_groups["CrimeGroup_Name"])})
+    crime_groups = crime_groups.dropna(subset=["District Name", "Crime Severity"])
 
+    crime_groups["Crime_Severity_per_Beat"] = crime_groups.groupby(["District Name", "UnitName", "Beat_Name"], observed=True)["Crime Severity"].transform("sum")
 
+    # Totals are written as floats, as in the FIR data, where beats with a missing key made the per-row counts NaN
+    df = crime_groups.drop_duplicates(BEAT_KEYS).merge(beat_totals.astype({"Total Crimes per beat": float}), on=BEAT_KEYS, how="left")
+    df = df.merge(pd.DataFrame(SANCTION_STRENGTH).T, left_on="District Name", right_index=True, how="left")
 
+    return df
 
 
+def build_beat_monthly_counts(df):
+    # Number of FIR rows per (police district, unit, village, beat, year, month) of the FIR details, keyed like the cleaned dataset
+    df = df.assign(**{"District Name": df["District_Name"].astype(str).map(DISTRICT_MAPPING)}).dropna(subset=["District Name", "Year", "Month"])
 
+    counts = df.groupby(["District Name", "UnitName", "Village_Area_Name", "Beat_Name", "Year", "Month"], observed=True)["FIRNo"].count()
+    counts = counts.reset_index(name="Crime Count").rename(columns={'UnitName': 'Police Unit', 'Beat_Name': 'Beat Name', 'Village_Area_Name': "Village Area Name"})
 
+    return counts.astype({"District Name": str, "Police Unit": str, "Village Area Name": str, "Beat Name": str, "Year": int, "Month": int})
 
 
+def save_beat_monthly_counts(df):
+    build_beat_monthly_counts(df).to_parquet(BEAT_MONTHLY_COUNTS_PATH, index=False)
 
 
+def update_beat_monthly_counts(new_rows):
+    # Adds the counts of the FIRs registered since the last run to the stored monthly counts
+    counts = pd.concat([pd.read_parquet(BEAT_MONTHLY_COUNTS_PATH), build_beat_monthly_counts(new_rows)])
+    counts.groupby(MONTHLY_COUNT_KEYS)["Crime Count"].sum().reset_index().to_parquet(BEAT_MONTHLY_COUNTS_PATH, index=False)
@@ -0,0 +1,33 @@
+import logging
+import os
+import sys
+import time
+
+import pandas as pd
+
+# Make the forecasting module of the app importable when this module is run from its own directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+from Resource_Forecasting import fit_beat_count_model, save_beat_count_model
+
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)])
+
+BEAT_MONTHLY_COUNTS_PATH = "../Component_datasets/Resource_Allocation_Beat_Monthly_Counts.parquet"
+BEAT_COUNT_MODEL_DIR = "../models/Resource_Allocation_model"
+BEAT_COUNT_MODEL_PATH = os.path.join(BEAT_COUNT_MODEL_DIR, "beat_count_model.npz")
+
+
+def save_fitted_beat_count_model():
+    # Fits the beat count model on the monthly counts of every beat and saves its parameters, which the app loads
+    # instead of fitting the model itself
+    start = time.perf_counter()
+    params = fit_beat_count_model(pd.read_parquet(BEAT_MONTHLY_COUNTS_PATH))
+
+    os.makedirs(BEAT_COUNT_MODEL_DIR, exist_ok=True)
+    save_beat_count_model(params, BEAT_COUNT_MODEL_PATH)
+    logging.info(f" Beat count model of {len(params['beat_effect'])} beats fitted in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    save_fitted_beat_count_model()
@@ -1,8 +1,24 @@
+import os
+import sys
+
+import numpy as np
 import pandas as pd
 
+# Make the shared Data_Pipeline package importable when this module is run from its own directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Crime_Pattern_Analysis.ingest_data import drop_seen_duplicates
+from Data_Pipeline.schema import schema_dtypes
+
+# Columns of the FIR file used by the Resource Allocation component, with the compact dtypes of the shared schema
+RESOURCE_DTYPES = schema_dtypes(['District_Name', 'UnitName', 'FIRNo', 'CrimeGroup_Name', 'Beat_Name', 'Village_Area_Name'])
+
+# Number of FIR rows parsed at a time in streaming mode
+CHUNK_SIZE = 200000
+
 
 def ingest_resource_data():
-    df = pd.read_csv("../datasets/FIR_Details_Data.csv")
+    df = pd.read_csv("../datasets/FIR_Details_Data.csv", dtype=schema_dtypes())
 
     df.drop(columns= df.columns[~df.columns.isin(['District_Name', 'UnitName', 'FIRNo', 'CrimeGroup_Name',
         'Beat_Name', 'Village_Area_Name',
@@ -10,4 +26,33 @@ def ingest_resource_data():
 
     df.drop_duplicates(inplace =  True)
 
-    return df
\ No newline at end of file
+    return df
+
+
+def ingest_resource_data_chunks(chunksize=CHUNK_SIZE):
+    # Streaming version of ingest_resource_data, parses only the needed columns with compact dtypes and yields
+    # fixed-size chunks with the rows already seen in earlier chunks removed (only their 64-bit hashes are kept).
+    # Cleaned by clean_resource_data_chunks, which keeps only the beat aggregates of every chunk
+    reader = pd.read_csv("../datasets/FIR_Details_Data.csv", usecols=list(RESOURCE_DTYPES), dtype=RESOURCE_DTYPES, chunksize=chunksize)
+
+    seen_rows = np.empty(0, dtype=np.uint64)
+    for chunk in reader:
+        chunk, seen_rows = drop_seen_duplicates(chunk, seen_rows)
+        yield chunk
+
+
+def concat_categorical_chunks(chunks):
+    # Give every chunk the same categories before concatenating, otherwise pandas falls back to object columns
+    if not chunks:
+        return pd.DataFrame()
+
+    categorical_columns = [column for column, dtype in chunks[0].dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    for column in categorical_columns:
+        categories = chunks[0][column].cat.categories
+        for chunk in chunks[1:]:
+            categories = categories.union(chunk[column].cat.categories)
+
+        for i, chunk in enumerate(chunks):
+            chunks[i] = chunk.assign(**{column: chunk[column].cat.set_categories(categories)})
+
+    return pd.concat(chunks)
@@ -1,13 +1,194 @@
+import os
+import sys
+
 import branca.colormap as cm
 import folium
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 import streamlit.components.v1 as components
 from folium.plugins import HeatMap
 from sklearn.cluster import DBSCAN
+from streamlit_folium import st_folium
+
+# Determine the root directory of the project
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Make the shared Data_Pipeline package importable, it holds the keys of the temporal cube written by the pipeline
+sys.path.append(root_dir)
+
+from Data_Pipeline.schema import TEMPORAL_CUBE_KEYS
+
+# Parquet dataset partitioned by Year/District_Name written by the Crime Pattern Analysis pipeline, and the CSV it falls back to
+crime_pattern_dataset_path = os.path.join(root_dir, 'Component_datasets', 'Crime_Pattern_Analysis_Cleaned')
+crime_pattern_csv_path = os.path.join(root_dir, 'Component_datasets', 'Crime_Pattern_Analysis_Cleaned.csv')
+temporal_cube_path = os.path.join(root_dir, 'Component_datasets', 'Crime_Pattern_Temporal_Cube.csv')
+
+TEMPORAL_COLUMNS = ['District_Name', 'CrimeGroup_Name', 'Year', 'Month', 'Day']
+HOTSPOT_COLUMNS = ['District_Name', 'UnitName', 'Latitude', 'Longitude', 'CrimeGroup_Name', 'Date']
+CHOROPLETH_COLUMNS = ['District_Name', 'FIRNo', 'VICTIM COUNT', 'Accused Count']
+FILTER_OPTION_COLUMNS = ['District_Name', 'CrimeGroup_Name', 'Date', 'Latitude', 'Longitude']
+
+# Hotspot clusters are found with DBSCAN on a haversine ball tree with a great-circle neighbourhood radius of 0.1 degree of arc
+# (about 11.1 km in every direction). This deliberately replaces the old euclidean eps=0.1 on raw degrees, whose neighbourhood
+# was an ellipse only about 10.7 km wide east-west at Karnataka's latitudes, so places about 11 km apart east-west can now
+# fall in one cluster
+EARTH_RADIUS_KM = 6371.0
+HOTSPOT_EPS_KM = np.radians(0.1) * EARTH_RADIUS_KM
+HOTSPOT_MIN_SAMPLES = 5
+
+# Heat map pyramid, minimum map zoom of every level -> size (degrees) of the lat/lon cells the crimes are binned into at that level
+HEAT_PYRAMID_LEVELS = {0: 0.2, 8: 0.05, 10: 0.0125, 12: 0.003}
+
+
+def filter_crime_pattern_data(df, districts=None, crime_groups=None, date_range=None):
+    # In-memory version of the filters pushed down to the Parquet dataset, used when only the CSV is available
+    if districts:
+        df = df[df['District_Name'].isin(districts)]
+    if crime_groups:
+        df = df[df['CrimeGroup_Name'].isin(crime_groups)]
+    if date_range:
+        df = df[(df['Date'] >= pd.Timestamp(date_range[0])) & (df['Date'] <= pd.Timestamp(date_range[1]))]
+    return df
+
+
+@st.cache_data
+def load_crime_pattern_data(columns, districts=None, crime_groups=None, date_range=None):
+    # Read only the requested columns of the crimes matching the filters. On the Parquet dataset the district and year filters
+    # prune whole partitions and the crime group/date filters skip row groups, so only the matching data is read
+    columns = list(columns)
+
+    if os.path.isdir(crime_pattern_dataset_path):
+        filters = []
+        if districts:
+            filters.append(('District_Name', 'in', list(districts)))
+        if crime_groups:
+            filters.append(('CrimeGroup_Name', 'in', list(crime_groups)))
+        if date_range:
+            start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+            filters += [('Year', '>=', start.year), ('Year', '<=', end.year), ('Date', '>=', start), ('Date', '<=', end)]
+
+        df = pd.read_parquet(crime_pattern_dataset_path, columns=columns, filters=filters or None)
+
+        # Partition columns are read back as categoricals of every partition value
+        if 'Year' in df.columns:
+            df['Year'] = df['Year'].astype(int)
+        if 'District_Name' in df.columns:
+            df['District_Name'] = df['District_Name'].cat.remove_unused_categories()
+        return df
+
+    date_columns = ['Year', 'Month', 'Day'] if 'Date' in columns or date_range else []
+    csv_columns = [column for column in columns if column != 'Date'] + ['District_Name', 'CrimeGroup_Name'] + date_columns
+    df = pd.read_csv(crime_pattern_csv_path, usecols=lambda column: column in csv_columns)
+    if date_columns:
+        df['Date'] = pd.to_datetime(df[['Year', 'Month', 'Day']])
+
+    return filter_crime_pattern_data(df, districts, crime_groups, date_range)[columns]
+
+
+@st.cache_resource
+def load_crime_date_index():
+    # Every crime sorted by date together with its int64 day number (days since 1970-01-01), built once and shared by all
+    # sessions, so a date-range filter is two binary searches and a slice instead of two comparisons over the whole column.
+    # Missing dates become the smallest int64 and are kept in front, so the day numbers stay sorted. Only used when the
+    # Parquet dataset is not there to push the filters down to
+    crimes = load_crime_pattern_data(tuple(HOTSPOT_COLUMNS))
+    crimes = crimes.sort_values('Date', kind='stable', na_position='first').reset_index(drop=True)
+    day_numbers = crimes['Date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    return crimes, day_numbers
+
+
+def day_number(date):
+    return np.datetime64(pd.Timestamp(date).date(), 'D').astype(np.int64)
+
+
+def crimes_in_date_range(date_index, date_range=None, crime_groups=None):
+    # Crimes of the sorted date index between the two (inclusive) dates, then restricted to the crime groups if given.
+    # The date slice costs O(log n), the crime group filter only scans the crimes inside the slice
+    crimes, day_numbers = date_index
+    if date_range:
+        start = np.searchsorted(day_numbers, day_number(date_range[0]), side='left')
+        end = np.searchsorted(day_numbers, day_number(date_range[1]), side='right')
+        crimes = crimes.iloc[start:end]
+    if crime_groups:
+        crimes = crimes[crimes['CrimeGroup_Name'].isin(crime_groups)]
+    return crimes
+
+
+def load_hotspot_crimes(crime_groups, date_range):
+    # Crimes of one hotspot filter set. On the Parquet dataset the crime group and date selections are pushed down as
+    # pyarrow filters, so only the matching Year partitions and row groups are read; the CSV fallback answers them from
+    # the sorted date index
+    if os.path.isdir(crime_pattern_dataset_path):
+        return load_crime_pattern_data(tuple(HOTSPOT_COLUMNS), crime_groups=crime_groups, date_range=date_range)
+    return crimes_in_date_range(load_crime_date_index(), date_range, crime_groups)
+
+
+@st.cache_data
+def load_crime_pattern_filter_options():
+    # Filter choices and map centre for the Crime Pattern Analysis widgets, read from the few columns they need
+    df = load_crime_pattern_data(tuple(FILTER_OPTION_COLUMNS))
+    return {
+        'districts': sorted(df['District_Name'].dropna().unique()),
+        'crime_groups': sorted(df['CrimeGroup_Name'].dropna().unique()),
+        'min_date': df['Date'].min(),
+        'max_date': df['Date'].max(),
+        'mean_lat': df['Latitude'].mean(),
+        'mean_lon': df['Longitude'].mean()
+    }
+
+
+@st.cache_data
+def load_temporal_rollups():
+    # Crime count cube keyed by (Year, Month, Day, District_Name, CrimeGroup_Name), precomputed by the pipeline or built once on first load.
+    # It is rolled up into one dense (time value x district x crime group) count array per granularity, so filtering is an array slice
+    if os.path.exists(temporal_cube_path):
+        cube = pd.read_csv(temporal_cube_path)
+    else:
+        crimes = load_crime_pattern_data(tuple(TEMPORAL_COLUMNS))
+        cube = crimes.groupby(TEMPORAL_CUBE_KEYS, observed=True).size().reset_index(name='Count')
+
+    district_codes, districts = pd.factorize(cube['District_Name'], sort=True)
+    group_codes, crime_groups = pd.factorize(cube['CrimeGroup_Name'], sort=True)
+    known = (district_codes >= 0) & (group_codes >= 0)
+
+    rollups = {}
+    for granularity in ['Year', 'Month', 'Day']:
+        time_codes, time_values = pd.factorize(cube[granularity], sort=True)
+        cells = (time_codes * len(districts) + district_codes) * len(crime_groups) + group_codes
+        counts = np.bincount(cells[known], weights=cube['Count'].to_numpy()[known],
+                             minlength=len(time_values) * len(districts) * len(crime_groups))
+        rollups[granularity] = (np.asarray(time_values), counts.astype(np.int64).reshape(len(time_values), len(districts), len(crime_groups)))
+
+    return {'districts': np.asarray(districts), 'crime_groups': np.asarray(crime_groups), 'rollups': rollups}
+
 
-def temporal_analysis(crime_pattern_analysis):
+def temporal_counts(temporal_rollups, granularity, districts=None, crime_groups=None):
+    # Slice the roll-up of the chosen granularity to the selected districts/crime groups, same rows as
+    # groupby([granularity, "District_Name", "CrimeGroup_Name"]).size() on the filtered crimes
+    time_values, counts = temporal_rollups['rollups'][granularity]
+
+    district_index = np.arange(len(temporal_rollups['districts']))
+    if districts:
+        district_index = np.flatnonzero(np.isin(temporal_rollups['districts'], list(districts)))
+
+    group_index = np.arange(len(temporal_rollups['crime_groups']))
+    if crime_groups:
+        group_index = np.flatnonzero(np.isin(temporal_rollups['crime_groups'], list(crime_groups)))
+
+    sliced = counts[:, district_index][:, :, group_index]
+    t, d, g = np.nonzero(sliced)
+
+    return pd.DataFrame({
+        granularity: time_values[t],
+        "District_Name": temporal_rollups['districts'][district_index[d]],
+        "CrimeGroup_Name": temporal_rollups['crime_groups'][group_index[g]],
+        "Count": sliced[t, d, g]
+    })
+
+
+def temporal_analysis(filter_options):
     with st.container():
         st.markdown("### 📅 Temporal Crime Analysis", unsafe_allow_html=True)
         st.markdown("<p style='color:gray;'>Filter crimes by District, Group, and Time Granularity.</p>", unsafe_allow_html=True)
@@ -15,34 +196,35 @@ def temporal_analysis(crime_pattern_analysis):
         col1, col2, col3 = st.columns([2, 2, 1])
 
         with col1:
-            district_options = ["All Districts"] + sorted(crime_pattern_analysis["District_Name"].unique())
+            district_options = ["All Districts"] + filter_options["districts"]
             selected_districts = st.multiselect("🏙️ Select District(s)", district_options, default=[])
 
         with col2:
-            crime_group_options = ["All Crime Groups"] + sorted(crime_pattern_analysis["CrimeGroup_Name"].unique())
+            crime_group_options = ["All Crime Groups"] + filter_options["crime_groups"]
             selected_crime_groups = st.multiselect("🚨 Select Crime Group(s)", crime_group_options, default=[])
 
         with col3:
             selected_time_granularity = st.radio("🕒 Granularity", ["Year", "Month", "Day"], horizontal=True)
 
-        filtered_df = crime_pattern_analysis.copy()
+        districts = None
         if "All Districts" not in selected_districts and selected_districts:
-            filtered_df = filtered_df[filtered_df["District_Name"].isin(selected_districts)]
+            districts = tuple(selected_districts)
 
+        crime_groups = None
         if "All Crime Groups" not in selected_crime_groups and selected_crime_groups:
-            filtered_df = filtered_df[filtered_df["CrimeGroup_Name"].isin(selected_crime_groups)]
+            crime_groups = tuple(selected_crime_groups)
+
+        group_by_cols = {
+            "Year": "Year",
+            "Month": "Month",
+            "Day": "Day"
+        }
+        group_col = group_by_cols[selected_time_granularity]
+        data = temporal_counts(load_temporal_rollups(), group_col, districts=districts, crime_groups=crime_groups)
 
-        if filtered_df.empty:
+        if data.empty:
             st.warning("⚠️ No data available for the selected filters.")
         else:
-            group_by_cols = {
-                "Year": "Year",
-                "Month": "Month",
-                "Day": "Day"
-            }
-            group_col = group_by_cols[selected_time_granularity]
-            data = filtered_df.groupby([group_col, "District_Name", "CrimeGroup_Name"]).size().reset_index(name="Count")
-
             fig = px.bar(
                 data, x=group_col, y="Count", color="District_Name", barmode="group",
                 hover_data=["CrimeGroup_Name"],
@@ -51,35 +233,126 @@ def temporal_analysis(crime_pattern_analysis):
             fig.update_layout(xaxis_title=selected_time_granularity, yaxis_title="Count", template="plotly_white")
             st.plotly_chart(fig, use_container_width=True)
 
-def crime_hotspot_analysis(df, mean_lat, mean_lon):
-    m = folium.Map(location=[mean_lat, mean_lon], zoom_start=7)
-    colormap = cm.LinearColormap(colors=['blue', 'yellow', 'red'], vmin=0, vmax=df['Count'].max())
+def bin_crime_coordinates(lat, lon, weights, cell_size):
+    # Sum the weights of all the points falling in the same cell_size x cell_size lat/lon cell, one row per non-empty cell at its centre
+    rows = np.floor(lat / cell_size).astype(np.int64)
+    cols = np.floor(lon / cell_size).astype(np.int64)
+    first_col = cols.min()
+    n_cols = cols.max() - first_col + 1
+
+    cells, cell_index = np.unique(rows * n_cols + (cols - first_col), return_inverse=True)
+    cell_weights = np.bincount(cell_index.ravel(), weights=weights)
+
+    return pd.DataFrame({
+        'Latitude': (cells // n_cols + 0.5) * cell_size,
+        'Longitude': (cells % n_cols + first_col + 0.5) * cell_size,
+        'Weight': cell_weights
+    })
+
+
+@st.cache_data
+def load_heat_pyramid(crime_groups, date_range):
+    # Crime counts binned into the cells of every HEAT_PYRAMID_LEVELS level for one filter set, built once and cached
+    crimes = load_hotspot_crimes(crime_groups, date_range)
+    if crimes.empty:
+        return {}
+
+    lat = crimes['Latitude'].to_numpy(dtype=float)
+    lon = crimes['Longitude'].to_numpy(dtype=float)
+    weights = np.ones(len(crimes))
+
+    return {level: bin_crime_coordinates(lat, lon, weights, cell_size) for level, cell_size in HEAT_PYRAMID_LEVELS.items()}
+
+
+def heat_pyramid_level(zoom):
+    return max(level for level in HEAT_PYRAMID_LEVELS if level <= zoom)
+
 
-    HeatMap(df[['Latitude', 'Longitude', 'Count']].values.tolist(),
+def heat_cells_for_view(heat_pyramid, zoom, bounds=None):
+    # Cells of the pyramid level matching the map zoom, restricted to the (south, west, north, east) bounds when given
+    cells = heat_pyramid[heat_pyramid_level(zoom)]
+    if bounds is not None:
+        south, west, north, east = bounds
+        cells = cells[cells['Latitude'].between(south, north) & cells['Longitude'].between(west, east)]
+    return cells
+
+
+def update_hotspot_view(map_state, zoom, bounds):
+    # Re-bin on the server only when the map moves to another pyramid level or leaves the area whose cells were sent.
+    # The new area is padded by half a screen on every side so small pans do not trigger another rerun
+    if not map_state or not map_state.get('bounds') or map_state.get('zoom') is None or not map_state.get('center'):
+        return
+
+    south, west = map_state['bounds']['_southWest']['lat'], map_state['bounds']['_southWest']['lng']
+    north, east = map_state['bounds']['_northEast']['lat'], map_state['bounds']['_northEast']['lng']
+    if south is None or north is None:
+        return
+
+    inside = bounds is None or (south >= bounds[0] and west >= bounds[1] and north <= bounds[2] and east <= bounds[3])
+    if heat_pyramid_level(map_state['zoom']) == heat_pyramid_level(zoom) and inside:
+        return
+
+    lat_padding = (north - south) / 2
+    lon_padding = (east - west) / 2
+    st.session_state.hotspot_view = {
+        'center': [map_state['center']['lat'], map_state['center']['lng']],
+        'zoom': map_state['zoom'],
+        'bounds': (south - lat_padding, west - lon_padding, north + lat_padding, east + lon_padding)
+    }
+    st.rerun()
+
+
+@st.cache_data
+def load_hotspot_clusters(crime_groups, date_range):
+    # Cluster centres/crime counts for one filter set, memoized so repeated "Show Hotspots" clicks do not refit the clustering.
+    # Returns the cluster centres and the map centre, or (None, None) when no crime matches the filters
+    crimes = load_hotspot_crimes(crime_groups, date_range)
+    if crimes.empty:
+        return None, None
+
+    aggregated_data = crimes.groupby(['District_Name', 'UnitName', 'Latitude', 'Longitude', 'CrimeGroup_Name'], observed=True)\
+                            .size().reset_index(name='Count')
+    map_center = [aggregated_data['Latitude'].mean(), aggregated_data['Longitude'].mean()]
+
+    # Many aggregated rows share the co-ordinates of their police unit, so the clustering runs on the distinct co-ordinates
+    # weighted by how many aggregated rows they stand for, which gives every row the label it gets from the same haversine
+    # DBSCAN over all the aggregated rows
+    location_index, locations = pd.factorize(pd.MultiIndex.from_frame(aggregated_data[['Latitude', 'Longitude']]))
+    location_rows = np.bincount(location_index)
+    location_coords = np.radians(np.array(locations.tolist(), dtype=float))
+
+    dbscan = DBSCAN(eps=HOTSPOT_EPS_KM / EARTH_RADIUS_KM, min_samples=HOTSPOT_MIN_SAMPLES, metric='haversine', algorithm='ball_tree')
+    aggregated_data['Cluster'] = dbscan.fit_predict(location_coords, sample_weight=location_rows)[location_index]
+
+    # Centres and crime counts of all the clusters in one grouped pass
+    cluster_centers = aggregated_data[aggregated_data['Cluster'] != -1].groupby('Cluster').agg(
+        Latitude=('Latitude', 'mean'), Longitude=('Longitude', 'mean'), Count=('Count', 'sum')).reset_index()
+
+    return cluster_centers, map_center
+
+
+def crime_hotspot_analysis(cluster_centers, heat_cells, max_weight, center, zoom):
+    m = folium.Map(location=center, zoom_start=zoom)
+    colormap = cm.LinearColormap(colors=['blue', 'yellow', 'red'], vmin=0, vmax=max_weight)
+
+    # Only the per-cell weights of the current view are sent to the browser, scaled by the level maximum so colours stay stable while panning
+    heat_data = np.column_stack([heat_cells['Latitude'], heat_cells['Longitude'], heat_cells['Weight'] / max_weight])
+    HeatMap(heat_data.tolist(),
             gradient={"0.4": 'blue', "0.65": 'yellow', "1.0": 'red'},
             radius=15).add_to(m)
 
-    coords = df[['Latitude', 'Longitude']].values
-    dbscan = DBSCAN(eps=0.1, min_samples=5)
-    df['Cluster'] = dbscan.fit_predict(coords)
-
-    for cluster in df['Cluster'].unique():
-        if cluster != -1:
-            cluster_points = df[df['Cluster'] == cluster]
-            center_lat = cluster_points['Latitude'].mean()
-            center_lon = cluster_points['Longitude'].mean()
-            count = cluster_points['Count'].sum()
-            folium.Marker(
-                [center_lat, center_lon],
-                popup=f'Cluster {cluster}<br>Crimes: {count}',
-                icon=folium.Icon(color='red', icon='info-sign')
-            ).add_to(m)
+    for cluster, center_lat, center_lon, count in cluster_centers[['Cluster', 'Latitude', 'Longitude', 'Count']].itertuples(index=False):
+        folium.Marker(
+            [center_lat, center_lon],
+            popup=f'Cluster {cluster}<br>Crimes: {count}',
+            icon=folium.Icon(color='red', icon='info-sign')
+        ).add_to(m)
 
     colormap.add_to(m)
     colormap.caption = 'Crime Density'
     return m
 
-def crime_hotspots(crime_pattern_analysis, mean_lat, mean_lon):
+def crime_hotspots(filter_options):
     st.markdown("### 🔥 Crime Hotspot Map")
     st.markdown("<p style='color:gray;'>Visualize crime clusters and heatmap by date and type.</p>", unsafe_allow_html=True)
 
@@ -88,39 +361,46 @@ def crime_hotspots(crime_pattern_analysis, mean_lat, mean_lon):
     with col1:
         dates = st.radio("📆 Date Filter", ["All", "Custom Date Range"], horizontal=True)
         if dates == "All":
-            date_range = (crime_pattern_analysis['Date'].min(), crime_pattern_analysis['Date'].max())
+            date_range = (filter_options['min_date'], filter_options['max_date'])
         else:
             date_range = st.date_input("Select date range",
-                                       [crime_pattern_analysis['Date'].min(), crime_pattern_analysis['Date'].max()],
+                                       [filter_options['min_date'], filter_options['max_date']],
                                        key='date_range')
             if len(date_range) != 2:
                 st.stop()
 
     with col2:
-        crime_types = st.multiselect("🔍 Crime Group(s)", crime_pattern_analysis['CrimeGroup_Name'].unique())
+        crime_types = st.multiselect("🔍 Crime Group(s)", filter_options['crime_groups'])
+
+    crime_groups = tuple(crime_types) or None
+    date_range = (pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]))
 
-    filtered_data = crime_pattern_analysis[
-        (crime_pattern_analysis['Date'] >= pd.Timestamp(date_range[0])) &
-        (crime_pattern_analysis['Date'] <= pd.Timestamp(date_range[1]))
-    ]
+    # The map stays on screen after the click so that zooming/panning can request the cells of the new view
+    if st.button("🔎 Show Hotspots"):
+        st.session_state.show_hotspots = True
+        st.session_state.hotspot_view = {'center': None, 'zoom': 7, 'bounds': None}
 
-    if crime_types:
-        filtered_data = filtered_data[filtered_data['CrimeGroup_Name'].isin(crime_types)]
+    cluster_centers, map_center = None, None
+    if st.session_state.get('show_hotspots'):
+        cluster_centers, map_center = load_hotspot_clusters(crime_groups, date_range)
 
-    if st.button("🔎 Show Hotspots") and not filtered_data.empty:
-        aggregated_data = filtered_data.groupby(['District_Name', 'UnitName', 'Latitude', 'Longitude', 'CrimeGroup_Name'])\
-                                       .size().reset_index(name='Count')
+    if cluster_centers is not None:
+        view = st.session_state.hotspot_view
+        center = view['center'] or map_center
 
-        mean_lat = aggregated_data['Latitude'].mean()
-        mean_lon = aggregated_data['Longitude'].mean()
+        heat_pyramid = load_heat_pyramid(crime_groups, date_range)
+        heat_cells = heat_cells_for_view(heat_pyramid, view['zoom'], view['bounds'])
+        max_weight = heat_pyramid[heat_pyramid_level(view['zoom'])]['Weight'].max()
 
-        m = crime_hotspot_analysis(aggregated_data, mean_lat, mean_lon)
-        st.components.v1.html(m._repr_html_(), height=600)
+        m = crime_hotspot_analysis(cluster_centers, heat_cells, max_weight, center, view['zoom'])
+        map_state = st_folium(m, height=600, use_container_width=True, returned_objects=['zoom', 'bounds', 'center'], key='hotspot_map')
+        update_hotspot_view(map_state, view['zoom'], view['bounds'])
 
         st.markdown("""<hr/>
         ✅ <strong>How to read this map:</strong><br>
         - Red zones = High density of crimes<br>
         - Markers = Cluster centers<br>
+        - Zoom in for finer crime density cells<br>
         - Filter the map by date and crime type above
         """, unsafe_allow_html=True)
 
@@ -128,7 +408,7 @@ def chloropleth_maps(df, geojson_data, mean_lat, mean_lon):
     st.markdown("### 🗏️ Choropleth Map Analysis")
     st.markdown("<p style='color:gray;'>Choose a metric to visualize district-wise crime impact.</p>", unsafe_allow_html=True)
 
-    district_stats = df.groupby('District_Name').agg({
+    district_stats = df.groupby('District_Name', observed=True).agg({
         'FIRNo': 'count',
         'VICTIM COUNT': 'sum',
         'Accused Count': 'sum'
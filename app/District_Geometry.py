@@ -0,0 +1,186 @@
+import json
+import os
+
+import numpy as np
+import streamlit as st
+
+# Determine the root directory of the project
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Karnataka district boundaries are vendored under assets/ and copied into the image, the URL is only used by the
+# __main__ block below to vendor the files once. The app never downloads them
+district_geojson_url = "https://raw.githubusercontent.com/adarshbiradar/maps-geojson/master/states/karnataka.json"
+district_geojson_path = os.path.join(root_dir, 'assets', 'karnataka.json')
+simplified_geojson_dir = os.path.join(root_dir, 'assets', 'geojson')
+
+# Simplification levels, name -> Douglas-Peucker tolerance in degrees (0 keeps the full resolution geometry)
+GEOMETRY_TOLERANCES = {'full': 0.0, 'medium': 0.002, 'low': 0.01}
+
+# Tolerance used by the state-wide choropleth (zoom 5, roughly 5 km per pixel)
+CHOROPLETH_TOLERANCE = GEOMETRY_TOLERANCES['low']
+
+# Decimal places kept in the coordinates sent to the browser (about 1 m)
+COORDINATE_DECIMALS = 5
+
+
+def geometry_rings(geometry):
+    # Yields every ring (outer boundary and holes) of a Polygon or MultiPolygon geometry
+    polygons = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+    for polygon in polygons:
+        yield from polygon
+
+
+def simplify_line(points, tolerance):
+    # Douglas-Peucker on an (n, 2) array, returns the mask of the points that are kept.
+    # The two end points are always kept, so a line shared by two polygons stays joined to its neighbours.
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(segment[0], segment[1])
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.extend([(start, split), (split, end)])
+
+    return keep
+
+
+def find_junctions(rings):
+    # A vertex is a junction when it is connected to more than two other vertices, i.e. where the border shared by two
+    # districts starts or ends. Splitting the rings there gives arcs that are either shared completely or not at all.
+    neighbours = {}
+    for ring in rings:
+        for a, b in zip(ring[:-1], ring[1:]):
+            neighbours.setdefault(a, set()).add(b)
+            neighbours.setdefault(b, set()).add(a)
+
+    return {vertex for vertex, linked in neighbours.items() if len(linked) > 2}
+
+
+def split_ring(ring, junctions):
+    # Splits a closed ring into arcs running from junction to junction. A ring with fewer than two junctions (an island,
+    # or a border with no neighbours) is also split at the vertex farthest from its start so it cannot collapse.
+    points = ring[:-1]
+    cuts = [i for i, point in enumerate(points) if point in junctions]
+    if len(cuts) < 2:
+        start = np.array(points[cuts[0] if cuts else 0])
+        cuts = [cuts[0] if cuts else 0, int(np.argmax([np.hypot(x - start[0], y - start[1]) for x, y in points]))]
+
+    cuts = sorted(set(cuts))
+    rotated = points[cuts[0]:] + points[:cuts[0]] + [points[cuts[0]]]
+    cuts = [cut - cuts[0] for cut in cuts] + [len(points)]
+
+    return [rotated[start:end + 1] for start, end in zip(cuts[:-1], cuts[1:])]
+
+
+def simplify_geojson(geojson_data, tolerance):
+    # Topology-preserving simplification: the rings are cut into arcs at the junctions shared by several districts and
+    # every distinct arc is simplified once, so two neighbouring districts keep exactly the same border (no gaps or
+    # overlaps). Only the 'district' property used by the choropleth is kept to cut the payload sent to plotly.
+    features = []
+    for feature in geojson_data['features']:
+        rings = [[(round(x, 7), round(y, 7)) for x, y, *_ in ring] for ring in geometry_rings(feature['geometry'])]
+        features.append((feature, rings))
+
+    junctions = find_junctions([ring for _, rings in features for ring in rings])
+    simplified_arcs = {}
+
+    def simplify_arc(arc):
+        # Arcs are stored in one canonical direction, so the same border walked backwards by the neighbour is reused
+        key = tuple(arc) if arc[0] <= arc[-1] else tuple(reversed(arc))
+        if key not in simplified_arcs:
+            points = np.array(key)
+            simplified_arcs[key] = [key[i] for i in np.flatnonzero(simplify_line(points, tolerance))] if tolerance > 0 else list(key)
+
+        simplified = simplified_arcs[key]
+        return simplified if tuple(arc) == key else simplified[::-1]
+
+    def simplify_ring(ring):
+        arcs = [simplify_arc(arc) for arc in split_ring(ring, junctions)]
+        simplified = [point for arc in arcs for point in arc[:-1]] + [arcs[0][0]]
+        if len(simplified) < 4:
+            simplified = ring
+
+        return [[round(x, COORDINATE_DECIMALS), round(y, COORDINATE_DECIMALS)] for x, y in simplified]
+
+    simplified_features = []
+    for feature, rings in features:
+        simplified_rings = iter([simplify_ring(ring) for ring in rings])
+        geometry = feature['geometry']
+        if geometry['type'] == 'Polygon':
+            coordinates = [next(simplified_rings) for _ in geometry['coordinates']]
+        else:
+            coordinates = [[next(simplified_rings) for _ in polygon] for polygon in geometry['coordinates']]
+
+        simplified_features.append({
+            'type': 'Feature',
+            'properties': {'district': feature['properties'].get('district')},
+            'geometry': {'type': geometry['type'], 'coordinates': coordinates}
+        })
+
+    return {'type': 'FeatureCollection', 'features': simplified_features}
+
+
+def simplified_geojson_path(tolerance):
+    return os.path.join(simplified_geojson_dir, f"karnataka_{tolerance:g}.json")
+
+
+def vendor_district_geojson():
+    # Downloads the district boundaries once and writes them, with every simplification level, under assets/
+    import requests
+
+    response = requests.get(district_geojson_url, timeout=60)
+    response.raise_for_status()
+
+    with open(district_geojson_path, 'w') as f:
+        json.dump(response.json(), f)
+
+    save_simplified_geojson()
+
+
+def save_simplified_geojson():
+    with open(district_geojson_path) as f:
+        geojson_data = json.load(f)
+
+    os.makedirs(simplified_geojson_dir, exist_ok=True)
+    for tolerance in GEOMETRY_TOLERANCES.values():
+        with open(simplified_geojson_path(tolerance), 'w') as f:
+            json.dump(simplify_geojson(geojson_data, tolerance), f, separators=(',', ':'))
+
+
+@st.cache_data
+def load_district_geojson(tolerance=CHOROPLETH_TOLERANCE):
+    # District geometry simplified to the given tolerance, read from the pre-simplified asset when it exists and
+    # otherwise simplified from the vendored full resolution file (once per tolerance, then served from the cache)
+    if os.path.exists(simplified_geojson_path(tolerance)):
+        with open(simplified_geojson_path(tolerance)) as f:
+            return json.load(f)
+
+    if not os.path.exists(district_geojson_path):
+        raise FileNotFoundError(f"District boundaries {district_geojson_path} are missing, vendor them with "
+                                f"'python app/District_Geometry.py' and commit assets/karnataka.json and assets/geojson/")
+
+    with open(district_geojson_path) as f:
+        return simplify_geojson(json.load(f), tolerance)
+
+
+if __name__ == '__main__':
+    # Run once from a machine with network access (python app/District_Geometry.py) and commit the files in assets/
+    if os.path.exists(district_geojson_path):
+        save_simplified_geojson()
+    else:
+        vendor_district_geojson()
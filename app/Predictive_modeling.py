@@ -1,10 +1,11 @@
-import json
 import os
-import h2o
-import joblib
 import pandas as pd
 import streamlit as st
-from sklearn.dummy import DummyClassifier
+
+from Recidivism_Encoder import encode, frequencies, load_recidivism_encoder, row_codes
+from Recidivism_Model_Pool import ModelPool
+from Recidivism_Risk_Table import load_risk_table, lookup_risk, risk_index_path
+from Recidivism_Scorer import check_features, load_recidivism_scorer, predict_proba
 
 # Determine the root directory of the project
 root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -14,26 +15,34 @@ def load_data_recidivism():
     data_file_path = os.path.join(root_dir, 'Component_datasets', 'Recidivism_cleaned_data.csv')
     return pd.read_csv(data_file_path)
 
-# Load the model
+# Load the model: the StackedEnsemble MOJO exported to NumPy arrays and scored in-process, without H2O or a JVM.
+# None when no MOJO has been trained. A MOJO or scorer that cannot be read raises, the page reports it
 @st.cache_resource
 def load_model_recidivism():
-    return None  # Placeholder since we do not have the actual model
+    return load_recidivism_scorer()
+
+# Load the feature encoder: frequency_encoding.json and scaler.pkl compiled into scaled lookup arrays once per process
+@st.cache_resource
+def load_encoder_recidivism():
+    return load_recidivism_encoder()
+
+def risk_table_version():
+    # Size and modification time of the risk table index written by build_risk_table.py, None before its first run
+    if not os.path.exists(risk_index_path):
+        return None
+    stat = os.stat(risk_index_path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+# Load the precomputed risk table, memory-mapped. None when it was not built or was built from another model or encoder
+# (the scorer and encoder are process-wide resources, the leading underscore keeps Streamlit from hashing them)
+@st.cache_resource
+def load_risk_table_recidivism(version, _scorer, _encoder):
+    return load_risk_table(_scorer, _encoder) if version is not None else None
 
-# Fallback mock-up for individual models
+# Fallback mock-up for individual models: the five members loaded once per process into a pool scoring them concurrently
 @st.cache_resource
 def load_individual_models():
-    try:
-        model_paths = [
-            os.path.join(root_dir, 'models', 'Recidivism_model', f'model_{i}.zip') for i in range(1, 6)
-        ]
-        missing = any(not os.path.exists(path) for path in model_paths)
-        if missing:
-            return [DummyClassifier(strategy="most_frequent") for _ in range(5)]
-
-        individual_models = [h2o.import_mojo(path) for path in model_paths]
-        return individual_models
-    except:
-        return [DummyClassifier(strategy="most_frequent") for _ in range(5)]
+    return ModelPool()
 
 # Get unique values for categorical features
 def get_unique_values(data, feature):
@@ -44,17 +53,15 @@ def predictive_modeling_recidivism():
     st.write("Predict whether a previous accused person will commit a crime again.")
 
     try:
-        h2o.init()
-    except:
-        st.warning("H2O initialization skipped (mock mode)")
-
-    model = load_model_recidivism()
+        model = load_model_recidivism()
+    except Exception as e:
+        st.error(f"⚠️ The recidivism model could not be loaded ({type(e).__name__}: {e}), predictions fall back to the individual models.")
+        model = None
 
-    base_path = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.abspath(os.path.join(base_path, '..'))
-
-    scaler_path = os.path.join(project_root, 'models', 'Recidivism_model', 'scaler.pkl')
-    scaler = joblib.load(scaler_path)
+    encoder = load_encoder_recidivism()
+    # Same check as the batch scoring, a scaler and MOJO from different trainings would score the features out of place
+    if model is not None:
+        check_features(model, encoder)
 
     cleaned_data = load_data_recidivism()
 
@@ -71,42 +78,60 @@ def predictive_modeling_recidivism():
         present_district = st.selectbox("Crime District", unique_districts)
         present_city = st.selectbox("Criminal Present City", unique_cities)
 
-    frequency_path = os.path.join(project_root, 'models', 'Recidivism_model', 'frequency_encoding.json')
-    with open(frequency_path) as f:
-        frequency = json.load(f)
+    codes = row_codes(encoder, {
+        'District_Name': present_district,
+        'Caste': caste,
+        'Profession': profession,
+        'PresentCity': present_city
+    })
+    encoded = dict(zip([encoder['features'][i] for i in encoder['categorical']], frequencies(encoder, codes)[0]))
 
     st.write("### Encoding Values")
-    caste_encoded = frequency["Caste"].get(caste, 0)
-    profession_encoded = frequency["Profession"].get(profession, 0)
-    present_district_encoded = frequency["District_Name"].get(present_district, 0)
-    present_city_encoded = frequency["PresentCity"].get(present_city, 0)
-
-    st.write(f"Caste (encoded): {caste} → {caste_encoded}")
-    st.write(f"Profession (encoded): {profession} → {profession_encoded}")
-    st.write(f"District (encoded): {present_district} → {present_district_encoded}")
-    st.write(f"City (encoded): {present_city} → {present_city_encoded}")
-
-    new_data = pd.DataFrame({
-        'District_Name': [present_district_encoded],
-        'age': [age],
-        'Caste': [caste_encoded],
-        'Profession': [profession_encoded],
-        'PresentCity': [present_city_encoded],
-    })
+    st.write(f"Caste (encoded): {caste} → {encoded['Caste']}")
+    st.write(f"Profession (encoded): {profession} → {encoded['Profession']}")
+    st.write(f"District (encoded): {present_district} → {encoded['District_Name']}")
+    st.write(f"City (encoded): {present_city} → {encoded['PresentCity']}")
+
+    new_data = pd.DataFrame([{**encoded, 'age': age}], columns=encoder['features'])
 
     st.write("### Data Before Scaling")
     st.write(new_data)
 
-    new_data_scaled = scaler.transform(new_data)
+    new_data_scaled = encode(encoder, codes, [[age]])
     new_df = pd.DataFrame(new_data_scaled, columns=new_data.columns, index=new_data.index)
 
     st.write("### Data After Scaling")
     st.write(new_df)
 
-    try:
-        new_dataframe = h2o.H2OFrame(new_df)
-    except:
-        new_dataframe = new_df
+    if model is not None:
+        st.markdown("""
+    **Prediction Methodology:**
+    - The model uses a **Stacked Ensemble** (a GLM over Random Forest and XGBoost models) to predict the likelihood of a person re-offending.
+    - The model considers features such as **age**, **caste**, **profession**, and **location**.
+    """)
+
+        if st.button("Predict"):
+            # Served from the precomputed risk table when it covers the input, scored live otherwise
+            risk_table = load_risk_table_recidivism(risk_table_version(), model, encoder)
+            probability = lookup_risk(risk_table, encoder, codes, age) if risk_table is not None else None
+
+            if probability is None:
+                probabilities, base_probabilities = predict_proba(model, new_data_scaled)
+                probability = probabilities[0]
+
+                st.write("### Base Model Probabilities:")
+                for name, base_probability in base_probabilities.items():
+                    st.write(f"{name.split('_')[0]}: {base_probability[0]:.1%} likely to repeat")
+            else:
+                st.caption("Served from the precomputed risk table")
+
+            st.write(f"Stacked Ensemble: {probability:.1%} likely to repeat (threshold {model['threshold']:.1%})")
+
+            final_result = "🔴 The person is **likely** to repeat the crime." if probability >= model['threshold'] else "🔵 The person is **not likely** to repeat the crime."
+
+            st.markdown("### Final Outcome:")
+            st.markdown(final_result)
+        return
 
     st.markdown("""
     **Prediction Methodology:**
@@ -115,31 +140,26 @@ def predictive_modeling_recidivism():
     - All predictions here are generated using placeholder models.
     """)
 
-    individual_models = load_individual_models()
-    model_names = ["K-Nearest Neighbors (KNN)", "Naive Bayes", "Random Forest", "Logistic Regression", "Gradient Boosting"]
+    model_pool = load_individual_models()
 
     if st.button("Predict"):
         st.write("### Making Predictions...")
 
-        predictions = []
-        for model in individual_models:
-            if isinstance(model, DummyClassifier):
-                model.fit(new_data, [0] * len(new_data))
-                predictions.append(model.predict(new_data).item())
-            else:
-                pred = model.predict(new_dataframe)
-                predictions.append(int(pred.as_data_frame().loc[0, "predict"]))
+        result = model_pool.predict(new_data_scaled, encoder['features'])
 
         st.write("### Top 5 Model Predictions:")
-        for i, (pred, name) in enumerate(zip(predictions, model_names)):
-            result = 'Likely to repeat' if pred == 1 else 'Not likely to repeat'
-            st.write(f"Model {i+1} ({name}): {result}")
+        for i, name in enumerate(model_pool.names):
+            vote = 'Likely to repeat' if result['votes'][name][0] == 1 else 'Not likely to repeat'
+            st.write(f"Model {i+1} ({name}): {vote} ({result['latencies'][name] * 1000:.1f} ms)")
 
-        final_result = "🔴 The person is **likely** to repeat the crime." if sum(predictions) / len(predictions) > 0.5 else "🔵 The person is **not likely** to repeat the crime."
+        final_result = "🔴 The person is **likely** to repeat the crime." if result['outcome'][0] == 1 else "🔵 The person is **not likely** to repeat the crime."
 
         st.markdown("### Final Outcome:")
         st.markdown(final_result)
 
+        st.write("### Model Latency:")
+        st.dataframe(pd.DataFrame(model_pool.latency_summary()), hide_index=True)
+
     st.markdown("""
     **How This Works:**
     - The app predicts the likelihood of repeat offenses based on past behavior and demographic features.
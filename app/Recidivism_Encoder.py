@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+
+# Determine the root directory of the project
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+recidivism_model_dir = os.path.join(root_dir, 'models', 'Recidivism_model')
+
+# Features of the recidivism model in the order it was trained on, used when the scaler does not record them
+FEATURES = ['District_Name', 'age', 'Caste', 'Profession', 'PresentCity']
+
+# Categorical features replaced by their frequency in the training data, 0 for the values it did not have
+ENCODED_COLUMNS = ['District_Name', 'Caste', 'Profession', 'PresentCity']
+
+
+def compile_encoder(frequency, mean, scale, features=FEATURES):
+    # Frequency encoding and standardisation of the recidivism features folded into lookup arrays. Every categorical
+    # feature gets dense codes (its categories sorted, the code after the last one for the unseen values) and the lookup
+    # tables of all of them are concatenated into one array of already scaled values, (frequency - mean) / scale, so a
+    # (n_rows, n_categorical) code matrix is encoded by a single fancy indexing
+    categorical = [i for i, feature in enumerate(features) if feature in ENCODED_COLUMNS]
+    numeric = [i for i, feature in enumerate(features) if feature not in ENCODED_COLUMNS]
+
+    categories, codes, counts, table, offsets = {}, {}, [], [], []
+    for i in categorical:
+        feature = features[i]
+        names = np.array(sorted(frequency[feature]), dtype=str)
+        feature_counts = np.array([frequency[feature][name] for name in names] + [0], dtype=np.int64)
+
+        categories[feature] = names
+        codes[feature] = {name: code for code, name in enumerate(names)}
+        offsets.append(sum(len(previous) for previous in counts))
+        counts.append(feature_counts)
+        table.append((feature_counts - mean[i]) / scale[i])
+
+    return {
+        'features': list(features),
+        'categorical': np.array(categorical, dtype=np.intp),
+        'numeric': np.array(numeric, dtype=np.intp),
+        'categories': categories,
+        'codes': codes,
+        'offsets': np.array(offsets, dtype=np.intp),
+        'counts': np.concatenate(counts),
+        'table': np.concatenate(table),
+        'mean': np.asarray(mean, dtype=np.float64)[numeric],
+        'scale': np.asarray(scale, dtype=np.float64)[numeric]
+    }
+
+
+def load_recidivism_encoder(model_dir=recidivism_model_dir):
+    # Encoder compiled from the frequency_encoding.json and scaler.pkl written by the training
+    with open(os.path.join(model_dir, 'frequency_encoding.json')) as f:
+        frequency = json.load(f)
+    scaler = joblib.load(os.path.join(model_dir, 'scaler.pkl'))
+    features = [str(feature) for feature in getattr(scaler, 'feature_names_in_', FEATURES)]
+    return compile_encoder(frequency, scaler.mean_, scaler.scale_, features)
+
+
+def encoder_sha256(encoder):
+    # Content hash of a compiled encoder (its features, categories and scaled lookup values), stored with what is built
+    # from it so a retrained encoding is detected whatever the modification times of its files
+    digest = hashlib.sha256(json.dumps(encoder['features']).encode())
+    for i in encoder['categorical']:
+        digest.update('\0'.join(encoder['categories'][encoder['features'][i]]).encode())
+    for key in ['categorical', 'numeric', 'offsets', 'counts']:
+        digest.update(np.asarray(encoder[key], dtype=np.int64).tobytes())
+    for key in ['table', 'mean', 'scale']:
+        digest.update(np.asarray(encoder[key], dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def category_codes(encoder, feature, values):
+    # Codes of an array of category strings, the unseen code for the values the training data did not have
+    names = encoder['categories'][feature]
+    values = np.asarray(values, dtype=str)
+    codes = np.minimum(np.searchsorted(names, values), len(names) - 1)
+    return np.where(names[codes] == values, codes, len(names))
+
+
+def row_codes(encoder, row):
+    # (1, n_categorical) codes of one record given as {feature: value}, looked up in the code dicts
+    codes = []
+    for i in encoder['categorical']:
+        feature = encoder['features'][i]
+        codes.append(encoder['codes'][feature].get(row[feature], len(encoder['categories'][feature])))
+    return np.array([codes], dtype=np.intp)
+
+
+def frequencies(encoder, codes):
+    # Training frequencies of a code matrix, the features before scaling
+    return encoder['counts'][codes + encoder['offsets']]
+
+
+def encode(encoder, codes, numeric):
+    # (n_rows, n_features) scaled features, in the order of encoder['features'], from the (n_rows, n_categorical) category
+    # codes and the (n_rows, n_numeric) numeric features. Equal to scaler.transform of the frequency encoded features
+    codes = np.asarray(codes, dtype=np.intp)
+    X = np.empty((len(codes), len(encoder['features'])))
+    X[:, encoder['categorical']] = encoder['table'][codes + encoder['offsets']]
+    X[:, encoder['numeric']] = (np.asarray(numeric, dtype=np.float64).reshape(len(codes), -1) - encoder['mean']) / encoder['scale']
+    return X
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.dummy import DummyClassifier
+
+from Recidivism_Encoder import FEATURES
+
+# Determine the root directory of the project
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Members of the fallback ensemble voting when no StackedEnsemble MOJO was trained, with the MOJO each one is loaded from
+MEMBER_NAMES = ["K-Nearest Neighbors (KNN)", "Naive Bayes", "Random Forest", "Logistic Regression", "Gradient Boosting"]
+MEMBER_PATHS = [os.path.join(root_dir, 'models', 'Recidivism_model', f'model_{i}.zip') for i in range(1, 6)]
+
+
+def load_members(paths, n_features):
+    # The H2O MOJOs of every member when they all exist, otherwise (or when H2O cannot start) most-frequent
+    # DummyClassifiers fitted once here on a row of the feature width, so they predict 0 without a fit per call.
+    # Returns the models and whether they are H2O models
+    if all(os.path.exists(path) for path in paths):
+        try:
+            import h2o
+            h2o.init()
+            return [h2o.import_mojo(path) for path in paths], True
+        except Exception:
+            pass
+
+    dummies = [DummyClassifier(strategy="most_frequent").fit(np.zeros((1, n_features)), [0]) for _ in paths]
+    return dummies, False
+
+
+class ModelPool:
+    # Members of the fallback ensemble loaded once per process and scored concurrently on a thread pool (H2O members wait
+    # on the H2O cluster, the dummies are trivial), with the latency of every member. Shared by the Streamlit sessions,
+    # hence the lock on the latency statistics
+    def __init__(self, names=MEMBER_NAMES, paths=MEMBER_PATHS, n_features=len(FEATURES)):
+        self.names = list(names)
+        self.models, self.h2o = load_members(paths, n_features)
+        self.executor = ThreadPoolExecutor(max_workers=len(self.models), thread_name_prefix='recidivism-member')
+        self.latency = {name: {'calls': 0, 'total': 0.0, 'last': 0.0, 'max': 0.0} for name in self.names}
+        self.lock = threading.Lock()
+
+    def predict_member(self, name, model, X, frame):
+        # Votes (0/1) and probabilities of class 1 of one member for every row, with its time in seconds
+        start = time.perf_counter()
+        if frame is None:
+            votes = model.predict(X).astype(int)
+            classes = list(model.classes_)
+            probabilities = model.predict_proba(X)[:, classes.index(1)] if 1 in classes else np.zeros(len(X))
+        else:
+            # Read back as plain rows, no pandas conversion of the H2O predictions
+            rows = model.predict(frame)[['predict', 'p1']].as_data_frame(use_pandas=False, header=False)
+            predictions = np.array(rows, dtype=float).reshape(-1, 2)
+            votes, probabilities = predictions[:, 0].astype(int), predictions[:, 1]
+        elapsed = time.perf_counter() - start
+
+        with self.lock:
+            latency = self.latency[name]
+            latency['calls'] += 1
+            latency['total'] += elapsed
+            latency['last'] = elapsed
+            latency['max'] = max(latency['max'], elapsed)
+
+        return votes, probabilities, elapsed
+
+    def predict(self, X, columns):
+        # Votes, probabilities and latency of every member for the scaled feature rows X (n_rows, n_features), scored
+        # concurrently, with the share of members voting 1 and the majority outcome. H2O members share one H2OFrame
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(columns))
+        frame = None
+        if self.h2o:
+            import h2o
+            frame = h2o.H2OFrame(X.tolist(), column_names=list(columns))
+
+        futures = [self.executor.submit(self.predict_member, name, model, X, frame) for name, model in zip(self.names, self.models)]
+        votes, probabilities, latencies = zip(*(future.result() for future in futures))
+
+        vote_share = np.mean(votes, axis=0)
+        return {
+            'votes': dict(zip(self.names, votes)),
+            'probabilities': dict(zip(self.names, probabilities)),
+            'latencies': dict(zip(self.names, latencies)),
+            'vote_share': vote_share,
+            'outcome': (vote_share > 0.5).astype(int)
+        }
+
+    def latency_summary(self):
+        # Calls, last, mean and worst latency in milliseconds of every member since the pool was loaded
+        with self.lock:
+            return [{'Model': name, 'Calls': latency['calls'], 'Last (ms)': latency['last'] * 1000,
+                     'Mean (ms)': latency['total'] / max(latency['calls'], 1) * 1000, 'Max (ms)': latency['max'] * 1000}
+                    for name, latency in self.latency.items()]
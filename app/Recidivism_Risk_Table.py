@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+
+from Recidivism_Encoder import encoder_sha256, recidivism_model_dir
+from Recidivism_Scorer import predict_proba
+
+risk_table_path = os.path.join(recidivism_model_dir, 'risk_table.npy')
+risk_index_path = os.path.join(recidivism_model_dir, 'risk_table_index.npz')
+
+# Ages the prediction form accepts, the numeric axis of the risk table
+RISK_TABLE_AGES = np.arange(7, 101)
+
+# Largest table built, a float64 probability per input tuple: 50M tuples take 400 MB on disk (the 26.8M tuples of the
+# current model 215 MB), only the pages of the entries looked up are read into memory. Larger input spaces keep scoring
+# live. The probabilities are kept in float64, the precision predict_proba returns and the threshold is compared in, so a
+# table hit and live scoring always decide the same way
+MAX_RISK_TABLE_ROWS = 50_000_000
+
+
+def feature_candidates(encoder, feature):
+    # Scaled values a feature can take in the form: the lookup table entries of a categorical feature (its codes, the
+    # unseen code included) or the scaled ages
+    i = encoder['features'].index(feature)
+    if i in encoder['numeric']:
+        j = list(encoder['numeric']).index(i)
+        return (RISK_TABLE_AGES - encoder['mean'][j]) / encoder['scale'][j]
+
+    j = list(encoder['categorical']).index(i)
+    start = encoder['offsets'][j]
+    return encoder['table'][start:start + len(encoder['categories'][feature]) + 1]
+
+
+def equivalence_classes(scorer, encoder, feature):
+    # Candidates of a feature grouped by the side of every split on that feature they fall on, in every tree of every base
+    # model (compared as the base model does). Candidates of a class reach the same leaves, so the risk table has one
+    # entry per class and not per candidate. Returns the class of every candidate and a representative value per class
+    i = encoder['features'].index(feature)
+    candidates = feature_candidates(encoder, feature)
+
+    sides = []
+    for model in range(len(scorer['base_models'])):
+        splits = scorer[f"model{model}_feature"] == i
+        threshold = scorer[f"model{model}_threshold"][splits]
+        if scorer[f"model{model}_algo"] == 'xgboost':
+            sides.append(candidates.astype(np.float32)[:, None] < threshold[None, :])
+        else:
+            sides.append(candidates[:, None] < threshold.astype(np.float64)[None, :])
+
+    _, first, classes = np.unique(np.hstack(sides), axis=0, return_index=True, return_inverse=True)
+    return classes.ravel(), candidates[first]
+
+
+def risk_table_index(scorer, encoder):
+    # Class of every candidate and representatives of every feature, in the order of encoder['features'], with the hashes
+    # of the MOJO and the encoder the table is built from
+    index = {'mojo_sha256': np.array(scorer['mojo_sha256']), 'encoder_sha256': np.array(encoder_sha256(encoder))}
+    for feature in encoder['features']:
+        index[f"{feature}_classes"], index[f"{feature}_values"] = equivalence_classes(scorer, encoder, feature)
+    index['shape'] = np.array([len(index[f"{feature}_values"]) for feature in encoder['features']], dtype=np.int64)
+    return index
+
+
+def score_risk_rows(scorer, encoder, index, start, stop):
+    # Ensemble probability of the flat table entries [start, stop), every entry the tuple of its class representatives
+    classes = np.unravel_index(np.arange(start, stop), tuple(index['shape']))
+    X = np.column_stack([index[f"{feature}_values"][feature_classes]
+                         for feature, feature_classes in zip(encoder['features'], classes)])
+    probability, _ = predict_proba(scorer, X)
+    return probability
+
+
+def load_risk_table(scorer, encoder, model_dir=recidivism_model_dir):
+    # Risk table and its index, the table memory-mapped so a lookup only reads the page of its entry. None when there is
+    # no table, it was built from another MOJO or encoder than the given ones (compared by the hashes stored in the index,
+    # modification times are not kept by a checkout or a copy into the image), or it holds float32 probabilities (built
+    # before they were kept in float64), the page then scores live until build_risk_table.py is run again
+    table_path = os.path.join(model_dir, os.path.basename(risk_table_path))
+    index_path = os.path.join(model_dir, os.path.basename(risk_index_path))
+    if not (os.path.exists(table_path) and os.path.exists(index_path)):
+        return None
+
+    with np.load(index_path) as arrays:
+        table = {key: arrays[key] for key in arrays.files}
+    for key in ['mojo_sha256', 'encoder_sha256']:
+        if key in table:
+            table[key] = table[key].item()
+    if table.get('mojo_sha256') != scorer['mojo_sha256'] or table.get('encoder_sha256') != encoder_sha256(encoder):
+        return None
+
+    table['probability'] = np.load(table_path, mmap_mode='r')
+    if table['probability'].dtype != np.float64 or len(table['probability']) != np.prod(table['shape']):
+        return None
+    return table
+
+
+def lookup_risk(table, encoder, codes, age):
+    # Probability of one record from the risk table, O(1): the class of every feature from its code (or its age, the only
+    # numeric feature) and the flat index of the class tuple. None for an age the table was not built for
+    if age != int(age) or not RISK_TABLE_AGES[0] <= age <= RISK_TABLE_AGES[-1]:
+        return None
+
+    position = np.empty(len(encoder['features']), dtype=np.int64)
+    for j, i in enumerate(encoder['categorical']):
+        position[i] = table[f"{encoder['features'][i]}_classes"][codes[0][j]]
+    for i in encoder['numeric']:
+        position[i] = table[f"{encoder['features'][i]}_classes"][int(age) - RISK_TABLE_AGES[0]]
+
+    return float(table['probability'][np.ravel_multi_index(tuple(position), tuple(table['shape']))])
@@ -0,0 +1,387 @@
+import argparse
+import glob
+import hashlib
+import os
+import struct
+import zipfile
+
+import numpy as np
+
+# Determine the root directory of the project
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+recidivism_model_dir = os.path.join(root_dir, 'models', 'Recidivism_model')
+scorer_path = os.path.join(recidivism_model_dir, 'recidivism_scorer.npz')
+
+# NA split directions of the H2O compressed trees (hex.genmodel.algos.tree.NaSplitDir)
+NA_VS_REST, NA_LEFT, LEFT = 1, 2, 4
+
+# Leaf marker of the H2O compressed trees and of the flat trees of the scorer
+H2O_LEAF_COLUMN = 65535
+LEAF = -1
+
+# Bounds of the logit transform of the base model predictions (hex.genmodel.algos.ensemble.StackedEnsembleMojoModel)
+LOGIT_EPSILON = 1e-9
+LOGIT_MIN = -19.0
+
+# Fixed-size blocks of the legacy XGBoost binary model format
+XGBOOST_LEARNER_PARAM_SIZE = 136
+XGBOOST_GBTREE_PARAM_SIZE = 160
+XGBOOST_TREE_PARAM_SIZE = 148
+XGBOOST_NODE = np.dtype([('parent', '<i4'), ('cleft', '<i4'), ('cright', '<i4'), ('sindex', '<u4'), ('info', '<f4')])
+XGBOOST_NODE_STAT_SIZE = 16
+
+
+def read_model_ini(mojo, directory=''):
+    # [info] section of a model.ini of the MOJO as a dict of strings, plus its [columns] as a list
+    info, columns, section = {}, [], None
+    for line in mojo.read(f"{directory}model.ini").decode().splitlines():
+        line = line.strip()
+        if line.startswith('['):
+            section = line
+        elif line and section == '[info]':
+            key, value = line.split('=', 1)
+            info[key.strip()] = value.strip()
+        elif line and section == '[columns]':
+            columns.append(line)
+    return info, columns
+
+
+def parse_list(value):
+    return [float(item) for item in value.strip('[]').split(',') if item.strip()]
+
+
+def flat_trees(trees):
+    # Concatenates trees given as (feature, threshold, left, right, na_left, value) lists into flat arrays, the children
+    # indices shifted to the concatenated node numbering, with the root of every tree
+    arrays = {key: [] for key in ['feature', 'threshold', 'left', 'right', 'na_left', 'value']}
+    roots, offset = [], 0
+    for tree in trees:
+        feature, threshold, left, right, na_left, value = (np.asarray(column) for column in tree)
+        roots.append(offset)
+        arrays['feature'].append(feature.astype(np.int32))
+        arrays['threshold'].append(threshold.astype(np.float32))
+        arrays['left'].append(np.where(left == LEAF, LEAF, left + offset).astype(np.int32))
+        arrays['right'].append(np.where(right == LEAF, LEAF, right + offset).astype(np.int32))
+        arrays['na_left'].append(na_left.astype(bool))
+        arrays['value'].append(value.astype(np.float32))
+        offset += len(feature)
+
+    flat = {key: np.concatenate(columns) for key, columns in arrays.items()}
+    flat['roots'] = np.array(roots, dtype=np.int32)
+    return flat
+
+
+def parse_h2o_tree(data):
+    # Decodes one H2O compressed tree (SharedTreeMojoModel.scoreTree layout): every split node is its type byte, the
+    # 2-byte column, the NA direction, the float32 split value and the size of its left subtree (or the left leaf value),
+    # followed by the left then the right subtree. A node goes right when value >= split
+    tree = ([], [], [], [], [], [])
+
+    def add(feature, threshold, na_left, value):
+        for column, item in zip(tree, [feature, threshold, LEAF, LEAF, na_left, value]):
+            column.append(item)
+        return len(tree[0]) - 1
+
+    def leaf(pos):
+        return add(LEAF, np.nan, False, struct.unpack_from('<f', data, pos)[0])
+
+    def node(pos):
+        node_type = data[pos]
+        column = struct.unpack_from('<H', data, pos + 1)[0]
+        if column == H2O_LEAF_COLUMN:
+            return leaf(pos + 3)
+
+        na_split = data[pos + 3]
+        pos += 4
+        if node_type & 12:
+            raise ValueError("Categorical (bitset) splits are not supported, the recidivism features are numeric")
+
+        # NA vs REST splits send every value left and the NAs right
+        threshold = np.inf if na_split == NA_VS_REST else struct.unpack_from('<f', data, pos)[0]
+        if na_split != NA_VS_REST:
+            pos += 4
+
+        index = add(column, threshold, na_split in (NA_LEFT, LEFT), np.nan)
+
+        left_mask = node_type & 51
+        if left_mask == 48:
+            left, right_pos = leaf(pos), pos + 4
+        elif left_mask <= 3:
+            left_size = int.from_bytes(data[pos:pos + left_mask + 1], 'little')
+            pos += left_mask + 1
+            left, right_pos = node(pos), pos + left_size
+        else:
+            raise ValueError(f"Illegal left mask {left_mask} in H2O tree")
+
+        right = leaf(right_pos) if (node_type & 0xC0) >> 2 & 16 else node(right_pos)
+        tree[2][index], tree[3][index] = left, right
+        return index
+
+    node(0)
+    return tree
+
+
+def parse_xgboost_trees(data):
+    # Decodes the trees of a legacy binary XGBoost gbtree model ("binf" + learner parameters, objective and booster
+    # names, gbtree parameters, then every tree as parameters, nodes and node statistics). A node goes left when
+    # float32(value) < split, NAs follow the default direction. Returns the trees and the base score
+    if data[:4] != b'binf':
+        raise ValueError("Not a legacy binary XGBoost model")
+
+    base_score = struct.unpack_from('<f', data, 4)[0]
+    pos = 4 + XGBOOST_LEARNER_PARAM_SIZE
+
+    names = []
+    for _ in range(2):
+        length = struct.unpack_from('<Q', data, pos)[0]
+        names.append(data[pos + 8:pos + 8 + length].decode())
+        pos += 8 + length
+    objective, booster = names
+    if booster != 'gbtree' or objective != 'binary:logistic':
+        raise ValueError(f"Only binary:logistic gbtree models are supported, got {objective} {booster}")
+
+    num_trees = struct.unpack_from('<i', data, pos)[0]
+    pos += XGBOOST_GBTREE_PARAM_SIZE
+
+    trees = []
+    for _ in range(num_trees):
+        num_nodes, size_leaf_vector = struct.unpack_from('<i', data, pos + 4)[0], struct.unpack_from('<i', data, pos + 20)[0]
+        if size_leaf_vector:
+            raise ValueError("Trees with leaf vectors are not supported")
+        pos += XGBOOST_TREE_PARAM_SIZE
+
+        nodes = np.frombuffer(data, dtype=XGBOOST_NODE, count=num_nodes, offset=pos)
+        pos += num_nodes * (XGBOOST_NODE.itemsize + XGBOOST_NODE_STAT_SIZE)
+
+        is_leaf = nodes['cleft'] == -1
+        trees.append((np.where(is_leaf, LEAF, nodes['sindex'] & 0x7FFFFFFF),
+                      np.where(is_leaf, np.nan, nodes['info']),
+                      np.where(is_leaf, LEAF, nodes['cleft']),
+                      np.where(is_leaf, LEAF, nodes['cright']),
+                      (nodes['sindex'] >> 31).astype(bool),
+                      np.where(is_leaf, nodes['info'], np.nan)))
+
+    return trees, base_score
+
+
+def mojo_sha256(mojo_path):
+    # Content hash of a MOJO, stored in the scorer exported from it
+    digest = hashlib.sha256()
+    with open(mojo_path, 'rb') as mojo:
+        for block in iter(lambda: mojo.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_mojo(mojo_path):
+    # Converts a binomial StackedEnsemble MOJO (GLM metalearner over DRF/XGBoost base models) into the arrays of the
+    # NumPy scorer: the flat trees of every base model, the metalearner coefficients and the decision threshold, with the
+    # hash of the MOJO they were exported from
+    with zipfile.ZipFile(mojo_path) as mojo:
+        info, columns = read_model_ini(mojo)
+        if info['algo'] != 'stackedensemble' or info['category'] != 'Binomial':
+            raise ValueError(f"Expected a binomial StackedEnsemble MOJO, got {info['algo']} {info['category']}")
+
+        submodels = {info[f"submodel_key_{i}"]: info[f"submodel_dir_{i}"] for i in range(int(info['submodel_count']))}
+        metalearner_info, metalearner_columns = read_model_ini(mojo, submodels.pop(info['metalearner']))
+        if metalearner_info['algo'] != 'glm' or metalearner_info['link'] != 'logit' or int(metalearner_info['cats']):
+            raise ValueError("Expected a logit GLM metalearner over numeric base model predictions")
+
+        scorer = {
+            'mojo_sha256': mojo_sha256(mojo_path),
+            'features': np.array(columns[:int(info['n_features'])]),
+            'threshold': float(info['default_threshold']),
+            'logit_transform': info.get('metalearner_transform') == 'Logit',
+            'base_models': np.array(list(submodels)),
+            'metalearner_inputs': np.array(metalearner_columns[:int(metalearner_info['n_features'])]),
+            'metalearner_beta': np.array(parse_list(metalearner_info['beta'])),
+            'metalearner_means': np.array(parse_list(metalearner_info['num_means']))
+        }
+
+        for i, (key, directory) in enumerate(submodels.items()):
+            model_info, model_columns = read_model_ini(mojo, directory)
+            if model_columns[:len(scorer['features'])] != list(scorer['features']):
+                raise ValueError(f"Base model {key} does not use the features of the ensemble")
+
+            if model_info['algo'] == 'drf':
+                if model_info['binomial_double_trees'] == 'true':
+                    raise ValueError("DRF with binomial double trees is not supported")
+                trees = [parse_h2o_tree(mojo.read(f"{directory}trees/t00_{tree:03d}.bin")) for tree in range(int(model_info['n_trees']))]
+                base_margin = 0.0
+            elif model_info['algo'] == 'xgboost':
+                trees, base_score = parse_xgboost_trees(mojo.read(f"{directory}boosterBytes"))
+                base_margin = np.log(base_score / (1 - base_score))
+            else:
+                raise ValueError(f"Base model algorithm {model_info['algo']} is not supported")
+
+            scorer.update({f"model{i}_{name}": array for name, array in flat_trees(trees).items()})
+            scorer[f"model{i}_algo"] = model_info['algo']
+            scorer[f"model{i}_base_margin"] = base_margin
+
+    return scorer
+
+
+def save_scorer(scorer, path=scorer_path):
+    np.savez_compressed(path, **scorer)
+
+
+def load_scorer(path=scorer_path):
+    with np.load(path) as arrays:
+        scorer = {key: arrays[key] for key in arrays.files}
+    for key in ['mojo_sha256', 'threshold', 'logit_transform']:
+        if key in scorer:
+            scorer[key] = scorer[key].item()
+    return scorer
+
+
+def latest_mojo(model_dir=recidivism_model_dir):
+    # Most recent StackedEnsemble MOJO downloaded by the training, None when there is none
+    mojos = glob.glob(os.path.join(model_dir, 'StackedEnsemble_*.zip'))
+    return max(mojos, key=os.path.getmtime) if mojos else None
+
+
+def load_recidivism_scorer(model_dir=recidivism_model_dir):
+    # Scorer of the latest MOJO, exported once and read from recidivism_scorer.npz afterwards (exported again when the MOJO
+    # hash stored in it is not the hash of the MOJO, and only kept in memory when the models directory is read-only).
+    # Modification times are not compared, a checkout or a copy into the image does not keep them. None when no MOJO
+    # was trained
+    mojo_path = latest_mojo(model_dir)
+    path = os.path.join(model_dir, os.path.basename(scorer_path))
+    if os.path.exists(path):
+        scorer = load_scorer(path)
+        if mojo_path is None or scorer.get('mojo_sha256') == mojo_sha256(mojo_path):
+            return scorer
+    if mojo_path is None:
+        return None
+
+    scorer = export_mojo(mojo_path)
+    try:
+        save_scorer(scorer, path)
+    except OSError:
+        return scorer
+    return load_scorer(path)
+
+
+def check_features(scorer, encoder, model_dir=recidivism_model_dir):
+    # The scaler and the MOJO must have been trained on the same features in the same order, the encoded rows are scored
+    # by position
+    if encoder['features'] != [str(feature) for feature in scorer['features']]:
+        raise ValueError(f"The scaler and the MOJO of {model_dir} have different features, train the recidivism model again")
+
+
+def tree_leaf_values(scorer, model, X):
+    # (n_rows, n_trees) leaf value reached by every row in every tree of a base model, all rows and trees walked down
+    # together one level at a time. DRF compares the double value with the float32 split, XGBoost compares in float32
+    feature, left, right = scorer[f"{model}_feature"], scorer[f"{model}_left"], scorer[f"{model}_right"]
+    na_left, value = scorer[f"{model}_na_left"], scorer[f"{model}_value"]
+    if scorer[f"{model}_algo"] == 'xgboost':
+        X, threshold = X.astype(np.float32), scorer[f"{model}_threshold"]
+    else:
+        threshold = scorer[f"{model}_threshold"].astype(np.float64)
+
+    node = np.repeat(scorer[f"{model}_roots"][None, :], len(X), axis=0)
+    rows = np.arange(len(X))[:, None]
+    while True:
+        split = feature[node]
+        internal = split != LEAF
+        if not internal.any():
+            return value[node].astype(np.float64)
+
+        x = X[rows, np.maximum(split, 0)]
+        go_left = np.where(np.isnan(x), na_left[node], x < threshold[node])
+        node = np.where(internal, np.where(go_left, left[node], right[node]), node)
+
+
+def base_model_probabilities(scorer, X):
+    # Probability of class 1 of every base model, {model key: (n_rows,) array}
+    probabilities = {}
+    for i, key in enumerate(scorer['base_models']):
+        model = f"model{i}"
+        leaves = tree_leaf_values(scorer, model, X)
+        if scorer[f"{model}_algo"] == 'drf':
+            # Binomial DRF trees predict the probability of the first class, averaged over the trees
+            probabilities[str(key)] = 1.0 - leaves.mean(axis=1)
+        else:
+            probabilities[str(key)] = 1.0 / (1.0 + np.exp(-(leaves.sum(axis=1) + scorer[f"{model}_base_margin"])))
+    return probabilities
+
+
+def logit(p):
+    p = np.clip(p, LOGIT_EPSILON, 1 - LOGIT_EPSILON)
+    return np.maximum(LOGIT_MIN, np.log(p / (1 - p)))
+
+
+def predict_proba(scorer, X):
+    # Probability of recidivism of every row of the scaled features (n_rows, n_features), in the order of scorer['features'],
+    # with the probabilities of the base models it is stacked from
+    X = np.asarray(X, dtype=np.float64).reshape(-1, len(scorer['features']))
+    base_probabilities = base_model_probabilities(scorer, X)
+
+    # Metalearner inputs without a base model in the MOJO are imputed with their training mean, as the GLM does
+    inputs = np.column_stack([base_probabilities.get(str(key), np.full(len(X), np.nan)) for key in scorer['metalearner_inputs']])
+    if scorer['logit_transform']:
+        inputs = logit(inputs)
+    inputs = np.where(np.isnan(inputs), scorer['metalearner_means'], inputs)
+
+    beta = scorer['metalearner_beta']
+    probability = 1.0 / (1.0 + np.exp(-(inputs @ beta[:-1] + beta[-1])))
+    return probability, base_probabilities
+
+
+def predict(scorer, X):
+    # 1 (likely to repeat) when the probability reaches the threshold the MOJO was exported with
+    probability, _ = predict_proba(scorer, X)
+    return (probability >= scorer['threshold']).astype(int)
+
+
+def parity_rows(scorer, n_rows=1000, seed=0):
+    # Rows checked against H2O: standard normal features (the model is trained on standardized features), rows sitting
+    # exactly on split values of the trees and rows with missing values
+    rng = np.random.default_rng(seed)
+    n_features = len(scorer['features'])
+    X = rng.standard_normal((n_rows, n_features))
+
+    on_split = rng.standard_normal((n_rows, n_features))
+    for i in range(len(scorer['base_models'])):
+        splits = scorer[f"model{i}_feature"] != LEAF
+        picked = rng.choice(np.flatnonzero(splits), n_rows)
+        on_split[np.arange(n_rows), scorer[f"model{i}_feature"][picked]] = scorer[f"model{i}_threshold"][picked]
+        X = np.vstack([X, on_split.copy()])
+
+    missing = rng.standard_normal((n_rows, n_features))
+    missing[rng.random((n_rows, n_features)) < 0.3] = np.nan
+    return np.vstack([X, missing])
+
+
+def check_parity(scorer, mojo_path, X):
+    # Compares the scorer with the H2O MOJO on the same rows, needs the h2o package and a Java runtime.
+    # Returns the largest probability difference and the number of rows whose predicted class differs
+    import h2o
+    import pandas as pd
+
+    h2o.init()
+    model = h2o.import_mojo(mojo_path)
+    frame = h2o.H2OFrame(pd.DataFrame(X, columns=[str(feature) for feature in scorer['features']]))
+    h2o_predictions = model.predict(frame).as_data_frame()
+
+    probability, _ = predict_proba(scorer, X)
+    labels = (probability >= scorer['threshold']).astype(int)
+    return float(np.abs(probability - h2o_predictions['p1'].to_numpy()).max()), int((labels != h2o_predictions['predict'].to_numpy()).sum())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the recidivism StackedEnsemble MOJO to the NumPy scorer used by the app")
+    parser.add_argument('--mojo', default=None, help="MOJO to export (default: the latest StackedEnsemble MOJO in models/Recidivism_model)")
+    parser.add_argument('--check-parity', action='store_true', help="compare the exported scorer with H2O (needs a Java runtime)")
+    parser.add_argument('--rows', type=int, default=1000, help="rows of every kind compared by --check-parity")
+    args = parser.parse_args()
+
+    mojo_path = args.mojo or latest_mojo()
+    save_scorer(export_mojo(mojo_path))
+    scorer = load_scorer()
+    print(f"Exported {mojo_path} to {scorer_path}")
+
+    if args.check_parity:
+        max_difference, mismatches = check_parity(scorer, mojo_path, parity_rows(scorer, args.rows))
+        print(f"Largest probability difference with H2O: {max_difference:.3g}, rows with another predicted class: {mismatches}")
@@ -1,10 +1,13 @@
 import os
 
-import h2o
 import pandas as pd
+import plotly.express as px
 import streamlit as st
 from sklearn.dummy import DummyClassifier
-from sklearn.linear_model import LinearRegression
+
+from Resource_Allocation_Solver import RANKS, SWEEP_STEPS, AllocationCache, allocate_district, strength_grid, sweep_allocation
+from Resource_Forecasting import (fit_beat_count_model, forecast_beat_counts, forecast_crime_counts, forecast_severity,
+                                  load_beat_count_model)
 
 # Determine the root directory of the project
 root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -24,6 +27,75 @@ def load_resource_data():
     data_file_path = os.path.join(root_dir, 'Component_datasets', 'Resource_Data.csv')
     return pd.read_csv(data_file_path)
 
+# Sanctioned strength columns of the cleaned resource dataset, one value per district repeated on every beat
+SANCTION_COLUMNS = {
+    'ASI': 'Sanctioned Strength of Assistant Sub-Inspectors per District',
+    'CHC': 'Sanctioned Strength of Head Constables per District',
+    'CPC': 'Sanctioned Strength of Police Constables per District'
+}
+
+@st.cache_resource
+def load_resource_allocation_data():
+    # Parsed once per process and shared by every session and rerun: the district options in file order, the beats of
+    # every district split up front and each district's default sanctioned strengths. The district frames are shared,
+    # callers copy the one they modify
+    data_file_path = os.path.join(root_dir, 'Component_datasets', 'Resource_Allocation_Cleaned.csv')
+    df = pd.read_csv(data_file_path)
+
+    # The file's size and modification time identify the data version the cached allocations were solved on
+    stat = os.stat(data_file_path)
+    version = f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    district_frames = dict(tuple(df.groupby("District Name", sort=False)))
+    default_strengths = {district: {rank: int(frame[column].iloc[0]) for rank, column in SANCTION_COLUMNS.items()}
+                         for district, frame in district_frames.items()}
+
+    return {
+        'districts': list(district_frames),
+        'district_frames': district_frames,
+        'default_strengths': default_strengths,
+        'version': version
+    }
+
+@st.cache_resource
+def load_allocation_cache():
+    # Allocations already solved, shared by every session so re-applying the same strengths is a lookup and a small change
+    # of one strength only fills that rank again
+    return AllocationCache()
+
+def resource_forecast_version():
+    # Size and modification time of the beat monthly counts written by the pipeline, None before its first run
+    data_file_path = os.path.join(root_dir, 'Component_datasets', 'Resource_Allocation_Beat_Monthly_Counts.parquet')
+    if not os.path.exists(data_file_path):
+        return None
+    stat = os.stat(data_file_path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+def beat_forecast_version():
+    # Version of the beat count model: the fitted parameters saved by the pipeline when they exist, otherwise the beat
+    # monthly counts the model is fitted from. None when neither exists
+    model_path = os.path.join(root_dir, 'models', 'Resource_Allocation_model', 'beat_count_model.npz')
+    if not os.path.exists(model_path):
+        return resource_forecast_version()
+    stat = os.stat(model_path)
+    return f"model-{stat.st_size}-{stat.st_mtime_ns}"
+
+@st.cache_resource
+def load_beat_forecasts(version):
+    # Next-year crime count of every beat from the beat count model, fitted here only when the pipeline has not saved it
+    model_path = os.path.join(root_dir, 'models', 'Resource_Allocation_model', 'beat_count_model.npz')
+    if version.startswith('model-'):
+        params = load_beat_count_model(model_path)
+    else:
+        params = fit_beat_count_model(pd.read_parquet(os.path.join(root_dir, 'Component_datasets', 'Resource_Allocation_Beat_Monthly_Counts.parquet')))
+    return forecast_beat_counts(params, params['last_year'] + 1)
+
+@st.cache_data
+def load_resource_forecasts(version):
+    # Next-year crime counts of every district and beat, recomputed only when the data version changes
+    data_file_path = os.path.join(root_dir, 'Component_datasets', 'Resource_Allocation_Beat_Monthly_Counts.parquet')
+    return forecast_crime_counts(pd.read_parquet(data_file_path))
+
 @st.cache_resource
 def load_model_recidivism():
     return None  # Placeholder since we do not have the actual model
@@ -38,11 +110,60 @@ def load_individual_models():
         if missing:
             return [DummyClassifier(strategy="most_frequent") for _ in range(5)]
 
+        import h2o
         individual_models = [h2o.import_mojo(path) for path in model_paths]
         return individual_models
     except:
         return [DummyClassifier(strategy="most_frequent") for _ in range(5)]
 
+def district_severity(district, severity_version=None):
+    # Beats of a district (a copy of the cached frame) with the crime severity the allocation maximises, and the name of
+    # its column: the historical severity, or with the version of a beat count model the severity scaled by the forecast
+    # growth of the crime counts
+    district_frame = load_resource_allocation_data()['district_frames'][district].copy()
+    if severity_version is None:
+        return district_frame, "Normalised Crime Severity"
+
+    district_frame["Forecast Crime Severity"] = forecast_severity(district_frame, load_beat_forecasts(severity_version))
+    return district_frame, "Forecast Crime Severity"
+
+@st.cache_data
+def load_sensitivity_sweep(district, version, severity_version=None, steps=SWEEP_STEPS):
+    # Allocation of every combination of `steps` strengths per rank over the +/-10% range of the district's default
+    # sanctioned strengths, solved in one batch on the severity the allocation uses (the versions key the result to the
+    # dataset and the beat count model it was computed on)
+    defaults = load_resource_allocation_data()['default_strengths'][district]
+    district_frame, severity_column = district_severity(district, severity_version)
+    severity = district_frame[severity_column].to_numpy()
+    return sweep_allocation(severity, strength_grid([defaults[rank] for rank in RANKS], steps))
+
+def sensitivity_sweep(option, district_name, version, severity_column, severity_version):
+    st.write("### Sensitivity of the allocation to the sanctioned strengths")
+    steps = st.slider("Strengths evaluated per rank", 3, 15, SWEEP_STEPS, step=2)
+    sweep = load_sensitivity_sweep(option, version, severity_version, steps)
+
+    scenarios = pd.DataFrame(sweep['strengths'], columns=RANKS)
+    scenarios['Total Sanctioned'] = scenarios[RANKS].sum(axis=1)
+    scenarios['Covered Crime Severity'] = sweep['covered_severity']
+    scenarios['Beats Filled by Repair'] = sweep['uncovered_beats']
+    st.write(f"{len(scenarios)} scenarios evaluated, "
+             f"{scenarios['Covered Crime Severity'].isna().sum()} of them cannot cover every beat")
+
+    fig = px.scatter(scenarios.dropna(), x='Total Sanctioned', y='Covered Crime Severity', color='ASI',
+                     hover_data=RANKS, title=f"Covered crime severity across the sanctioned strengths of {option}")
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Beats whose number of officers changes the most across the feasible scenarios
+    officers = sweep['beat_officers'][~scenarios['Covered Crime Severity'].isna().to_numpy()]
+    if len(officers):
+        severity_columns = list(dict.fromkeys(["Normalised Crime Severity", severity_column]))
+        beats = district_name[["Police Unit", "Village Area Name", "Beat Name"] + severity_columns].reset_index(drop=True)
+        beats['Min Officers'] = officers.min(axis=0)
+        beats['Max Officers'] = officers.max(axis=0)
+        beats = beats[beats['Max Officers'] > beats['Min Officers']]
+        st.write(f"{len(beats)} beats change allocation across the scenarios")
+        st.dataframe(beats.sort_values(severity_column, ascending=False), hide_index=True)
+
 def get_unique_values(data, feature):
     return data[feature].unique().tolist()
 
@@ -62,64 +183,30 @@ def detect_anomalies(df):
     else:
         st.success("No unusual sentiment patterns detected.")
 
-def forecast_resources(df):
+def forecast_resources(forecasts):
     st.subheader("Resource Forecasting")
     st.write("Forecasting future police resource needs based on crime rates...")
 
-    df_sorted = df.sort_values(by='Year')
-    X = df_sorted[['Year']]
-    y = df_sorted['Crime Count']
-
-    model = LinearRegression()
-    model.fit(X, y)
-
-    next_year = df_sorted['Year'].max() + 1
-    predicted_crime = model.predict([[next_year]])[0]
+    next_year = forecasts['year']
+    districts = forecasts['districts']
 
-    st.write(f"Predicted crime count for {next_year}: **{int(predicted_crime)}**")
-
-    recommended_asi = int(predicted_crime / 50)
-    recommended_chc = int(predicted_crime / 40)
-    recommended_cpc = int(predicted_crime / 20)
+    st.write(f"Predicted crime count for {next_year}: **{int(districts['Predicted Crime Count'].sum())}**")
 
     st.write("### Recommended Additional Resources")
-    st.write(f"ASI: {recommended_asi}, CHC: {recommended_chc}, CPC: {recommended_cpc}")
+    st.dataframe(districts, hide_index=True)
 
-def resource_allocation(df):
-    import numpy as np
-    from pulp import LpVariable, LpProblem, LpMaximize, lpSum
+    option = st.selectbox("Show the beat forecasts of", ["Select the District"] + districts['District Name'].tolist())
+    if option != "Select the District":
+        beats = forecasts['beats']
+        st.dataframe(beats[beats['District Name'] == option].sort_values('Predicted Crime Count', ascending=False), hide_index=True)
 
+def resource_allocation(resource_data):
     def optimise_resource_allocation(district_name, sanctioned_asi, sanctioned_chc, sanctioned_cpc):
-        problem = LpProblem("Optimal_Resource_Allocation", LpMaximize)
-
-        asi_vars = LpVariable.dicts("ASI", district_name.index, lowBound=0, cat='Integer')
-        chc_vars = LpVariable.dicts("CHC", district_name.index, lowBound=0, cat='Integer')
-        cpc_vars = LpVariable.dicts("CPC", district_name.index, lowBound=0, cat='Integer')
-
-        problem += lpSum(district_name.loc[i, 'Normalised Crime Severity'] * (asi_vars[i] + chc_vars[i] + cpc_vars[i]) for i in district_name.index)
-
-        problem += lpSum(asi_vars[i] for i in district_name.index) <= sanctioned_asi
-        problem += lpSum(chc_vars[i] for i in district_name.index) <= sanctioned_chc
-        problem += lpSum(cpc_vars[i] for i in district_name.index) <= sanctioned_cpc
-
-        for i in district_name.index:
-            problem += asi_vars[i] + chc_vars[i] + cpc_vars[i] >= 1
-
-        for i in district_name.index:
-            problem += asi_vars[i] <= max(1, sanctioned_asi * district_name.loc[i, 'Normalised Crime Severity'])
-            problem += chc_vars[i] <= max(1, sanctioned_chc * district_name.loc[i, 'Normalised Crime Severity'])
-            problem += cpc_vars[i] <= max(1, sanctioned_cpc * district_name.loc[i, 'Normalised Crime Severity'])
-
         st.write("Calculating crime severity based on crime types and crime frequency for allocating resources accordingly...")
-        problem.solve()
-
-        district_name['Allocated ASI'] = [asi_vars[i].varValue for i in district_name.index]
-        district_name['Allocated CHC'] = [chc_vars[i].varValue for i in district_name.index]
-        district_name['Allocated CPC'] = [cpc_vars[i].varValue for i in district_name.index]
-
-        district_name[['Allocated ASI', 'Allocated CHC', 'Allocated CPC']] = district_name[['Allocated ASI', 'Allocated CHC', 'Allocated CPC']].apply(np.round).astype(int)
-
-        return district_name
+        # Water-filling solver of Resource_Allocation_Solver, the PuLP MILP is only solved when the sanctioned strengths
+        # cannot cover every beat. Results are memoized per district and data version
+        return allocate_district(district_name, sanctioned_asi, sanctioned_chc, sanctioned_cpc, severity_column=severity_column,
+                                 cache=load_allocation_cache(), cache_key=(option, (resource_data['version'], severity_version)))
 
     def allocate_resources(option, district_name, updated_asi, updated_chc, updated_cpc):
         st.write(f"### Current sanctioned strengths for {option}:")
@@ -142,26 +229,47 @@ def resource_allocation(df):
 
         if st.button("Show Allocation"):
             selected_data = selected_data.reset_index(drop=True)
-            st.table(selected_data[["Village Area Name", "Beat Name", "Normalised Crime Severity", "Allocated ASI", "Allocated CHC", "Allocated CPC"]])
+            severity_columns = list(dict.fromkeys(["Normalised Crime Severity", severity_column]))
+            st.table(selected_data[["Village Area Name", "Beat Name"] + severity_columns + ["Allocated ASI", "Allocated CHC", "Allocated CPC"]])
             st.session_state.default = False
             st.session_state.apply = False
 
     st.title("Police Resource Allocation and Management")
-    options = ["Select the District"] + list(df["District Name"].unique())
+
+    forecast_version = resource_forecast_version()
+    if forecast_version is not None and st.checkbox("Show next year's crime and resource forecasts"):
+        forecast_resources(load_resource_forecasts(forecast_version))
+
+    options = ["Select the District"] + resource_data['districts']
     option = st.selectbox("Select an option", options)
 
     if option != "Select the District":
-        district_name = df[df["District Name"] == option]
         st.write(f"### Selected District: {option}")
 
-        default_asi = int(district_name['Sanctioned Strength of Assistant Sub-Inspectors per District'].iloc[0])
-        default_chc = int(district_name['Sanctioned Strength of Head Constables per District'].iloc[0])
-        default_cpc = int(district_name['Sanctioned Strength of Police Constables per District'].iloc[0])
+        # The allocation maximises the historical severity of the beats, or their severity scaled by the forecast growth
+        # of their crime counts when the beat count model is available. The chosen severity version is the only input of
+        # district_severity, which the allocation, its cache key and the sensitivity sweep all go through
+        severity_version = None
+        forecast_model_version = beat_forecast_version()
+        if forecast_model_version is not None:
+            weighting = st.radio("Crime severity used by the allocation", ["Historical", "Forecast for next year"], horizontal=True)
+            if weighting != "Historical":
+                severity_version = forecast_model_version
+
+        # The allocation adds columns to the district's beats, district_severity returns a copy of the cached frame
+        district_name, severity_column = district_severity(option, severity_version)
+
+        default_asi = resource_data['default_strengths'][option]['ASI']
+        default_chc = resource_data['default_strengths'][option]['CHC']
+        default_cpc = resource_data['default_strengths'][option]['CPC']
 
         sanctioned_asi = st.number_input("Sanctioned Assistant Sub-Inspectors [ASI]", value=default_asi, min_value=int(default_asi * 0.9), max_value=int(default_asi * 1.1), step=1)
         sanctioned_chc = st.number_input("Sanctioned Head Constables [CHC]", value=default_chc, min_value=int(default_chc * 0.9), max_value=int(default_chc * 1.1), step=1)
         sanctioned_cpc = st.number_input("Sanctioned Police Constables [CPC]", value=default_cpc, min_value=int(default_cpc * 0.9), max_value=int(default_cpc * 1.1), step=1)
 
+        if st.checkbox("Show the sensitivity of the allocation to the sanctioned strengths (+/-10%)"):
+            sensitivity_sweep(option, district_name, resource_data['version'], severity_column, severity_version)
+
         if "default" not in st.session_state:
             st.session_state.default = False
 
@@ -182,5 +290,4 @@ def resource_allocation(df):
             allocate_resources(option, district_name, sanctioned_asi, sanctioned_chc, sanctioned_cpc)
 
 if __name__ == '__main__':
-    df = load_resource_data()
-    resource_allocation(df)
\ No newline at end of file
+    resource_allocation(load_resource_allocation_data())
\ No newline at end of file
@@ -0,0 +1,247 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Ranks allocated to the beats of a district and the column of the allocation of every rank
+RANKS = ['ASI', 'CHC', 'CPC']
+ALLOCATION_COLUMNS = ['Allocated ASI', 'Allocated CHC', 'Allocated CPC']
+
+# Allocations kept by an AllocationCache, a district solve is a few arrays of one int per beat
+ALLOCATION_CACHE_SIZE = 256
+
+# Sensitivity sweeps evaluate this many strengths per rank over +/- SWEEP_SPREAD of the sanctioned strengths, the range
+# the app accepts
+SWEEP_STEPS = 9
+SWEEP_SPREAD = 0.1
+
+# Slack on the per-beat caps so a cap such as 0.3 * 10 = 2.9999999999999996 is still 3 officers, as in the MILP
+CAP_TOLERANCE = 1e-9
+
+
+def beat_caps(severity, strengths):
+    # Most officers of every rank a beat can receive, max(1, sanctioned strength * normalised severity) rounded down to
+    # whole officers. (n_beats, n_ranks) int array
+    caps = np.maximum(1, np.outer(severity, strengths))
+    return np.floor(caps + CAP_TOLERANCE).astype(np.int64)
+
+
+def severity_order(severity):
+    # Beats from the most to the least severe, ties broken by position so the allocation is deterministic
+    return np.argsort(-np.asarray(severity, dtype=float), kind='stable')
+
+
+def greedy_allocation(caps, strengths, order):
+    # Without the "at least one officer per beat" constraint the problem separates by rank and every rank is optimally
+    # filled beat by beat from the most severe one up to its cap until the sanctioned strength runs out (water-filling)
+    sorted_caps = caps[order]
+    filled_before = np.cumsum(sorted_caps, axis=0) - sorted_caps
+    sorted_allocation = np.clip(np.asarray(strengths)[None, :] - filled_before, 0, sorted_caps)
+
+    allocation = np.empty_like(sorted_allocation)
+    allocation[order] = sorted_allocation
+    return allocation
+
+
+def repair_allocation(allocation, order):
+    # Gives one officer to every beat the water-filling left empty. Every beat can take one officer of any rank (the caps
+    # are at least 1), so the officers are moved from the least severe beats holding more than one, which loses the least
+    # severity. Returns False when the sanctioned strengths cannot cover every beat
+    totals = allocation.sum(axis=1)
+    uncovered = order[totals[order] == 0]
+    if len(uncovered) == 0:
+        return True
+
+    if totals.sum() < len(totals):
+        return False
+
+    donors = order[::-1]
+    donors = donors[totals[donors] > 1]
+    spare = totals[donors] - 1
+    take = np.clip(len(uncovered) - (np.cumsum(spare) - spare), 0, spare)
+
+    # Officers taken from the donors rank by rank, then handed out one per uncovered beat from the most severe one
+    moved = []
+    for rank in range(allocation.shape[1]):
+        taken = np.minimum(take, allocation[donors, rank])
+        allocation[donors, rank] -= taken
+        take -= taken
+        moved.append(int(taken.sum()))
+
+    allocation[uncovered, np.repeat(np.arange(allocation.shape[1]), moved)] += 1
+    return True
+
+
+def warm_start_allocation(severity, strengths, order, previous_strengths, previous_greedy):
+    # Water-filling of new sanctioned strengths from the one of other strengths of the same district: the severity order is
+    # reused and only the ranks whose strength changed are filled again, the others keep their previous column
+    changed = np.flatnonzero(strengths != previous_strengths)
+    greedy = previous_greedy.copy()
+    if len(changed):
+        greedy[:, changed] = greedy_allocation(beat_caps(severity, strengths[changed]), strengths[changed], order)
+    return greedy
+
+
+def solve_allocation(severity, strengths):
+    # Optimal integer allocation of the sanctioned strengths (ASI, CHC, CPC) to the beats of a district, maximising the
+    # severity covered, sum(severity * officers), under the same constraints as the MILP of pulp_allocation.
+    # (n_beats, n_ranks) int array, or None when the sanctioned strengths cannot cover every beat
+    severity = np.asarray(severity, dtype=float)
+    strengths = np.asarray(strengths, dtype=np.int64)
+    order = severity_order(severity)
+
+    allocation = greedy_allocation(beat_caps(severity, strengths), strengths, order)
+    if not repair_allocation(allocation, order):
+        return None
+
+    return allocation
+
+
+def strength_grid(strengths, steps=SWEEP_STEPS, spread=SWEEP_SPREAD):
+    # Every combination of `steps` evenly spaced strengths per rank between int(strength * (1 - spread)) and
+    # int(strength * (1 + spread)), (n_scenarios, n_ranks) int array
+    axes = [np.unique(np.linspace(int(strength * (1 - spread)), int(strength * (1 + spread)), steps).round().astype(np.int64))
+            for strength in strengths]
+    return np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(axes))
+
+
+def sweep_allocation(severity, grid):
+    # Water-filling and repair of every scenario of a strength grid in one batch. The severity order is computed once, every
+    # rank is filled once per distinct strength of that rank and the repair works on the (n_scenarios, n_beats) officer
+    # totals. Returns the covered severity (NaN when the strengths cannot cover every beat), the number of beats the
+    # water-filling left empty and the officers of every beat per scenario, equal to solve_allocation(...).sum(axis=1)
+    severity = np.asarray(severity, dtype=float)
+    grid = np.asarray(grid, dtype=np.int64)
+    order = severity_order(severity)
+    sorted_severity = severity[order]
+    beats = np.arange(len(severity))
+
+    totals = np.zeros((len(grid), len(severity)), dtype=np.int64)
+    for rank in range(grid.shape[1]):
+        strengths, scenario_strength = np.unique(grid[:, rank], return_inverse=True)
+        filled = greedy_allocation(beat_caps(sorted_severity, strengths), strengths, beats)
+        totals += filled.T[scenario_strength]
+
+    # repair_allocation for every scenario: the officers over one of the least severe beats cover the empty beats
+    uncovered = totals == 0
+    feasible = totals.sum(axis=1) >= len(severity)
+    spare = np.maximum(totals - 1, 0)[:, ::-1]
+    take = np.clip(uncovered.sum(axis=1)[:, None] - (np.cumsum(spare, axis=1) - spare), 0, spare)[:, ::-1]
+    officers = np.where(feasible[:, None], totals - take + uncovered, totals)
+
+    covered_severity = officers @ sorted_severity
+    covered_severity[~feasible] = np.nan
+
+    beat_officers = np.empty_like(officers, dtype=np.int32)
+    beat_officers[:, order] = officers
+
+    return {
+        'strengths': grid,
+        'covered_severity': covered_severity,
+        'uncovered_beats': uncovered.sum(axis=1),
+        'beat_officers': beat_officers
+    }
+
+
+def pulp_allocation(severity, strengths):
+    # Reference MILP solved with CBC: at most the sanctioned strength of every rank, at least one officer per beat and at
+    # most max(1, sanctioned strength * severity) officers of every rank per beat
+    from pulp import LpVariable, LpProblem, LpMaximize, lpSum
+
+    beats = range(len(severity))
+    problem = LpProblem("Optimal_Resource_Allocation", LpMaximize)
+    variables = [LpVariable.dicts(rank, beats, lowBound=0, cat='Integer') for rank in RANKS]
+
+    problem += lpSum(severity[i] * lpSum(rank_vars[i] for rank_vars in variables) for i in beats)
+
+    for rank_vars, strength in zip(variables, strengths):
+        problem += lpSum(rank_vars[i] for i in beats) <= strength
+
+    for i in beats:
+        problem += lpSum(rank_vars[i] for rank_vars in variables) >= 1
+
+    for rank_vars, strength in zip(variables, strengths):
+        for i in beats:
+            problem += rank_vars[i] <= max(1, strength * severity[i])
+
+    problem.solve()
+
+    allocation = np.array([[rank_vars[i].varValue or 0 for rank_vars in variables] for i in beats])
+    return np.round(allocation).astype(np.int64)
+
+
+def allocation_objective(severity, allocation):
+    # Severity covered by an allocation, the objective maximised by both solvers
+    return float(np.dot(severity, allocation.sum(axis=1)))
+
+
+class AllocationCache:
+    # LRU cache of the district allocations keyed by (district, data version, ASI, CHC, CPC). Besides the final allocation
+    # every entry keeps the severity order and the water-filling before the repair step, so new strengths of a district
+    # already solved are warm-started from its nearest cached strengths. Shared by the Streamlit sessions, hence the lock
+    def __init__(self, max_entries=ALLOCATION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def nearest(self, district, version, strengths):
+        # Cached entry of the same district and data version with the fewest changed ranks, then the smallest change
+        candidates = [entry for (entry_district, entry_version, *_), entry in self.entries.items()
+                      if entry_district == district and entry_version == version]
+        if not candidates:
+            return None
+
+        return min(candidates, key=lambda entry: (np.count_nonzero(entry['strengths'] != strengths),
+                                                  np.abs(entry['strengths'] - strengths).sum()))
+
+    def allocate(self, district, version, severity, strengths):
+        # Allocation of the given strengths, from the cache, warm-started or solved (the MILP fallback included). The
+        # strengths are copied, the entry must not change with an array the caller modifies afterwards
+        strengths = np.array(strengths, dtype=np.int64)
+        key = (district, version, *strengths.tolist())
+
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]['allocation'].copy()
+            nearest = self.nearest(district, version, strengths)
+
+        if nearest is None:
+            order = severity_order(severity)
+            greedy = greedy_allocation(beat_caps(severity, strengths), strengths, order)
+        else:
+            order = nearest['order']
+            greedy = warm_start_allocation(severity, strengths, order, nearest['strengths'], nearest['greedy'])
+
+        allocation = greedy.copy()
+        if not repair_allocation(allocation, order):
+            allocation = pulp_allocation(severity, strengths)
+
+        with self.lock:
+            self.entries[key] = {'strengths': strengths, 'order': order, 'greedy': greedy, 'allocation': allocation}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+        return allocation.copy()
+
+
+def allocate_district(district, sanctioned_asi, sanctioned_chc, sanctioned_cpc, method='greedy', cache=None, cache_key=None,
+                      severity_column='Normalised Crime Severity'):
+    # Beats of a district with their 'Allocated ASI', 'Allocated CHC' and 'Allocated CPC'. The water-filling solver is
+    # used unless method='pulp'; the MILP is also the fallback when the sanctioned strengths cannot cover every beat.
+    # With an AllocationCache and a cache_key of (district, data version) the water-filling results are memoized.
+    # severity_column is the per-district normalised weight maximised, e.g. a forecast severity instead of the historical one
+    severity = district[severity_column].to_numpy(dtype=float)
+    strengths = [sanctioned_asi, sanctioned_chc, sanctioned_cpc]
+
+    if cache is not None and method == 'greedy':
+        allocation = cache.allocate(*cache_key, severity, strengths)
+    else:
+        allocation = solve_allocation(severity, strengths) if method == 'greedy' else None
+        if allocation is None:
+            allocation = pulp_allocation(severity, strengths)
+
+    district = district.copy()
+    district[ALLOCATION_COLUMNS] = allocation
+    return district
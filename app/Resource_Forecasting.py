@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.linear_model import PoissonRegressor
+
+# Keys of a beat in the beat monthly counts, as in the cleaned resource allocation dataset
+BEAT_KEYS = ['District Name', 'Police Unit', 'Village Area Name', 'Beat Name']
+
+# L2 penalty and iterations of the beat count model, the penalty only keeps the effect of beats without crimes finite
+POISSON_ALPHA = 1e-6
+POISSON_MAX_ITER = 1000
+
+# Crimes per officer of every rank used to turn a forecast crime count into recommended resources
+RECOMMENDATION_DIVISORS = {'ASI': 50, 'CHC': 40, 'CPC': 20}
+
+
+def forecast_years(monthly_counts):
+    # Years the trends are fitted on. A last year whose data stops before December is left out so a partial year does
+    # not read as a drop in crime
+    years = np.sort(monthly_counts['Year'].unique())
+    if len(years) > 1 and monthly_counts.loc[monthly_counts['Year'] == years[-1], 'Month'].max() < 12:
+        years = years[:-1]
+    return years
+
+
+def yearly_count_matrix(monthly_counts, keys, years):
+    # (n_entities, n_years) crime counts of every entity (district, beat, ...) per year, 0 for the years without crimes
+    counts = monthly_counts[monthly_counts['Year'].isin(years)].groupby(keys + ['Year'])['Crime Count'].sum()
+    counts = counts.unstack('Year', fill_value=0).reindex(columns=years, fill_value=0)
+    return counts.index.to_frame(index=False), counts.to_numpy(dtype=float)
+
+
+def linear_trend_forecast(counts, years, target_year):
+    # Least-squares line Year -> Crime Count of every row of counts, fitted in one solve: the design matrix [1, year] is
+    # shared by all the entities, so their series are the columns of a single right-hand side. Forecasts are clipped at 0
+    centre = years.mean()
+    design = np.column_stack([np.ones(len(years)), years - centre])
+    coefficients = np.linalg.lstsq(design, counts.T, rcond=None)[0]
+    return np.maximum(coefficients[0] + coefficients[1] * (target_year - centre), 0)
+
+
+def recommended_resources(predicted_crime):
+    # Officers of every rank recommended for the forecast crime counts, int(predicted crime / crimes per officer)
+    return pd.DataFrame({f"Recommended {rank}": np.floor(predicted_crime / divisor).astype(int)
+                         for rank, divisor in RECOMMENDATION_DIVISORS.items()})
+
+
+def forecast_crime_counts(monthly_counts):
+    # Next-year crime counts and recommended resources of every district and every beat. District and beat series are
+    # stacked into one (entity x year) matrix and forecast together
+    years = forecast_years(monthly_counts)
+    next_year = int(years[-1]) + 1
+
+    districts, district_counts = yearly_count_matrix(monthly_counts, BEAT_KEYS[:1], years)
+    beats, beat_counts = yearly_count_matrix(monthly_counts, BEAT_KEYS, years)
+    predicted = linear_trend_forecast(np.vstack([district_counts, beat_counts]), years.astype(float), next_year)
+
+    forecasts = {'year': next_year}
+    for name, entities, counts, predicted_crime in [('districts', districts, district_counts, predicted[:len(districts)]),
+                                                    ('beats', beats, beat_counts, predicted[len(districts):])]:
+        forecasts[name] = pd.concat([entities,
+                                     pd.DataFrame({f"Crime Count {years[-1]}": counts[:, -1], 'Predicted Crime Count': predicted_crime}),
+                                     recommended_resources(predicted_crime)], axis=1)
+
+    return forecasts
+
+
+def monthly_count_panel(monthly_counts, years):
+    # (n_beats, 12 * n_years) crime counts of every beat per month of the given years, with the beats, the district
+    # code of every beat and the districts
+    monthly_counts = monthly_counts[monthly_counts['Year'].isin(years)]
+    beat_codes = monthly_counts.groupby(BEAT_KEYS, sort=True).ngroup().to_numpy()
+    beats = monthly_counts[BEAT_KEYS].drop_duplicates().sort_values(BEAT_KEYS).reset_index(drop=True)
+
+    months = (monthly_counts['Year'].to_numpy() - years[0]) * 12 + monthly_counts['Month'].to_numpy() - 1
+    counts = np.zeros((len(beats), 12 * len(years)))
+    np.add.at(counts, (beat_codes, months), monthly_counts['Crime Count'].to_numpy())
+
+    district_codes, districts = pd.factorize(beats['District Name'], sort=True)
+    return beats, district_codes, np.asarray(districts), counts
+
+
+def beat_count_design(beat_codes, district_codes, months, n_beats, n_districts, centre):
+    # Sparse design of the beat count model, one row per (beat, month): a one-hot beat effect, a linear trend in years
+    # per district and a month-of-year effect per district (January is the reference month)
+    n_rows = len(beat_codes)
+    rows = np.arange(n_rows)
+    month_of_year = months % 12
+    seasonal = month_of_year > 0
+
+    row_index = np.concatenate([rows, rows, rows[seasonal]])
+    column_index = np.concatenate([beat_codes,
+                                   n_beats + district_codes,
+                                   n_beats + n_districts + district_codes[seasonal] * 11 + month_of_year[seasonal] - 1])
+    values = np.concatenate([np.ones(n_rows), (months - centre) / 12, np.ones(seasonal.sum())])
+
+    return sparse.csr_matrix((values, (row_index, column_index)), shape=(n_rows, n_beats + n_districts * 12))
+
+
+def fit_beat_count_model(monthly_counts):
+    # Poisson log-linear model of the monthly crime count of every beat of the state, fitted at once on the sparse
+    # (beat x month) design: log(mean) = intercept + beat effect + district trend * years + district month effect.
+    # Returns the fitted parameters, which is all forecast_beat_counts needs
+    years = forecast_years(monthly_counts)
+    beats, district_codes, districts, counts = monthly_count_panel(monthly_counts, years)
+    n_beats, n_months = counts.shape
+    centre = (n_months - 1) / 2
+
+    beat_rows = np.repeat(np.arange(n_beats), n_months)
+    months = np.tile(np.arange(n_months), n_beats)
+    design = beat_count_design(beat_rows, district_codes[beat_rows], months, n_beats, len(districts), centre)
+
+    model = PoissonRegressor(alpha=POISSON_ALPHA, max_iter=POISSON_MAX_ITER).fit(design, counts.ravel())
+
+    coefficients = model.coef_
+    return {
+        **{key: beats[key].to_numpy(dtype=str) for key in BEAT_KEYS},
+        'district_codes': district_codes,
+        'districts': districts.astype(str),
+        'first_year': int(years[0]),
+        'last_year': int(years[-1]),
+        'centre': centre,
+        'intercept': model.intercept_,
+        'beat_effect': coefficients[:n_beats],
+        'district_trend': coefficients[n_beats:n_beats + len(districts)],
+        'district_season': np.column_stack([np.zeros(len(districts)), coefficients[n_beats + len(districts):].reshape(len(districts), 11)]),
+        'beat_yearly_mean': counts.sum(axis=1) / len(years)
+    }
+
+
+def forecast_beat_counts(params, year):
+    # Expected crime count of every beat over the twelve months of the given year, from the fitted parameters
+    months = (year - params['first_year']) * 12 + np.arange(12)
+    district_codes = params['district_codes']
+
+    log_mean = (params['intercept'] + params['beat_effect'][:, None]
+                + params['district_trend'][district_codes][:, None] * ((months - params['centre']) / 12)[None, :]
+                + params['district_season'][district_codes])
+
+    forecasts = pd.DataFrame({key: params[key] for key in BEAT_KEYS})
+    forecasts['Historical Yearly Crime Count'] = params['beat_yearly_mean']
+    forecasts['Forecast Crime Count'] = np.exp(log_mean).sum(axis=1)
+    return forecasts
+
+
+def save_beat_count_model(params, path):
+    np.savez(path, **params)
+
+
+def load_beat_count_model(path):
+    with np.load(path) as model:
+        params = {key: model[key] for key in model.files}
+    params['first_year'] = int(params['first_year'])
+    params['last_year'] = int(params['last_year'])
+    params['centre'] = float(params['centre'])
+    params['intercept'] = float(params['intercept'])
+    return params
+
+
+def forecast_severity(resource_data, beat_forecasts):
+    # Normalised crime severity of every beat scaled by its forecast growth (forecast crime count over its historical
+    # yearly mean) and normalised again per district. Beats without history keep their severity.
+    # Series aligned with resource_data, an alternative objective weight for the allocation
+    beats = resource_data[BEAT_KEYS].astype(str).merge(beat_forecasts, on=BEAT_KEYS, how='left')
+    growth = (beats['Forecast Crime Count'] / beats['Historical Yearly Crime Count']).to_numpy()
+    growth = np.where(np.isfinite(growth) & (growth > 0), growth, 1.0)
+
+    severity = resource_data['Normalised Crime Severity'].to_numpy() * growth
+    severity = pd.Series(severity, index=resource_data.index)
+    return severity / severity.groupby(resource_data['District Name']).transform('sum')
@@ -2,11 +2,11 @@ import streamlit as st
 import time
 import os
 import pandas as pd
-import requests
 from streamlit_extras.stylable_container import stylable_container
 
 from Continuous_Learning_and_Feedback import *
 from Crime_Pattern_Analysis import *
+from District_Geometry import load_district_geojson
 from Criminal_Profiling import create_criminal_profiling_dashboard
 from Predictive_modeling import *
 from Resource_Allocation import *
@@ -117,30 +117,23 @@ if 'tutorial_step' in st.session_state and st.session_state.tutorial_step > 0:
 
     elif st.session_state.tutorial_step == 2:
         # Step 2: Show Crime Pattern Analysis functionality
-        @st.cache_data
-        def load_data():
-            url = "https://raw.githubusercontent.com/adarshbiradar/maps-geojson/master/states/karnataka.json"
-            response = requests.get(url)
-            geojson_data = response.json()
-            csv_path = os.path.join(root_dir, 'Component_datasets', 'Crime_Pattern_Analysis_Cleaned.csv')
-            crime_data = pd.read_csv(csv_path)
-            mean_lat = crime_data['Latitude'].mean()
-            mean_lon = crime_data['Longitude'].mean()
-            return mean_lat, mean_lon, geojson_data, crime_data
-
-        mean_lat, mean_lon, geojson_data, crime_pattern_analysis = load_data()
+        filter_options = load_crime_pattern_filter_options()
 
         st.subheader("📅 Temporal Analysis of Crime Data")
-        temporal_analysis(crime_pattern_analysis)
+        temporal_analysis(filter_options)
 
         st.subheader("🗺️ Choropleth Maps")
-        chloropleth_maps(crime_pattern_analysis, geojson_data, mean_lat, mean_lon)
+        # Without the vendored district boundaries the choropleth is skipped, the rest of the page still works
+        try:
+            geojson_data = load_district_geojson()
+        except FileNotFoundError as e:
+            st.warning(f"⚠️ Choropleth map unavailable. {e}")
+        else:
+            district_data = load_crime_pattern_data(tuple(CHOROPLETH_COLUMNS))
+            chloropleth_maps(district_data, geojson_data, filter_options['mean_lat'], filter_options['mean_lon'])
 
         st.subheader("🔥 Crime Hotspot Map")
-        crime_pattern_analysis['Date'] = pd.to_datetime(crime_pattern_analysis[['Year', 'Month', 'Day']])
-        mean_lat_sampled = crime_pattern_analysis['Latitude'].mean()
-        mean_lon_sampled = crime_pattern_analysis['Longitude'].mean()
-        crime_hotspots(crime_pattern_analysis, mean_lat_sampled, mean_lon_sampled)
+        crime_hotspots(filter_options)
 
         if st.button("Next", key="next2"):
             st.session_state.tutorial_step = 3
@@ -203,9 +196,7 @@ if selected_clean == "Predictive Modeling":
     predictive_modeling_recidivism()
 
 if selected_clean == "Police Resource Allocation and Management":
-    data_path = os.path.join(root_dir, 'Component_datasets', 'Resource_Allocation_Cleaned.csv')
-    df = pd.read_csv(data_path)
-    resource_allocation(df)
+    resource_allocation(load_resource_allocation_data())
 
 if selected_clean == "Continuous Learning and Feedback":
     continuous_learning_and_feedback()
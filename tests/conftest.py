@@ -0,0 +1,70 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Make the component pipelines importable as packages (Crime_Pattern_Analysis.clean_data, ...) ahead of the app modules of
+# the same name, and the modules of the app importable, the app runs them as top-level modules from its own directory
+sys.path.insert(0, root_dir)
+sys.path.append(os.path.join(root_dir, 'app'))
+
+# Districts of the synthetic FIR file, CID has no police district in the Resource Allocation mapping and is dropped there
+DISTRICTS = ['Bengaluru City', 'Belagavi Dist', 'Bagalkot', 'Mysuru City', 'Tumakuru', 'CID', 'Udupi', 'Hubballi Dharwad City']
+CRIME_GROUPS = ['THEFT', 'MURDER', 'RAPE', 'CHEATING', 'MISSING PERSON', 'SUICIDE', 'MOTOR VEHICLE ACCIDENTS FATAL']
+DISTANCES_FROM_PS = ['2 KM NORTH', '500 m south', '100 feet EAST', '3km West', '10 km EAST', None, '200 mtrs SOUTH']
+
+
+def synthetic_fir_details(n_rows=3000, seed=0, years=(2016, 2017, 2018, 2019, 2020)):
+    # FIR rows over 30 police stations of the districts above, with a tenth of the rows repeated as the real file has
+    rng = np.random.default_rng(seed)
+    units = np.array([f"U{i} PS" for i in range(30)])
+    unit_districts = dict(zip(units, rng.choice(DISTRICTS, size=len(units))))
+
+    unit = rng.choice(units, size=n_rows)
+    year, month, day = rng.choice(years, size=n_rows), rng.integers(1, 13, size=n_rows), rng.integers(1, 29, size=n_rows)
+    fir_details = pd.DataFrame({
+        'District_Name': [unit_districts[name] for name in unit],
+        'UnitName': unit,
+        'FIRNo': [f"{number:04d}/{y}" for number, y in zip(rng.integers(1, 400, size=n_rows), year)],
+        'Year': year,
+        'Month': month,
+        'FIR_Reg_DateTime': [f"{y}-{m:02d}-{d:02d} {h:02d}:00:00" for y, m, d, h in zip(year, month, day, rng.integers(0, 24, size=n_rows))],
+        'CrimeGroup_Name': rng.choice(CRIME_GROUPS, size=n_rows),
+        'Beat_Name': [f"BEAT {i}" for i in rng.integers(1, 9, size=n_rows)],
+        'Village_Area_Name': [f"VILL{i}" for i in rng.integers(1, 7, size=n_rows)],
+        'Latitude': 15.0,
+        'Longitude': 76.0,
+        'Distance from PS': rng.choice(np.array(DISTANCES_FROM_PS, dtype=object), size=n_rows),
+        'VICTIM COUNT': rng.integers(0, 4, size=n_rows),
+        'Accused Count': rng.integers(0, 4, size=n_rows)
+    })
+    return pd.concat([fir_details, fir_details.sample(n_rows // 10, random_state=seed)], ignore_index=True)
+
+
+def police_stations(seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'UnitName': [f"U{i} PS" for i in range(30)],
+                         'Latitude': rng.uniform(12, 18, size=30), 'Longitude': rng.uniform(75, 77, size=30)})
+
+
+@pytest.fixture
+def fir_workspace(tmp_path, monkeypatch):
+    # Repository layout the pipelines read and write with paths relative to their component directory, with a synthetic
+    # FIR file and police station co-ordinates, run from the Crime_Pattern_Analysis directory
+    for directory in ['datasets', 'Component_datasets', 'Crime_Pattern_Analysis', 'Resource_Allocation']:
+        (tmp_path / directory).mkdir()
+    synthetic_fir_details().to_csv(tmp_path / 'datasets' / 'FIR_Details_Data.csv', index=False)
+    police_stations().to_csv(tmp_path / 'datasets' / 'Polce_Stations_Lat_Long.csv', index=False)
+
+    monkeypatch.chdir(tmp_path / 'Crime_Pattern_Analysis')
+    return tmp_path
+
+
+@pytest.fixture
+def make_fir_details():
+    # synthetic_fir_details for the tests that write FIR rows of their own, such as rows appended to the FIR file
+    return synthetic_fir_details
@@ -0,0 +1,49 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Resource_Allocation.allocate_statewide import PLAN_COLUMNS, SANCTION_COLUMNS, allocate_statewide
+from Resource_Allocation.clean_data import clean_resource_data
+from Resource_Allocation.ingest_data import ingest_resource_data
+from Resource_Allocation_Solver import ALLOCATION_COLUMNS, allocate_district
+
+
+@pytest.fixture
+def cleaned_resources(fir_workspace):
+    clean_resource_data(ingest_resource_data())
+    return pd.read_csv(fir_workspace / 'Component_datasets' / 'Resource_Allocation_Cleaned.csv')
+
+
+def test_statewide_plan_matches_district_solves(fir_workspace, cleaned_resources):
+    # The parallel statewide plan holds, in the order of the dataset, the allocation of every district solved on its own
+    plan, solve_times = allocate_statewide(workers=2)
+
+    expected = pd.concat([allocate_district(beats, *beats[SANCTION_COLUMNS].iloc[0].astype(int))
+                          for _, beats in cleaned_resources.groupby('District Name', sort=False)]).sort_index()
+    pd.testing.assert_frame_equal(plan[PLAN_COLUMNS], expected[PLAN_COLUMNS])
+    pd.testing.assert_frame_equal(pd.read_csv(fir_workspace / 'Component_datasets' / 'Resource_Allocation_Plan.csv'),
+                                  expected[PLAN_COLUMNS].reset_index(drop=True), check_dtype=False)
+
+    assert list(solve_times['District Name']) == list(cleaned_resources['District Name'].unique())
+    assert solve_times['Beats'].sum() == len(cleaned_resources)
+
+
+def test_revised_strengths(fir_workspace, cleaned_resources, tmp_path):
+    # Districts of a revision file are solved with their revised strengths, the others with the sanctioned ones
+    district = cleaned_resources['District Name'].iloc[0]
+    beats = cleaned_resources[cleaned_resources['District Name'] == district]
+    revision_path = tmp_path / 'revision.json'
+    revision_path.write_text(json.dumps({district: {'CHC': len(beats) * 2}}))
+
+    plan, solve_times = allocate_statewide(revision_path=str(revision_path), workers=2)
+
+    sanctioned = beats[SANCTION_COLUMNS].iloc[0].astype(int).tolist()
+    expected = allocate_district(beats, sanctioned[0], len(beats) * 2, sanctioned[2])
+    np.testing.assert_array_equal(plan.loc[beats.index, ALLOCATION_COLUMNS], expected[ALLOCATION_COLUMNS])
+    assert solve_times.loc[solve_times['District Name'] == district, 'Sanctioned CHC'].item() == len(beats) * 2
+
+    revision_path.write_text(json.dumps({'Atlantis': {'ASI': 1}}))
+    with pytest.raises(ValueError):
+        allocate_statewide(revision_path=str(revision_path), workers=2)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from Crime_Pattern_Analysis.clean_data import (calculate_crime_coordinates, calculate_crime_coordinates_columns,
+                                               clean_crime_pattern_analysis_chunks, clean_data_crime_pattern_analysis,
+                                               extract_direction_distance, extract_direction_distance_columns,
+                                               update_crime_lat_long)
+from Crime_Pattern_Analysis.ingest_data import ingest_crime_pattern_analysis, ingest_crime_pattern_analysis_chunks
+
+DISTANCES_FROM_PS = ['2 KM NORTH', '10 km EAST', '200 mtrs SOUTH', '500 m south', '300 Feet West', '150 KM NORTH',
+                     '3km west', 'WEST', 'near the station', '', '1.5 Km East', '40 m North-East', '7 KMS SOUTH']
+
+
+def test_vectorized_coordinates_match_row_wise():
+    # Every row moved by calculate_crime_coordinates_columns exactly as the row-wise calculate_crime_coordinates moves it,
+    # repeated strings included (they are parsed once and broadcast through their codes)
+    rng = np.random.default_rng(0)
+    distance_from_ps = pd.Series(rng.choice(DISTANCES_FROM_PS, size=500))
+    lat = rng.uniform(11.5, 18.5, size=500)
+    lon = rng.uniform(74.5, 77.5, size=500)
+
+    new_lat, new_lon = calculate_crime_coordinates_columns(lat, lon, *extract_direction_distance_columns(distance_from_ps))
+
+    for i, string in enumerate(distance_from_ps):
+        expected_lat, expected_lon = calculate_crime_coordinates(lat[i], lon[i], *extract_direction_distance(string))
+        assert new_lat[i] == expected_lat
+        assert new_lon[i] == expected_lon
+
+
+def test_missing_distance_keeps_station_coordinates():
+    distance_from_ps = pd.Series(['2 KM NORTH', None, np.nan])
+    new_lat, new_lon = calculate_crime_coordinates_columns([15.0] * 3, [76.0] * 3, *extract_direction_distance_columns(distance_from_ps))
+
+    assert new_lat[0] > 15.0
+    assert list(new_lat[1:]) == [15.0, 15.0] and list(new_lon) == [76.0] * 3
+
+
+def read_outputs(workspace):
+    # Cleaned CSV and temporal cube as written, and the Parquet dataset in a row order independent of its files
+    component_datasets = workspace / 'Component_datasets'
+    dataset = pd.read_parquet(component_datasets / 'Crime_Pattern_Analysis_Cleaned')
+    dataset = dataset.astype({'Year': str, 'District_Name': str}).sort_values(list(dataset.columns)).reset_index(drop=True)
+    return ((component_datasets / 'Crime_Pattern_Analysis_Cleaned.csv').read_bytes(),
+            (component_datasets / 'Crime_Pattern_Temporal_Cube.csv').read_bytes(), dataset)
+
+
+def test_chunked_clean_matches_full_clean(fir_workspace):
+    # Chunks smaller than the file, with rows repeated across chunks, give the outputs of the clean of the whole file
+    update_crime_lat_long(clean_data_crime_pattern_analysis(ingest_crime_pattern_analysis()))
+    csv, cube, dataset = read_outputs(fir_workspace)
+
+    assert clean_crime_pattern_analysis_chunks(ingest_crime_pattern_analysis_chunks(chunksize=700)) == len(dataset)
+    chunked_csv, chunked_cube, chunked_dataset = read_outputs(fir_workspace)
+
+    assert chunked_csv == csv
+    assert chunked_cube == cube
+    pd.testing.assert_frame_equal(chunked_dataset, dataset)
+
+    # The per-chunk Parquet files are compacted, one file per partition
+    partitions = list((fir_workspace / 'Component_datasets' / 'Crime_Pattern_Analysis_Cleaned').glob('*/*'))
+    assert all(len(list(partition.glob('*.parquet'))) == 1 for partition in partitions)
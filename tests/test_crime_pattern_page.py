@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.cluster import DBSCAN
+
+import app.Crime_Pattern_Analysis as page
+from Crime_Pattern_Analysis.clean_data import clean_data_crime_pattern_analysis, update_crime_lat_long
+from Crime_Pattern_Analysis.ingest_data import ingest_crime_pattern_analysis
+
+
+@pytest.fixture
+def crime_pattern_outputs(fir_workspace, monkeypatch):
+    # Outputs of the Crime Pattern Analysis pipeline for the synthetic FIR file, read by the page instead of the real ones
+    update_crime_lat_long(clean_data_crime_pattern_analysis(ingest_crime_pattern_analysis()))
+
+    component_datasets = fir_workspace / 'Component_datasets'
+    monkeypatch.setattr(page, 'crime_pattern_dataset_path', str(component_datasets / 'Crime_Pattern_Analysis_Cleaned'))
+    monkeypatch.setattr(page, 'crime_pattern_csv_path', str(component_datasets / 'Crime_Pattern_Analysis_Cleaned.csv'))
+    monkeypatch.setattr(page, 'temporal_cube_path', str(component_datasets / 'Crime_Pattern_Temporal_Cube.csv'))
+    clear_page_caches()
+    yield component_datasets
+    clear_page_caches()
+
+
+def clear_page_caches():
+    for loader in [page.load_crime_pattern_data, page.load_crime_date_index, page.load_temporal_rollups,
+                   page.load_heat_pyramid, page.load_hotspot_clusters]:
+        loader.clear()
+
+
+def sorted_rows(df):
+    # Rows in an order independent of how they were read, categoricals as strings. The CSV fallback parses floats to within
+    # one ulp of the values in the Parquet dataset, compare with assert_frame_equal(..., check_exact=False)
+    df = df.astype({column: str for column, dtype in df.dtypes.items() if not pd.api.types.is_float_dtype(dtype)})
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('districts, crime_groups, date_range', [
+    (None, None, None),
+    (('Udupi', 'Mysuru'), None, None),
+    (None, ('THEFT', 'MURDER'), ('2017-03-15', '2019-06-30')),
+    (('Bengaluru Urban',), ('RAPE',), ('2016-01-01', '2016-12-31')),
+    (('Udupi',), None, ('2021-01-01', '2021-12-31'))
+])
+def test_pushdown_matches_in_memory_filter(crime_pattern_outputs, monkeypatch, districts, crime_groups, date_range):
+    # Filters pushed down to the partitioned Parquet dataset select the rows the in-memory filter selects from the CSV
+    pushed_down = page.load_crime_pattern_data(tuple(page.HOTSPOT_COLUMNS), districts, crime_groups, date_range)
+
+    monkeypatch.setattr(page, 'crime_pattern_dataset_path', str(crime_pattern_outputs / 'missing'))
+    clear_page_caches()
+    in_memory = page.load_crime_pattern_data(tuple(page.HOTSPOT_COLUMNS), districts, crime_groups, date_range)
+
+    assert list(pushed_down.columns) == page.HOTSPOT_COLUMNS
+    pd.testing.assert_frame_equal(sorted_rows(pushed_down), sorted_rows(in_memory), check_exact=False)
+
+
+def raw_temporal_counts(crimes, granularity, districts=None, crime_groups=None):
+    if districts:
+        crimes = crimes[crimes['District_Name'].isin(districts)]
+    if crime_groups:
+        crimes = crimes[crimes['CrimeGroup_Name'].isin(crime_groups)]
+    return crimes.groupby([granularity, 'District_Name', 'CrimeGroup_Name']).size().reset_index(name='Count')
+
+
+def comparable_counts(counts):
+    counts = counts.astype({counts.columns[0]: 'int64', 'District_Name': str, 'CrimeGroup_Name': str, 'Count': 'int64'})
+    return counts.sort_values(list(counts.columns[:3])).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('cube_written', [True, False])
+@pytest.mark.parametrize('granularity', ['Year', 'Month', 'Day'])
+@pytest.mark.parametrize('districts, crime_groups', [(None, None), (('Udupi', 'Mysuru'), None), (None, ('THEFT',)),
+                                                     (('Bengaluru Urban', 'Tumakuru'), ('MURDER', 'RAPE'))])
+def test_temporal_rollups_match_raw_groupby(crime_pattern_outputs, granularity, districts, crime_groups, cube_written):
+    # Counts sliced from the roll-ups of the pipeline's cube, or of the cube the page builds when it is missing, are the
+    # counts of a groupby over the filtered crimes
+    crimes = pd.read_csv(crime_pattern_outputs / 'Crime_Pattern_Analysis_Cleaned.csv')
+    if not cube_written:
+        (crime_pattern_outputs / 'Crime_Pattern_Temporal_Cube.csv').unlink()
+
+    counts = page.temporal_counts(page.load_temporal_rollups(), granularity, districts, crime_groups)
+
+    assert not counts.empty
+    pd.testing.assert_frame_equal(comparable_counts(counts),
+                                  comparable_counts(raw_temporal_counts(crimes, granularity, districts, crime_groups)))
+
+
+def test_heat_cells_match_raw_binning():
+    # Every cell holds the weight of the points whose floor(lat / size), floor(lon / size) is that cell, at its centre
+    rng = np.random.default_rng(0)
+    lat, lon, weights = rng.uniform(11.5, 18.5, 2000), rng.uniform(74.5, 78.0, 2000), rng.integers(1, 4, 2000).astype(float)
+
+    for cell_size in page.HEAT_PYRAMID_LEVELS.values():
+        cells = page.bin_crime_coordinates(lat, lon, weights, cell_size)
+        expected = pd.DataFrame({'row': np.floor(lat / cell_size), 'col': np.floor(lon / cell_size), 'Weight': weights})\
+                     .groupby(['row', 'col'])['Weight'].sum().reset_index()
+
+        assert len(cells) == len(expected)
+        cells = cells.assign(row=np.floor(cells['Latitude'] / cell_size), col=np.floor(cells['Longitude'] / cell_size))
+        merged = cells.merge(expected, on=['row', 'col'], suffixes=('', '_expected'))
+        assert len(merged) == len(expected)
+        np.testing.assert_array_equal(merged['Weight'], merged['Weight_expected'])
+        np.testing.assert_allclose(merged['Latitude'], (merged['row'] + 0.5) * cell_size)
+
+
+def test_heat_pyramid_levels_and_view(crime_pattern_outputs):
+    date_range = ('2017-01-01', '2018-12-31')
+    crimes = page.load_hotspot_crimes(None, date_range)
+    pyramid = page.load_heat_pyramid(None, date_range)
+
+    # Every level holds all the filtered crimes, in fewer cells at the coarser levels
+    assert set(pyramid) == set(page.HEAT_PYRAMID_LEVELS)
+    assert all(cells['Weight'].sum() == len(crimes) for cells in pyramid.values())
+    assert (np.diff([len(pyramid[level]) for level in sorted(pyramid)]) >= 0).all()
+
+    assert page.heat_pyramid_level(5) == 0 and page.heat_pyramid_level(9) == 8 and page.heat_pyramid_level(18) == 12
+
+    bounds = (14.0, 75.5, 16.0, 76.5)
+    cells = page.heat_cells_for_view(pyramid, 10, bounds)
+    level_cells = pyramid[10]
+    inside = level_cells['Latitude'].between(14.0, 16.0) & level_cells['Longitude'].between(75.5, 76.5)
+    pd.testing.assert_frame_equal(cells, level_cells[inside])
+    assert page.load_heat_pyramid(None, ('2030-01-01', '2030-12-31')) == {}
+
+
+@pytest.mark.parametrize('crime_groups, date_range', [(None, None), (('THEFT', 'CHEATING'), ('2017-01-01', '2019-12-31'))])
+def test_hotspot_clusters_match_dbscan_on_every_row(crime_pattern_outputs, crime_groups, date_range):
+    # Clustering the distinct co-ordinates weighted by their rows finds the clusters of the same haversine DBSCAN run
+    # over every aggregated row
+    crimes = page.load_hotspot_crimes(crime_groups, date_range)
+    aggregated = crimes.groupby(['District_Name', 'UnitName', 'Latitude', 'Longitude', 'CrimeGroup_Name'], observed=True)\
+                       .size().reset_index(name='Count')
+    dbscan = DBSCAN(eps=page.HOTSPOT_EPS_KM / page.EARTH_RADIUS_KM, min_samples=page.HOTSPOT_MIN_SAMPLES, metric='haversine')
+    aggregated['Cluster'] = dbscan.fit_predict(np.radians(aggregated[['Latitude', 'Longitude']].to_numpy()))
+    expected = aggregated[aggregated['Cluster'] != -1].groupby('Cluster').agg(
+        Latitude=('Latitude', 'mean'), Longitude=('Longitude', 'mean'), Count=('Count', 'sum'))
+
+    cluster_centers, map_center = page.load_hotspot_clusters(crime_groups, date_range)
+
+    # Cluster numbers depend on the order the points are visited, the clusters are compared by their centre and count
+    assert len(expected) > 0
+    columns = ['Latitude', 'Longitude', 'Count']
+    pd.testing.assert_frame_equal(cluster_centers[columns].sort_values(columns).reset_index(drop=True),
+                                  expected[columns].sort_values(columns).reset_index(drop=True), check_exact=False)
+    assert map_center == pytest.approx([aggregated['Latitude'].mean(), aggregated['Longitude'].mean()])
+    assert page.load_hotspot_clusters(crime_groups, ('2030-01-01', '2030-12-31')) == (None, None)
+
+
+def date_index_of(crimes):
+    # Sorted date index as load_crime_date_index builds it
+    crimes = crimes.sort_values('Date', kind='stable', na_position='first').reset_index(drop=True)
+    return crimes, crimes['Date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+@pytest.mark.parametrize('date_range, crime_groups', [
+    (('2017-03-15', '2019-06-30'), None),
+    (('2018-02-03', '2018-02-03'), ('THEFT',)),
+    (('2010-01-01', '2030-12-31'), ('MURDER', 'RAPE')),
+    (('2019-05-01', '2019-04-01'), None),
+    (None, ('CHEATING',))
+])
+def test_date_index_matches_boolean_mask(date_range, crime_groups):
+    # Binary searches on the sorted day numbers select the crimes a boolean mask over the dates selects, both ends
+    # included, with crimes without a date never selected by a date range
+    rng = np.random.default_rng(0)
+    dates = pd.Series(pd.Timestamp('2016-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365, 3000), unit='D'))
+    dates[rng.random(3000) < 0.02] = pd.NaT
+    crimes = pd.DataFrame({'Date': dates, 'CrimeGroup_Name': rng.choice(['THEFT', 'MURDER', 'RAPE', 'CHEATING'], 3000),
+                           'Latitude': rng.uniform(12, 18, 3000)})
+
+    selected = page.crimes_in_date_range(date_index_of(crimes), date_range, crime_groups)
+
+    mask = pd.Series(True, index=crimes.index)
+    if date_range:
+        mask &= (crimes['Date'] >= pd.Timestamp(date_range[0])) & (crimes['Date'] <= pd.Timestamp(date_range[1]))
+    if crime_groups:
+        mask &= crimes['CrimeGroup_Name'].isin(crime_groups)
+
+    pd.testing.assert_frame_equal(sorted_rows(selected), sorted_rows(crimes[mask]))
+
+
+def test_csv_fallback_date_index(crime_pattern_outputs, monkeypatch):
+    # Without the Parquet dataset the hotspot crimes come from the date index of the CSV, the rows of the pushed down filter
+    date_range = ('2017-03-15', '2019-06-30')
+    pushed_down = page.load_hotspot_crimes(('THEFT',), date_range)
+
+    monkeypatch.setattr(page, 'crime_pattern_dataset_path', str(crime_pattern_outputs / 'missing'))
+    clear_page_caches()
+    from_index = page.load_hotspot_crimes(('THEFT',), date_range)
+
+    assert not from_index.empty
+    pd.testing.assert_frame_equal(sorted_rows(from_index), sorted_rows(pushed_down), check_exact=False)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import District_Geometry
+from District_Geometry import load_district_geojson, simplify_geojson
+
+
+def neighbouring_districts():
+    # Two districts sharing a jagged border from (1, 0) to (1, 1), walked in opposite directions, and an island
+    rng = np.random.default_rng(0)
+    y = np.linspace(0, 1, 202)[1:-1]
+    x = 1 + 0.05 * np.sin(6 * np.pi * y) + 0.001 * rng.standard_normal(200)
+    border = [(round(float(lon), 5), round(float(lat), 5)) for lon, lat in zip(x, y)]
+    west = [(0, 0), (1, 0)] + border + [(1, 1), (0, 1), (0, 0)]
+    east = [(1, 0), (2, 0), (2, 1), (1, 1)] + border[::-1] + [(1, 0)]
+    island = [(3, 3), (3.5, 3.01), (4, 3), (3.5, 3.5), (3, 3)]
+
+    def feature(name, geometry):
+        return {'type': 'Feature', 'properties': {'district': name, 'other': 1}, 'geometry': geometry}
+
+    return {'type': 'FeatureCollection', 'features': [
+        feature('West', {'type': 'Polygon', 'coordinates': [[list(point) for point in west]]}),
+        feature('East', {'type': 'MultiPolygon', 'coordinates': [[[list(point) for point in east]], [[list(point) for point in island]]]})
+    ]}, set(border)
+
+
+def border_points(ring, border):
+    return [tuple(point) for point in ring if (point[0], point[1]) in border]
+
+
+def test_simplified_districts_keep_the_same_border():
+    geojson_data, border = neighbouring_districts()
+    simplified = simplify_geojson(geojson_data, 0.01)
+    west = simplified['features'][0]['geometry']['coordinates'][0]
+    east, island = [polygon[0] for polygon in simplified['features'][1]['geometry']['coordinates']]
+
+    # Both districts keep the same few points of the border, in opposite order, so there is no gap or overlap between them
+    assert 0 < len(border_points(west, border)) < len(border) / 10
+    assert border_points(west, border) == border_points(east, border)[::-1]
+
+    # Rings stay closed and the island keeps enough points to stay a polygon, only the district name is kept
+    assert all(ring[0] == ring[-1] for ring in [west, east, island]) and len(island) >= 4
+    assert [feature['properties'] for feature in simplified['features']] == [{'district': 'West'}, {'district': 'East'}]
+
+
+def test_zero_tolerance_keeps_every_point():
+    geojson_data, border = neighbouring_districts()
+    west = simplify_geojson(geojson_data, 0.0)['features'][0]['geometry']['coordinates'][0]
+    assert len(west) == len(geojson_data['features'][0]['geometry']['coordinates'][0])
+
+
+def test_missing_boundaries_raise(tmp_path, monkeypatch):
+    # Without the vendored files the loader raises FileNotFoundError, which the page turns into a warning
+    monkeypatch.setattr(District_Geometry, 'district_geojson_path', str(tmp_path / 'karnataka.json'))
+    monkeypatch.setattr(District_Geometry, 'simplified_geojson_dir', str(tmp_path / 'geojson'))
+    load_district_geojson.clear()
+
+    with pytest.raises(FileNotFoundError):
+        load_district_geojson(0.5)
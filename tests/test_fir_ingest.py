@@ -0,0 +1,80 @@
+import pandas as pd
+
+from Crime_Pattern_Analysis.clean_data import clean_data_crime_pattern_analysis, update_crime_lat_long
+from Crime_Pattern_Analysis.ingest_data import ingest_crime_pattern_analysis
+from Data_Pipeline.fir_ingest import (build_fir_components, crime_pattern_view, ingest_fir_details, resource_view,
+                                      update_fir_components)
+from Resource_Allocation.clean_data import clean_resource_data
+from Resource_Allocation.ingest_data import ingest_resource_data
+
+OUTPUTS = ['Crime_Pattern_Analysis_Cleaned.csv', 'Crime_Pattern_Temporal_Cube.csv', 'Resource_Allocation_Cleaned.csv']
+
+
+def read_outputs(workspace):
+    return {name: (workspace / 'Component_datasets' / name).read_bytes() for name in OUTPUTS}
+
+
+def test_views_match_component_ingests(fir_workspace):
+    # The fact table parsed once in chunks holds the rows of both component ingests
+    fir_details = ingest_fir_details(chunksize=700)
+
+    crime_pattern = ingest_crime_pattern_analysis().drop_duplicates()
+    view = crime_pattern_view(fir_details).drop_duplicates()
+    assert len(view) == len(crime_pattern)
+    assert set(map(tuple, view.astype(str).to_numpy())) == set(map(tuple, crime_pattern.astype(str).to_numpy()))
+
+    resource = ingest_resource_data()
+    view = resource_view(fir_details)
+    assert len(view) == len(resource)
+    assert set(map(tuple, view.astype(str).to_numpy())) == set(map(tuple, resource.astype(str).to_numpy()))
+
+
+def test_fact_table_build_matches_component_pipelines(fir_workspace):
+    update_crime_lat_long(clean_data_crime_pattern_analysis(ingest_crime_pattern_analysis()))
+    clean_resource_data(ingest_resource_data())
+    outputs = read_outputs(fir_workspace)
+
+    build_fir_components(chunksize=700)
+    assert read_outputs(fir_workspace) == outputs
+
+
+def read_sorted_outputs(workspace):
+    # Outputs of the FIR components in a row order independent of the order the FIRs were processed in
+    component_datasets = workspace / 'Component_datasets'
+    outputs = {name: pd.read_csv(component_datasets / name) for name in OUTPUTS}
+    outputs['Crime_Pattern_Analysis_Cleaned'] = pd.read_parquet(component_datasets / 'Crime_Pattern_Analysis_Cleaned')
+    outputs['Resource_Allocation_Beat_Monthly_Counts'] = pd.read_parquet(component_datasets / 'Resource_Allocation_Beat_Monthly_Counts.parquet')
+
+    for name, df in outputs.items():
+        df = df.astype({column: str for column, dtype in df.dtypes.items() if not pd.api.types.is_numeric_dtype(dtype)})
+        outputs[name] = df.sort_values(list(df.columns)).reset_index(drop=True)
+    return outputs
+
+
+def test_incremental_refresh_matches_full_rebuild(fir_workspace, make_fir_details):
+    fir_path = fir_workspace / 'datasets' / 'FIR_Details_Data.csv'
+    old_rows = make_fir_details(n_rows=2000, seed=1, years=(2016, 2017, 2018))
+    old_rows.to_csv(fir_path, index=False)
+    build_fir_components(chunksize=700)
+
+    # FIRs registered later, a FIR registered at the watermark under another FIRNo, a repeated new FIR and an old FIR
+    # written again, which the refresh skips as the full rebuild drops it as a duplicate
+    latest = old_rows.loc[[pd.to_datetime(old_rows['FIR_Reg_DateTime']).idxmax()]].assign(FIRNo='9999/2018')
+    new_rows = make_fir_details(n_rows=800, seed=2, years=(2019, 2020))
+    pd.concat([latest, new_rows, old_rows.head(5)]).to_csv(fir_path, mode='a', header=False, index=False)
+
+    update_fir_components(chunksize=700)
+    incremental = read_sorted_outputs(fir_workspace)
+
+    (fir_workspace / 'Component_datasets' / 'FIR_Watermark.json').unlink()
+    build_fir_components(chunksize=700)
+    full = read_sorted_outputs(fir_workspace)
+
+    assert incremental.keys() == full.keys()
+    for name in full:
+        pd.testing.assert_frame_equal(incremental[name], full[name], check_exact=False, obj=name)
+
+    # Nothing new since the last run leaves the outputs as they are
+    update_fir_components(chunksize=700)
+    for name, df in read_sorted_outputs(fir_workspace).items():
+        pd.testing.assert_frame_equal(df, full[name], obj=name)
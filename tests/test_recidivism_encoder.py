@@ -0,0 +1,76 @@
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from Recidivism_Encoder import (ENCODED_COLUMNS, FEATURES, category_codes, compile_encoder, encode, frequencies,
+                                load_recidivism_encoder, row_codes)
+
+
+def training_encoding(seed=0, n_rows=400):
+    # Frequency encoding and scaler fitted the way transform_data.py fits them, on synthetic accused records
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({feature: rng.choice([f"{feature} {i}" for i in range(int(rng.integers(3, 12)))], n_rows)
+                         for feature in ENCODED_COLUMNS})
+    data['age'] = rng.integers(7, 100, n_rows)
+    data = data[FEATURES]
+
+    frequency = {feature: data[feature].value_counts().to_dict() for feature in ENCODED_COLUMNS}
+    return frequency, StandardScaler().fit(frequency_encoded(data, frequency))
+
+
+def frequency_encoded(data, frequency):
+    # Categorical features replaced by their training frequency, 0 for the values the training data did not have
+    encoded = data.copy()
+    for feature in ENCODED_COLUMNS:
+        encoded[feature] = encoded[feature].map(frequency[feature]).fillna(0)
+    return encoded
+
+
+def form_inputs(frequency, n_rows, seed=1):
+    # Records over the training categories and values the training data did not have
+    rng = np.random.default_rng(seed)
+    inputs = pd.DataFrame({feature: rng.choice(list(frequency[feature]) + ['Unseen', 'Other unseen'], n_rows)
+                           for feature in ENCODED_COLUMNS})
+    inputs['age'] = rng.integers(7, 100, n_rows)
+    return inputs[FEATURES]
+
+
+def test_encode_matches_scaler_transform():
+    frequency, scaler = training_encoding()
+    encoder = compile_encoder(frequency, scaler.mean_, scaler.scale_, list(scaler.feature_names_in_))
+    inputs = form_inputs(frequency, 300)
+
+    encoded = frequency_encoded(inputs, frequency)
+    # Codes looked up per record as the app does, and per column as the batch scoring does
+    codes = np.vstack([row_codes(encoder, record) for record in inputs.to_dict('records')])
+    column_codes = np.column_stack([category_codes(encoder, encoder['features'][i], inputs[encoder['features'][i]])
+                                    for i in encoder['categorical']])
+    np.testing.assert_array_equal(column_codes, codes)
+
+    np.testing.assert_allclose(encode(encoder, codes, inputs[['age']].to_numpy()), scaler.transform(encoded), rtol=1e-12, atol=1e-12)
+    categorical = [encoder['features'][i] for i in encoder['categorical']]
+    np.testing.assert_array_equal(frequencies(encoder, codes), encoded[categorical])
+
+    # The unseen values share the code after the last category of their feature
+    for column, feature in enumerate(categorical):
+        unseen = ~inputs[feature].isin(list(frequency[feature])).to_numpy()
+        assert unseen.any()
+        assert (codes[unseen, column] == len(encoder['categories'][feature])).all()
+
+
+def test_encoder_loaded_from_training_files(tmp_path):
+    frequency, scaler = training_encoding(seed=2)
+    with open(tmp_path / 'frequency_encoding.json', 'w') as f:
+        json.dump({feature: {name: int(count) for name, count in counts.items()} for feature, counts in frequency.items()}, f)
+    joblib.dump(scaler, tmp_path / 'scaler.pkl')
+
+    encoder = load_recidivism_encoder(str(tmp_path))
+    assert encoder['features'] == FEATURES
+
+    inputs = form_inputs(frequency, 50, seed=3)
+    codes = np.vstack([row_codes(encoder, record) for record in inputs.to_dict('records')])
+    expected = scaler.transform(frequency_encoded(inputs, frequency))
+    np.testing.assert_allclose(encode(encoder, codes, inputs[['age']].to_numpy()), expected, rtol=1e-12, atol=1e-12)
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+
+from Recidivism_Encoder import FEATURES
+from Recidivism_Model_Pool import MEMBER_NAMES, ModelPool
+
+
+def test_dummy_members_fitted_once(tmp_path, monkeypatch):
+    # Without the member MOJOs every member is a DummyClassifier voting 0, fitted when the pool is loaded only
+    fits = []
+    fit = DummyClassifier.fit
+    monkeypatch.setattr(DummyClassifier, 'fit', lambda self, *args: fits.append(self) or fit(self, *args))
+
+    pool = ModelPool(paths=[tmp_path / f'model_{i}.zip' for i in range(1, 6)])
+    assert not pool.h2o
+    assert len(fits) == len(MEMBER_NAMES)
+
+    X = np.random.default_rng(0).normal(size=(4, len(FEATURES)))
+    for _ in range(3):
+        result = pool.predict(X, FEATURES)
+        assert all((votes == 0).all() for votes in result['votes'].values())
+        assert all((probabilities == 0).all() for probabilities in result['probabilities'].values())
+        assert (result['outcome'] == 0).all()
+    assert len(fits) == len(MEMBER_NAMES)
+
+
+def test_concurrent_scoring_matches_sequential(tmp_path):
+    # Members fitted on synthetic rows stand in for the MOJOs, scored by the pool from several sessions at once
+    rng = np.random.default_rng(1)
+    X_train = rng.normal(size=(300, len(FEATURES)))
+    y_train = (X_train[:, 0] + X_train[:, 1] + rng.normal(scale=0.5, size=300) > 0).astype(int)
+    models = [KNeighborsClassifier(), GaussianNB(), RandomForestClassifier(n_estimators=20, random_state=0),
+              LogisticRegression(), DummyClassifier(strategy='most_frequent')]
+
+    pool = ModelPool(paths=[tmp_path / f'model_{i}.zip' for i in range(1, 6)])
+    pool.models = [model.fit(X_train, y_train) for model in models]
+
+    inputs = [rng.normal(size=(int(rng.integers(1, 20)), len(FEATURES))) for _ in range(40)]
+    with ThreadPoolExecutor(max_workers=8) as sessions:
+        results = list(sessions.map(lambda X: pool.predict(X, FEATURES), inputs))
+
+    for X, result in zip(inputs, results):
+        votes = [model.predict(X) for model in models]
+        for name, model, member_votes in zip(MEMBER_NAMES, models, votes):
+            np.testing.assert_array_equal(result['votes'][name], member_votes)
+            np.testing.assert_array_equal(result['probabilities'][name], model.predict_proba(X)[:, 1])
+        np.testing.assert_array_equal(result['vote_share'], np.mean(votes, axis=0))
+        np.testing.assert_array_equal(result['outcome'], (np.sum(votes, axis=0) >= 3).astype(int))
+
+    # Every call of every member is counted once, whatever the interleaving of the sessions
+    summary = pool.latency_summary()
+    assert [row['Model'] for row in summary] == MEMBER_NAMES
+    assert all(row['Calls'] == len(inputs) for row in summary)
+    assert all(0 <= row['Last (ms)'] <= row['Max (ms)'] for row in summary)
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pytest
+
+from Recidivism_Encoder import compile_encoder, encode, encoder_sha256, load_recidivism_encoder
+from Recidivism_Risk_Table import (RISK_TABLE_AGES, load_risk_table, lookup_risk, risk_index_path, risk_table_index,
+                                   risk_table_path, score_risk_rows)
+from Recidivism_Scorer import load_recidivism_scorer, predict_proba
+
+scorer = load_recidivism_scorer()
+requires_scorer = pytest.mark.skipif(scorer is None, reason="no committed recidivism scorer")
+
+
+class ScoredEntries:
+    # Stands in for the memory-mapped table: every entry looked up is scored by score_risk_rows, as build_risk_table
+    # scores it, without building the whole table
+    def __init__(self, scorer, encoder, index):
+        self.scorer, self.encoder, self.index = scorer, encoder, index
+
+    def __getitem__(self, position):
+        entry = score_risk_rows(self.scorer, self.encoder, self.index, position, position + 1)
+        assert entry.dtype == np.float64
+        return entry[0]
+
+
+@requires_scorer
+def test_table_hits_match_live_scoring():
+    encoder = load_recidivism_encoder()
+    table = risk_table_index(scorer, encoder)
+    table['probability'] = ScoredEntries(scorer, encoder, table)
+
+    # Form inputs drawn over every category code, the unseen code included, and every age of the form
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        codes = np.array([[rng.integers(len(encoder['categories'][encoder['features'][i]]) + 1) for i in encoder['categorical']]])
+        age = int(rng.choice(RISK_TABLE_AGES))
+
+        probability, _ = predict_proba(scorer, encode(encoder, codes, [[age]]))
+        hit = lookup_risk(table, encoder, codes, age)
+        assert hit == probability[0]
+        assert (hit >= scorer['threshold']) == (probability[0] >= scorer['threshold'])
+
+
+def saved_table(model_dir, scorer, encoder, dtype=np.float64):
+    # Two by three table written as build_risk_table.py writes it, with the hashes of the scorer and encoder given
+    np.savez(model_dir / os.path.basename(risk_index_path), shape=np.array([2, 3]), mojo_sha256=np.array(scorer['mojo_sha256']),
+             encoder_sha256=np.array(encoder_sha256(encoder)))
+    np.save(model_dir / os.path.basename(risk_table_path), np.zeros(6, dtype=dtype))
+
+
+def small_encoder(city_count=1):
+    frequency = {'District_Name': {'A': 3}, 'Caste': {'B': 2}, 'Profession': {'C': 1}, 'PresentCity': {'D': city_count}}
+    return compile_encoder(frequency, mean=np.array([1.0, 30.0, 1.0, 1.0, 1.0]), scale=np.ones(5))
+
+
+@pytest.mark.parametrize('dtype, loaded', [(np.float64, True), (np.float32, False)])
+def test_float32_tables_are_not_served(tmp_path, dtype, loaded):
+    scorer, encoder = {'mojo_sha256': 'mojo'}, small_encoder()
+    saved_table(tmp_path, scorer, encoder, dtype)
+    assert (load_risk_table(scorer, encoder, str(tmp_path)) is not None) == loaded
+
+
+def test_tables_of_another_model_are_not_served(tmp_path):
+    # Rebuilt tables are told apart from stale ones by the hashes in the index, whatever the modification times
+    scorer, encoder = {'mojo_sha256': 'mojo'}, small_encoder()
+    saved_table(tmp_path, scorer, encoder)
+
+    assert load_risk_table(scorer, encoder, str(tmp_path)) is not None
+    assert load_risk_table({'mojo_sha256': 'retrained mojo'}, encoder, str(tmp_path)) is None
+    assert load_risk_table(scorer, small_encoder(city_count=2), str(tmp_path)) is None
+
+    # Index written before the hashes were stored
+    np.savez(tmp_path / os.path.basename(risk_index_path), shape=np.array([2, 3]))
+    assert load_risk_table(scorer, encoder, str(tmp_path)) is None
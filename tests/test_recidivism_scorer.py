@@ -0,0 +1,50 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from Recidivism_Scorer import (check_parity, export_mojo, latest_mojo, load_recidivism_scorer, load_scorer, mojo_sha256, parity_rows,
+                               predict_proba, save_scorer, scorer_path)
+
+mojo_path = latest_mojo()
+requires_mojo = pytest.mark.skipif(mojo_path is None or not os.path.exists(scorer_path), reason="no committed MOJO and scorer")
+
+
+@requires_mojo
+def test_committed_scorer_matches_mojo():
+    # The committed recidivism_scorer.npz scores a fixed sample exactly as a fresh export of the MOJO it was exported from
+    exported, committed = export_mojo(mojo_path), load_scorer(scorer_path)
+    assert committed['mojo_sha256'] == mojo_sha256(mojo_path)
+    assert committed['threshold'] == exported['threshold']
+
+    X = parity_rows(committed, n_rows=200)
+    exported_probability, exported_base = predict_proba(exported, X)
+    committed_probability, committed_base = predict_proba(committed, X)
+    np.testing.assert_array_equal(committed_probability, exported_probability)
+    for name, probability in exported_base.items():
+        np.testing.assert_array_equal(committed_base[name], probability)
+
+
+@requires_mojo
+def test_committed_scorer_matches_h2o():
+    # The NumPy scorer against the predictions of H2O itself on the same fixed sample, needs h2o and a Java runtime
+    pytest.importorskip('h2o')
+    if shutil.which('java') is None:
+        pytest.skip("no Java runtime for H2O")
+
+    scorer = load_scorer(scorer_path)
+    max_difference, mismatches = check_parity(scorer, mojo_path, parity_rows(scorer, n_rows=200))
+    assert max_difference < 1e-6
+    assert mismatches == 0
+
+
+@requires_mojo
+def test_scorer_exported_again_when_mojo_hash_differs(tmp_path):
+    shutil.copy(mojo_path, tmp_path)
+    stale = load_scorer(scorer_path)
+    stale['mojo_sha256'] = '0' * 64
+    save_scorer(stale, tmp_path / os.path.basename(scorer_path))
+
+    assert load_recidivism_scorer(str(tmp_path))['mojo_sha256'] == mojo_sha256(mojo_path)
+    assert load_scorer(tmp_path / os.path.basename(scorer_path))['mojo_sha256'] == mojo_sha256(mojo_path)
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+import app.Resource_Allocation as page
+from Resource_Allocation.clean_data import clean_resource_data, save_beat_monthly_counts
+from Resource_Allocation.ingest_data import ingest_resource_data
+
+
+@pytest.fixture
+def resource_outputs(fir_workspace, monkeypatch):
+    # Resource Allocation outputs of the synthetic FIR file, read by the page from the temporary root
+    clean_resource_data(ingest_resource_data())
+    save_beat_monthly_counts(pd.read_csv(fir_workspace / 'datasets' / 'FIR_Details_Data.csv'))
+
+    monkeypatch.setattr(page, 'root_dir', str(fir_workspace))
+    clear_page_caches()
+    yield fir_workspace / 'Component_datasets'
+    clear_page_caches()
+
+
+def clear_page_caches():
+    for loader in [page.load_resource_allocation_data, page.load_allocation_cache, page.load_beat_forecasts,
+                   page.load_resource_forecasts, page.load_sensitivity_sweep]:
+        loader.clear()
+
+
+def test_resource_data_split_by_district(resource_outputs):
+    cleaned = pd.read_csv(resource_outputs / 'Resource_Allocation_Cleaned.csv')
+    data = page.load_resource_allocation_data()
+
+    # Parsed once per process, districts in file order with their beats and default strengths
+    assert page.load_resource_allocation_data() is data
+    assert data['districts'] == list(cleaned['District Name'].unique())
+    for district in data['districts']:
+        expected = cleaned[cleaned['District Name'] == district]
+        pd.testing.assert_frame_equal(data['district_frames'][district], expected)
+        assert data['default_strengths'][district] == {rank: int(expected[column].iloc[0]) for rank, column in page.SANCTION_COLUMNS.items()}
+
+    # Callers get a copy of the shared district frame
+    district = data['districts'][0]
+    frame, severity_column = page.district_severity(district)
+    frame[severity_column] = 0.0
+    assert (data['district_frames'][district][severity_column] > 0).all()
@@ -0,0 +1,131 @@
+import importlib.util
+
+import numpy as np
+import pytest
+
+from Resource_Allocation_Solver import (AllocationCache, allocation_objective, beat_caps, greedy_allocation, pulp_allocation,
+                                        severity_order, solve_allocation, strength_grid, sweep_allocation)
+
+requires_pulp = pytest.mark.skipif(importlib.util.find_spec("pulp") is None, reason="PuLP is not installed")
+
+
+def check_constraints(severity, strengths, allocation):
+    # The constraints of the MILP: sanctioned strength per rank, one officer per beat and the per-beat caps
+    assert (allocation >= 0).all()
+    assert (allocation.sum(axis=0) <= strengths).all()
+    assert (allocation.sum(axis=1) >= 1).all()
+    assert (allocation <= beat_caps(severity, strengths)).all()
+
+
+def random_cases(n_cases, seed=0):
+    # Districts of 2 to 30 beats with normalised severities (ties included) and strengths from well below to well above
+    # the number of beats, so a share of the cases leaves beats empty after the water-filling and goes through the repair
+    rng = np.random.default_rng(seed)
+    for _ in range(n_cases):
+        n_beats = int(rng.integers(2, 31))
+        severity = rng.random(n_beats)
+        if rng.random() < 0.3:
+            severity = np.round(severity, 1)
+        severity = severity / severity.sum()
+        strengths = rng.integers(0, 2 * n_beats, size=3)
+        yield severity, strengths
+
+
+def greedy_leaves_empty_beats(severity, strengths):
+    allocation = greedy_allocation(beat_caps(severity, strengths), strengths, severity_order(severity))
+    return (allocation.sum(axis=1) == 0).any()
+
+
+@requires_pulp
+def test_solver_matches_milp_objective():
+    repaired = 0
+    for severity, strengths in random_cases(120):
+        if strengths.sum() < len(severity):
+            continue
+
+        allocation = solve_allocation(severity, strengths)
+        assert allocation is not None
+        check_constraints(severity, strengths, allocation)
+        assert allocation_objective(severity, allocation) == pytest.approx(allocation_objective(severity, pulp_allocation(severity, strengths)))
+        repaired += greedy_leaves_empty_beats(severity, strengths)
+
+    assert repaired > 0
+
+
+@requires_pulp
+def test_repair_matches_milp_objective():
+    # Few officers for many beats: the most severe beats take every officer in the water-filling and the repair has to
+    # move officers down to the beats left empty
+    severity = np.array([0.5, 0.2, 0.1, 0.08, 0.05, 0.03, 0.02, 0.01, 0.005, 0.005])
+    strengths = np.array([4, 3, 5])
+    assert greedy_leaves_empty_beats(severity, strengths)
+
+    allocation = solve_allocation(severity, strengths)
+    check_constraints(severity, strengths, allocation)
+    assert allocation_objective(severity, allocation) == pytest.approx(allocation_objective(severity, pulp_allocation(severity, strengths)))
+
+
+@requires_pulp
+def test_infeasible_strengths():
+    # Fewer officers than beats cannot cover every beat, the solver returns None and the MILP has no feasible allocation
+    severity = np.full(8, 1 / 8)
+    strengths = np.array([2, 2, 3])
+
+    assert solve_allocation(severity, strengths) is None
+    with pytest.raises(AssertionError):
+        check_constraints(severity, strengths, pulp_allocation(severity, strengths))
+
+
+def test_warm_started_allocations_match_cold_solves():
+    # Strengths of a district changed one or several ranks at a time, as the page does, are warm-started from the nearest
+    # cached strengths and give the allocation solved from scratch. Strengths already solved are a cache hit
+    rng = np.random.default_rng(1)
+    severity = rng.random(25)
+    severity /= severity.sum()
+    cache = AllocationCache(max_entries=8)
+
+    strengths = np.array([30, 60, 120])
+    for step in range(60):
+        if step % 10 == 9:
+            strengths = np.array([30, 60, 120])
+        else:
+            ranks = rng.choice(3, size=rng.integers(1, 4), replace=False)
+            strengths[ranks] = np.maximum(strengths[ranks] + rng.integers(-12, 13, size=len(ranks)), 9)
+
+        allocation = cache.allocate('District', 'v1', severity, strengths)
+        np.testing.assert_array_equal(allocation, solve_allocation(severity, strengths))
+
+    assert len(cache.entries) == 8
+
+    # Cached allocations are handed out as copies, and other data versions are never warm-started from
+    allocation = cache.allocate('District', 'v1', severity, [30, 60, 120])
+    allocation[:] = 0
+    assert cache.allocate('District', 'v1', severity, [30, 60, 120]).sum() > 0
+    assert cache.nearest('District', 'v2', np.array([30, 60, 120])) is None
+
+
+def test_sweep_matches_individual_solves():
+    # Every scenario of a sensitivity sweep against solve_allocation of its strengths, on grids around strengths where all
+    # beats are covered, where the repair is needed and where some scenarios cannot cover every beat
+    rng = np.random.default_rng(2)
+    for n_beats, strengths in [(25, [30, 60, 120]), (10, [4, 3, 5]), (20, [6, 7, 8])]:
+        severity = rng.random(n_beats)
+        severity /= severity.sum()
+        grid = strength_grid(strengths, spread=0.5)
+        assert len(np.unique(grid, axis=0)) == len(grid)
+        assert (grid.min(axis=0) == [int(s * 0.5) for s in strengths]).all()
+        assert (grid.max(axis=0) == [int(s * 1.5) for s in strengths]).all()
+
+        sweep = sweep_allocation(severity, grid)
+        for scenario, scenario_strengths in enumerate(grid):
+            allocation = solve_allocation(severity, scenario_strengths)
+            if allocation is None:
+                assert np.isnan(sweep['covered_severity'][scenario])
+                continue
+
+            assert sweep['covered_severity'][scenario] == pytest.approx(allocation_objective(severity, allocation))
+            np.testing.assert_array_equal(sweep['beat_officers'][scenario], allocation.sum(axis=1))
+            greedy = greedy_allocation(beat_caps(severity, scenario_strengths), scenario_strengths, severity_order(severity))
+            assert sweep['uncovered_beats'][scenario] == (greedy.sum(axis=1) == 0).sum()
+
+        assert np.isnan(sweep['covered_severity']).any() == (grid.sum(axis=1) < n_beats).any()
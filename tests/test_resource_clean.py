@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from Resource_Allocation.clean_data import (BEAT_KEYS, CATEGORY_MAPPING, CRIME_SEVERITY_WEIGHTS, DISTRICT_MAPPING, SANCTION_STRENGTH,
+                                           clean_resource_data, clean_resource_data_chunks, load_beat_aggregates)
+from Resource_Allocation.ingest_data import ingest_resource_data, ingest_resource_data_chunks
+
+
+def read_outputs(workspace):
+    beat_totals, beat_crime_groups, row_hashes = load_beat_aggregates()
+    return ((workspace / 'Component_datasets' / 'Resource_Allocation_Cleaned.csv').read_bytes(),
+            beat_totals.astype(str).sort_values(list(beat_totals.columns)).reset_index(drop=True),
+            beat_crime_groups.astype(str).sort_values(list(beat_crime_groups.columns)).reset_index(drop=True), row_hashes)
+
+
+def test_chunked_clean_matches_full_clean(fir_workspace):
+    # Beat aggregates folded chunk by chunk give the cleaned dataset and the aggregates of the clean of the whole file
+    clean_resource_data(ingest_resource_data())
+    csv, beat_totals, beat_crime_groups, row_hashes = read_outputs(fir_workspace)
+
+    clean_resource_data_chunks(ingest_resource_data_chunks(chunksize=700))
+    chunked_csv, chunked_totals, chunked_crime_groups, chunked_hashes = read_outputs(fir_workspace)
+
+    assert chunked_csv == csv
+    pd.testing.assert_frame_equal(chunked_totals, beat_totals)
+    pd.testing.assert_frame_equal(chunked_crime_groups, beat_crime_groups)
+    np.testing.assert_array_equal(chunked_hashes, row_hashes)
+
+
+def reference_clean(df):
+    # Row by row cleaning clean_resource_data replaced, kept as the reference: every FIR row is mapped, de-duplicated, and the
+    # severity of a beat summed over its remaining rows
+    df = df.astype(object).copy()
+    df["Total Crimes per beat"] = df.groupby(BEAT_KEYS)["FIRNo"].transform("count")
+    df = df[~df["District_Name"].isin(["CID", "ISD Bengaluru", "Coastal Security Police"])].copy()
+    df["District Name"] = df["District_Name"].map(DISTRICT_MAPPING)
+    df = df.merge(pd.DataFrame(SANCTION_STRENGTH).T, left_on="District Name", right_index=True, how="left")
+    df = df.drop(columns=["District_Name", "FIRNo"]).dropna().drop_duplicates()
+
+    df["Crime Severity"] = df["CrimeGroup_Name"].map(CATEGORY_MAPPING).map(CRIME_SEVERITY_WEIGHTS)
+    df = df.drop(columns=["CrimeGroup_Name"]).dropna()
+    severity = df.groupby(["District Name", "UnitName", "Beat_Name"]).agg(Crime_Severity_per_Beat=("Crime Severity", "sum"))
+    df = df.merge(severity, on=["District Name", "UnitName", "Beat_Name"], how="left").drop(columns=["Crime Severity"]).drop_duplicates()
+
+    df = df[['District Name', 'UnitName', 'Village_Area_Name', 'Beat_Name', 'Total Crimes per beat', 'Crime_Severity_per_Beat', 'ASI', 'CHC', 'CPC']]
+    df = df.rename(columns={'UnitName': 'Police Unit', 'Beat_Name': 'Beat Name', 'Village_Area_Name': "Village Area Name",
+                            'ASI': 'Sanctioned Strength of Assistant Sub-Inspectors per District',
+                            'CHC': 'Sanctioned Strength of Head Constables per District',
+                            'CPC': 'Sanctioned Strength of Police Constables per District'})
+    df["Normalised Crime Severity"] = df["Crime_Severity_per_Beat"] / df.groupby("District Name")["Crime_Severity_per_Beat"].transform("sum")
+    return df.drop(columns=["Crime_Severity_per_Beat"])
+
+
+def test_vectorized_clean_matches_row_wise_reference(fir_workspace):
+    # Rows with a crime group without a category, a missing beat and a district without a police district are dropped as before
+    df = ingest_resource_data()
+    unusual = df.head(6).astype(object).assign(CrimeGroup_Name=['UNKNOWNGRP', None, 'THEFT', 'THEFT', 'MURDER', 'RAPE'],
+                                               Beat_Name=['BEAT 1', 'BEAT 2', None, 'BEAT 3', 'BEAT 4', 'BEAT 5'],
+                                               District_Name=['Udupi', 'Udupi', 'Udupi', 'ISD Bengaluru', 'Tumakuru', 'Kolar'],
+                                               FIRNo=[f"9{i:03d}/2020" for i in range(6)])
+    df = pd.concat([df.astype(object), unusual], ignore_index=True)
+
+    clean_resource_data(df.copy())
+    cleaned = pd.read_csv(fir_workspace / 'Component_datasets' / 'Resource_Allocation_Cleaned.csv')
+    expected = reference_clean(df)
+
+    assert list(cleaned.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(cleaned, expected.reset_index(drop=True).astype(cleaned.dtypes.to_dict()), check_exact=False)
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Resource_Forecasting import (BEAT_KEYS, RECOMMENDATION_DIVISORS, fit_beat_count_model, forecast_beat_counts, forecast_crime_counts,
+                                  forecast_severity, load_beat_count_model, save_beat_count_model)
+
+
+def beat_monthly_counts(seed=0, years=range(2016, 2021), last_month=12):
+    # Monthly crime counts of 4 districts of 2 to 6 beats, with months and whole years without crimes in some beats and
+    # the last year ending at last_month
+    rng = np.random.default_rng(seed)
+    rows = []
+    for district in range(4):
+        for beat in range(int(rng.integers(2, 7))):
+            trend = rng.normal(0, 3)
+            for year in years:
+                if rng.random() < 0.1:
+                    continue
+                for month in range(1, (last_month if year == years[-1] else 12) + 1):
+                    count = rng.poisson(max(8 + trend * (year - years[0]), 0.5))
+                    if count:
+                        rows.append([f"D{district}", f"D{district} PS", f"Village {beat}", f"Beat {beat}", year, month, count])
+
+    return pd.DataFrame(rows, columns=BEAT_KEYS + ['Year', 'Month', 'Crime Count'])
+
+
+def by_key(series):
+    # Values of a grouped series keyed by tuples, single keys included
+    return {key if isinstance(key, tuple) else (key,): value for key, value in series.items()}
+
+
+def reference_forecast(monthly_counts, keys, years):
+    # One np.polyfit line per district or beat over its yearly totals, 0 for the years without crimes
+    totals = monthly_counts[monthly_counts['Year'].isin(years)].groupby(keys + ['Year'])['Crime Count'].sum()
+    predicted = {}
+    for key, series in totals.groupby(level=list(range(len(keys)))):
+        counts = series.droplevel(list(range(len(keys)))).reindex(years, fill_value=0)
+        slope, intercept = np.polyfit(years, counts.to_numpy(dtype=float), 1)
+        predicted[key if isinstance(key, tuple) else (key,)] = max(slope * (years[-1] + 1) + intercept, 0)
+    return predicted
+
+
+@pytest.mark.parametrize('last_month', [12, 7])
+def test_batched_trends_match_per_series_fits(last_month):
+    monthly_counts = beat_monthly_counts(last_month=last_month)
+    # A last year stopping before December is left out of the fit
+    years = np.arange(2016, 2021 if last_month == 12 else 2020)
+
+    forecasts = forecast_crime_counts(monthly_counts)
+    assert forecasts['year'] == years[-1] + 1
+
+    for name, keys in [('districts', BEAT_KEYS[:1]), ('beats', BEAT_KEYS)]:
+        expected = reference_forecast(monthly_counts, keys, years)
+        frame = forecasts[name]
+        assert len(frame) == len(expected)
+
+        predicted = dict(zip(map(tuple, frame[keys].to_numpy()), frame['Predicted Crime Count']))
+        assert predicted.keys() == expected.keys()
+        for key, value in expected.items():
+            assert predicted[key] == pytest.approx(value, abs=1e-6)
+
+        last_counts = by_key(monthly_counts[monthly_counts['Year'] == years[-1]].groupby(keys)['Crime Count'].sum())
+        assert [last_counts.get(key, 0) for key in predicted] == frame[f"Crime Count {years[-1]}"].tolist()
+
+        for rank, divisor in RECOMMENDATION_DIVISORS.items():
+            assert (frame[f"Recommended {rank}"] == np.floor(frame['Predicted Crime Count'] / divisor)).all()
+
+
+def test_beat_count_model_round_trip(tmp_path):
+    monthly_counts = beat_monthly_counts(seed=1)
+    params = fit_beat_count_model(monthly_counts)
+
+    # With a free effect per beat the Poisson fit reproduces the crimes of every beat over the years it was fitted on
+    fitted = sum(forecast_beat_counts(params, year)['Forecast Crime Count'] for year in range(2016, 2021))
+    np.testing.assert_allclose(fitted, params['beat_yearly_mean'] * 5, rtol=1e-3)
+
+    save_beat_count_model(params, tmp_path / 'beat_count_model.npz')
+    loaded = load_beat_count_model(tmp_path / 'beat_count_model.npz')
+    assert loaded.keys() == params.keys()
+    pd.testing.assert_frame_equal(forecast_beat_counts(loaded, 2021), forecast_beat_counts(params, 2021))
+
+
+def test_forecast_severity_normalised_per_district():
+    monthly_counts = beat_monthly_counts(seed=2)
+    beat_forecasts = forecast_beat_counts(fit_beat_count_model(monthly_counts), 2021)
+
+    # The beats of the resource data plus one beat without history, with severities normalised per district
+    resource_data = pd.concat([beat_forecasts[BEAT_KEYS], pd.DataFrame([['D0', 'D0 PS', 'Village 9', 'Beat 9']], columns=BEAT_KEYS)],
+                              ignore_index=True).sample(frac=1, random_state=0).reset_index(drop=True)
+    severity = np.random.default_rng(2).random(len(resource_data))
+    resource_data['Normalised Crime Severity'] = severity / resource_data.assign(s=severity).groupby('District Name')['s'].transform('sum')
+
+    forecast = forecast_severity(resource_data, beat_forecasts)
+    assert forecast.index.equals(resource_data.index)
+    np.testing.assert_allclose(forecast.groupby(resource_data['District Name']).sum(), 1)
+
+    # Within a district every beat is scaled by its forecast over its historical yearly mean, the new beat by 1
+    merged = resource_data.merge(beat_forecasts, on=BEAT_KEYS, how='left')
+    growth = (merged['Forecast Crime Count'] / merged['Historical Yearly Crime Count']).fillna(1.0)
+    scale = forecast / (resource_data['Normalised Crime Severity'] * growth)
+    np.testing.assert_allclose(scale, scale.groupby(resource_data['District Name']).transform('first'))
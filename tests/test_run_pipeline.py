@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import Data_Pipeline.run_pipeline as run_pipeline
+
+runs = []
+
+
+def copy_stage(name, source, target):
+    # Stage writing its input, prefixed by its name, to its output, run from the 'work' directory like the components
+    def run():
+        runs.append(name)
+        with open(os.path.join('..', source)) as f:
+            content = f.read()
+        os.makedirs(os.path.dirname(os.path.join('..', target)), exist_ok=True)
+        with open(os.path.join('..', target), 'w') as f:
+            f.write(f"{name}({content})")
+    return run
+
+
+def failing_stage():
+    runs.append('broken')
+    raise ValueError("stage failed")
+
+
+@pytest.fixture
+def pipeline_root(tmp_path, monkeypatch):
+    # Three stages over a temporary root: 'clean' reads the raw input, 'model' reads the output of 'clean' and 'report' is
+    # independent. Stages run on threads so the patched stages are seen whatever the process start method
+    for directory in ['code', 'data', 'work']:
+        (tmp_path / directory).mkdir()
+    for name in ['clean', 'model', 'report']:
+        (tmp_path / 'code' / f"{name}.py").write_text(f"# {name}\n")
+    (tmp_path / 'data' / 'raw.txt').write_text("raw")
+    (tmp_path / 'data' / 'notes.txt').write_text("notes")
+
+    stages = {
+        'clean': {'cwd': 'work', 'run': copy_stage('clean', 'data/raw.txt', 'out/clean.txt'),
+                  'code': ['code/clean.py'], 'inputs': ['data/raw.txt'], 'outputs': ['out/clean.txt']},
+        'model': {'cwd': 'work', 'run': copy_stage('model', 'out/clean.txt', 'out/model.txt'),
+                  'code': ['code/model.py'], 'inputs': ['out/clean.txt'], 'outputs': ['out/model.txt']},
+        'report': {'cwd': 'work', 'run': copy_stage('report', 'data/notes.txt', 'out/report.txt'),
+                   'code': ['code/report.py'], 'inputs': ['data/notes.txt'], 'outputs': ['out/report.txt']}
+    }
+    monkeypatch.setattr(run_pipeline, 'root_dir', str(tmp_path))
+    monkeypatch.setattr(run_pipeline, 'CACHE_DIR', str(tmp_path / '.pipeline_cache'))
+    monkeypatch.setattr(run_pipeline, 'STATE_PATH', str(tmp_path / '.pipeline_cache' / 'state.json'))
+    monkeypatch.setattr(run_pipeline, 'STAGES', stages)
+    monkeypatch.setattr(run_pipeline, 'OPTIONAL_STAGES', set())
+    monkeypatch.setattr(run_pipeline, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.chdir(tmp_path)
+    runs.clear()
+    return tmp_path
+
+
+def run(**kwargs):
+    runs.clear()
+    failed = run_pipeline.run_pipeline(workers=1, **kwargs)
+    return sorted(runs), failed
+
+
+def test_stages_rerun_only_when_their_code_or_inputs_change(pipeline_root):
+    assert run() == (['clean', 'model', 'report'], set())
+    assert (pipeline_root / 'out' / 'model.txt').read_text() == "model(clean(raw))"
+    assert run() == ([], set())
+
+    # A new modification time with the same content is not a change
+    os.utime(pipeline_root / 'data' / 'raw.txt', ns=(1, 1))
+    assert run() == ([], set())
+
+    # New input content reruns the stage and, through its new output, the stage reading it
+    (pipeline_root / 'data' / 'raw.txt').write_text("raw, revised")
+    assert run() == (['clean', 'model'], set())
+    assert (pipeline_root / 'out' / 'model.txt').read_text() == "model(clean(raw, revised))"
+
+    # A code change reruns only that stage, whose output is the same, so nothing downstream
+    (pipeline_root / 'code' / 'clean.py').write_text("# clean, refactored\n")
+    assert run() == (['clean'], set())
+
+    # An output removed or edited since it was written is rebuilt
+    (pipeline_root / 'out' / 'report.txt').unlink()
+    (pipeline_root / 'out' / 'model.txt').write_text("edited")
+    assert run() == (['model', 'report'], set())
+
+    assert run(force=True) == (['clean', 'model', 'report'], set())
+
+
+def test_targets_dry_run_and_failures(pipeline_root):
+    assert run_pipeline.select_stages(['model']) == {'clean', 'model'}
+    with pytest.raises(ValueError):
+        run_pipeline.select_stages(['missing'])
+
+    assert run(targets=['model']) == (['clean', 'model'], set())
+    (pipeline_root / 'data' / 'raw.txt').write_text("raw, revised")
+    assert run(dry_run=True) == ([], set())
+    assert (pipeline_root / 'out' / 'clean.txt').read_text() == "clean(raw)"
+
+    # A failed stage is reported and the stages depending on it are not run, the independent ones are
+    run_pipeline.STAGES['clean']['run'] = failing_stage
+    assert run() == (['broken', 'report'], {'clean', 'model'})
+
+    # A missing input fails the stage before it runs
+    (pipeline_root / 'data' / 'notes.txt').unlink()
+    assert run(targets=['report']) == ([], {'report'})
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from Crime_Pattern_Analysis.ingest_data import ingest_crime_pattern_analysis, ingest_crime_pattern_analysis_chunks
+from Data_Pipeline.schema import DTYPE_SCHEMA, fillna_categorical, schema_dtypes
+from Resource_Allocation.ingest_data import ingest_resource_data
+
+
+def assert_schema_dtypes(df):
+    for column, dtype in schema_dtypes(df.columns).items():
+        if dtype == 'category':
+            assert isinstance(df[column].dtype, pd.CategoricalDtype), column
+        else:
+            assert df[column].dtype == pd.api.types.pandas_dtype(object if dtype is str else dtype), column
+
+
+def test_ingests_apply_the_schema_without_changing_values(fir_workspace):
+    # Columns are read with the compact dtypes of the schema and hold the values of a plain read of the file, the
+    # coordinates to the last bit
+    raw = pd.read_csv(fir_workspace / 'datasets' / 'FIR_Details_Data.csv')
+
+    for df in [ingest_crime_pattern_analysis(), ingest_resource_data(), next(ingest_crime_pattern_analysis_chunks(chunksize=700))]:
+        assert_schema_dtypes(df)
+        expected = raw.loc[df.index, df.columns]
+        for column in df.columns:
+            values = df[column].astype(object).where(df[column].notna(), None).tolist()
+            assert values == expected[column].astype(object).where(expected[column].notna(), None).tolist(), column
+
+    assert DTYPE_SCHEMA['Latitude'] == DTYPE_SCHEMA['Longitude'] == 'float64'
+
+
+def test_schema_dtypes_keeps_the_order_of_the_columns():
+    assert list(schema_dtypes(['Month', 'NotInSchema', 'District_Name'])) == ['Month', 'District_Name']
+    assert schema_dtypes() == DTYPE_SCHEMA and schema_dtypes() is not DTYPE_SCHEMA
+
+
+def test_fillna_categorical():
+    column = pd.Series(['a', None, 'b', None], dtype='category')
+    filled = fillna_categorical(column, 'Unknown')
+    assert filled.tolist() == ['a', 'Unknown', 'b', 'Unknown'] and isinstance(filled.dtype, pd.CategoricalDtype)
+
+    assert fillna_categorical(pd.Series([1.0, np.nan]), 0).tolist() == [1.0, 0.0]
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Predictive_Modeling.Recidivism_Prediction.score_batch import score_accused_records
+from Recidivism_Encoder import encode, load_recidivism_encoder, row_codes
+from Recidivism_Scorer import load_recidivism_scorer, predict_proba
+
+scorer = load_recidivism_scorer()
+requires_scorer = pytest.mark.skipif(scorer is None, reason="no committed recidivism scorer")
+
+
+def accused_records(encoder, n_rows, seed=0):
+    # AccusedData.csv-shaped records over the training categories, with unseen and missing values and missing ages
+    rng = np.random.default_rng(seed)
+    records = {'FIRNo': [f"{i:07d}" for i in range(n_rows)], 'Person_No': rng.integers(1, 5, n_rows).astype(str)}
+    for i in encoder['categorical']:
+        feature = encoder['features'][i]
+        values = rng.choice(np.append(encoder['categories'][feature], 'Unseen'), n_rows).astype(object)
+        values[rng.random(n_rows) < 0.05] = None
+        records[feature] = values
+
+    ages = rng.integers(7, 100, n_rows).astype(float)
+    ages[rng.random(n_rows) < 0.05] = np.nan
+    records['age'] = ages
+    return pd.DataFrame(records)
+
+
+@requires_scorer
+def test_batch_scoring_matches_row_by_row_scoring(tmp_path):
+    encoder = load_recidivism_encoder()
+    records = accused_records(encoder, 500)
+    records.to_csv(tmp_path / 'AccusedData.csv', index=False)
+
+    # Several chunks in flight in a worker, written back in input order
+    n_rows = score_accused_records(tmp_path / 'AccusedData.csv', tmp_path / 'predictions.parquet', chunk_size=60, workers=1)
+    predictions = pd.read_parquet(tmp_path / 'predictions.parquet')
+    assert n_rows == len(predictions) == len(records)
+    assert predictions['FIRNo'].tolist() == records['FIRNo'].tolist()
+    assert predictions['Person_No'].tolist() == records['Person_No'].tolist()
+
+    # Every record scored alone, as the app scores the form input
+    expected = np.array([predict_proba(scorer, encode(encoder, row_codes(encoder, row), [[row['age']]]))[0][0]
+                         for row in records.to_dict('records')])
+    np.testing.assert_allclose(predictions['Recidivism_Probability'], expected, rtol=1e-12)
+    assert (predictions['Recidivism'] == (predictions['Recidivism_Probability'] >= scorer['threshold'])).all()
+
+
+@requires_scorer
+def test_missing_feature_columns(tmp_path):
+    accused_records(load_recidivism_encoder(), 10).drop(columns='Caste').to_csv(tmp_path / 'AccusedData.csv', index=False)
+    with pytest.raises(ValueError, match='Caste'):
+        score_accused_records(tmp_path / 'AccusedData.csv', tmp_path / 'predictions.parquet', workers=1)